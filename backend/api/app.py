@@ -107,6 +107,8 @@ from api.routes.user_group import user_group_bp
 from api.routes.notifications import notifications_bp
 from api.routes.plan import plan_bp
 from api.routes.email import email_bp
+from api.routes.calendar_feed import calendar_feed_bp
+from api.routes.agenda import agenda_bp
 # Removed db_migration import - migration completed
 # Removed temporary fix routes - no longer needed
 
@@ -130,6 +132,23 @@ app.register_blueprint(user_group_bp, url_prefix='/api')
 app.register_blueprint(notifications_bp, url_prefix='/api')
 app.register_blueprint(plan_bp, url_prefix='/api')
 app.register_blueprint(email_bp, url_prefix='/api')
+app.register_blueprint(calendar_feed_bp, url_prefix='/api')
+app.register_blueprint(agenda_bp, url_prefix='/api')
+
+# Background Google work: event pushes to Google Calendar and sync jobs
+from bl.services.google_calendar_outbox_service import google_calendar_outbox_service
+google_calendar_outbox_service.init_app(app)
+from bl.services.google_sync_job_service import google_sync_job_service
+google_sync_job_service.init_app(app)
+
+# Telegram updates are acknowledged by the webhook and processed in the background
+from bl.services.telegram_update_service import telegram_update_service
+from api.routes.telegram import process_telegram_update
+telegram_update_service.init_app(app, process_telegram_update)
+
+# Finished tasks are moved to tasks_archive by a periodic sweep
+from bl.services.task_archive_service import task_archive_service
+task_archive_service.init_app(app)
 # app.register_blueprint(migration_bp, url_prefix='/api')  # Disabled - using direct endpoint instead
 # Removed temporary fix blueprint registrations - no longer needed
 
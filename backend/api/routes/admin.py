@@ -287,3 +287,68 @@ def fix_database_schema():
     except Exception as e:
         admin_logger.error(f"Error fixing database schema: {e}", exc_info=True)
         return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/admin/archive-tasks', methods=['POST'])
+@jwt_required()
+def archive_tasks_for_all_users():
+    """Move finished tasks of all users to the archive (admin only)"""
+    try:
+        current_user_id = get_jwt_identity()
+        
+        if not check_admin_access(current_user_id):
+            return jsonify({'error': 'Admin access required'}), 403
+        
+        from bl.services.task_archive_service import task_archive_service
+        
+        data = request.get_json(silent=True) or {}
+        older_than_days = data.get('older_than_days')
+        
+        archived_count = task_archive_service.archive_finished_tasks(
+            older_than_days=int(older_than_days) if older_than_days is not None else None
+        )
+        admin_logger.info(f"🗄️ Archived {archived_count} finished tasks")
+        
+        return jsonify({
+            'message': 'Task archive completed successfully',
+            'archived_count': archived_count
+        }), 200
+        
+    except Exception as e:
+        admin_logger.error(f"Error archiving tasks: {e}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/admin/google-client-pool', methods=['GET'])
+@jwt_required()
+def get_google_client_pool_stats():
+    """Hit/miss/eviction counters of the pooled Google API clients (admin only)"""
+    try:
+        current_user_id = get_jwt_identity()
+        
+        if not check_admin_access(current_user_id):
+            return jsonify({'error': 'Admin access required'}), 403
+        
+        from bl.services.google_client_pool import google_client_pool
+        
+        return jsonify(google_client_pool.stats()), 200
+        
+    except Exception as e:
+        admin_logger.error(f"Error getting Google client pool stats: {e}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/admin/telegram-updates', methods=['GET'])
+@jwt_required()
+def get_telegram_update_stats():
+    """Depth of the Telegram update queue and busy workers (admin only)"""
+    try:
+        current_user_id = get_jwt_identity()
+        
+        if not check_admin_access(current_user_id):
+            return jsonify({'error': 'Admin access required'}), 403
+        
+        from bl.services.telegram_update_service import telegram_update_service
+        
+        return jsonify(telegram_update_service.stats()), 200
+        
+    except Exception as e:
+        admin_logger.error(f"Error getting Telegram update stats: {e}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
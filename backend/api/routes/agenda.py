@@ -0,0 +1,52 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from dal.models import User
+from datetime import datetime, timedelta
+from bl.services.agenda_service import agenda_service, MAX_AGENDA_DAYS
+from bl.services.recurrence_service import to_naive_utc
+
+agenda_bp = Blueprint('agenda', __name__)
+
+@agenda_bp.route('/agenda', methods=['GET'])
+@jwt_required()
+def get_agenda():
+    """Events, due/scheduled tasks, follow-ups and birthdays in one time-ordered list"""
+    try:
+        current_user_id = get_jwt_identity()
+        current_user = User.query.get(current_user_id)
+        
+        if not current_user or not current_user.is_approved:
+            return jsonify({'error': 'Unauthorized'}), 403
+        
+        # Defaults to today (UTC)
+        from_param = request.args.get('from')
+        to_param = request.args.get('to')
+        try:
+            if from_param:
+                window_start = to_naive_utc(datetime.fromisoformat(from_param.replace('Z', '+00:00')))
+            else:
+                window_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+            if to_param:
+                window_end = to_naive_utc(datetime.fromisoformat(to_param.replace('Z', '+00:00')))
+            else:
+                window_end = window_start + timedelta(days=1)
+        except ValueError as e:
+            return jsonify({'error': f'Invalid date: {str(e)}'}), 400
+        
+        if window_end <= window_start:
+            return jsonify({'error': "'to' must be after 'from'"}), 400
+        if window_end - window_start > timedelta(days=MAX_AGENDA_DAYS):
+            return jsonify({'error': f'Window cannot be longer than {MAX_AGENDA_DAYS} days'}), 400
+        
+        use_cache = request.args.get('refresh', 'false').lower() != 'true'
+        items = agenda_service.get_agenda(current_user, window_start, window_end, use_cache=use_cache)
+        
+        return jsonify({
+            'from': window_start.isoformat(),
+            'to': window_end.isoformat(),
+            'items': items,
+            'count': len(items)
+        })
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
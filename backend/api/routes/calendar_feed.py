@@ -0,0 +1,87 @@
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from werkzeug.http import http_date
+from dal.database import db
+from dal.models import User
+from bl.services.ical_feed_service import ical_feed_service
+import secrets
+
+calendar_feed_bp = Blueprint('calendar_feed', __name__)
+
+def _feed_response(token):
+    return {
+        'token': token,
+        'url': request.host_url.rstrip('/') + f'/api/calendar/{token}.ics'
+    }
+
+@calendar_feed_bp.route('/calendar/feed', methods=['GET', 'POST'])
+@jwt_required()
+def get_calendar_feed():
+    """Get the subscription URL of the current user's feed (GET), or rotate its token (POST)"""
+    try:
+        current_user_id = get_jwt_identity()
+        current_user = User.query.get(current_user_id)
+
+        if not current_user or not current_user.is_approved:
+            return jsonify({'error': 'Unauthorized'}), 403
+
+        # Rotating invalidates every existing subscription URL
+        if request.method == 'POST' or not current_user.calendar_feed_token:
+            current_user.calendar_feed_token = secrets.token_urlsafe(32)
+            db.session.commit()
+
+        return jsonify(_feed_response(current_user.calendar_feed_token))
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@calendar_feed_bp.route('/calendar/feed', methods=['DELETE'])
+@jwt_required()
+def delete_calendar_feed():
+    """Disable the current user's feed"""
+    try:
+        current_user_id = get_jwt_identity()
+        current_user = User.query.get(current_user_id)
+
+        if not current_user or not current_user.is_approved:
+            return jsonify({'error': 'Unauthorized'}), 403
+
+        current_user.calendar_feed_token = None
+        db.session.commit()
+
+        return jsonify({'message': 'Calendar feed disabled'})
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@calendar_feed_bp.route('/calendar/<token>.ics', methods=['GET'])
+def calendar_feed_ics(token):
+    """iCalendar subscription feed; the token in the URL is the credential"""
+    user = User.query.filter_by(calendar_feed_token=token).first() if token else None
+    if not user or not user.is_approved:
+        return jsonify({'error': 'Calendar feed not found'}), 404
+
+    etag, last_modified = ical_feed_service.get_version(user)
+
+    # Conditional GET: pollers with an up-to-date copy get a 304 without the feed being built.
+    # Only the ETag can tell: deleted events and tasks leave nothing behind to move Last-Modified,
+    # so If-Modified-Since alone always gets the full feed.
+    not_modified = bool(request.if_none_match) and request.if_none_match.contains(etag)
+
+    headers = {
+        'ETag': f'"{etag}"',
+        'Cache-Control': 'private, max-age=900'
+    }
+    if last_modified:
+        headers['Last-Modified'] = http_date(last_modified)
+
+    if not_modified:
+        return Response(status=304, headers=headers)
+
+    return Response(
+        stream_with_context(ical_feed_service.generate(user)),
+        mimetype='text/calendar',
+        headers={**headers, 'Content-Disposition': 'inline; filename="calendar.ics"'}
+    )
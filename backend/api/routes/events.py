@@ -1,15 +1,28 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from dal.database import db
-from dal.models import Event, User
+from dal.models import Event, User, EventParticipant
 from datetime import datetime, timedelta
 from sqlalchemy import and_, or_
 from bl.services.notification_service import notify_event_participant, notify_event_updated
-from bl.services.google_calendar_sync_service import google_calendar_sync_service
+from bl.services.google_calendar_outbox_service import google_calendar_outbox_service
+from bl.services.recurrence_service import recurrence_service, to_naive_utc, occurrence_key, OVERRIDABLE_FIELDS
+from bl.services.availability_service import availability_service, MAX_WINDOW_DAYS
+from bl.services.agenda_service import agenda_service
 import json
 
 events_bp = Blueprint('events', __name__)
 
+def _participant_emails(participants):
+    return [p['email'] for p in participants or [] if isinstance(p, dict) and p.get('email')]
+
+def _find_conflicts(user, event):
+    """Overlapping events of the owner and participants, for the create/update responses"""
+    return availability_service.find_conflicts(
+        user, event.start_datetime, event.end_datetime,
+        _participant_emails(event.participants), exclude_event_id=event.id
+    )
+
 @events_bp.route('/events', methods=['GET'])
 @jwt_required()
 def get_events():
@@ -27,28 +40,26 @@ def get_events():
         project = request.args.get('project')
         
         # Build query - show events where user is owner OR participant
-        from sqlalchemy import text
         query = Event.query.filter(
             or_(
                 Event.owner_id == current_user_id,
-                text("participants @> :email").params(email=f'[{{"email": "{current_user.email}"}}]')
+                EventParticipant.invited_clause(Event, current_user.email)
             ),
             Event.is_active == True
         )
         
-        if start_date:
-            start_datetime = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
-            query = query.filter(Event.start_datetime >= start_datetime)
-        
-        if end_date:
-            end_datetime = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
-            query = query.filter(Event.end_datetime <= end_datetime)
+        start_datetime = to_naive_utc(datetime.fromisoformat(start_date.replace('Z', '+00:00'))) if start_date else None
+        end_datetime = to_naive_utc(datetime.fromisoformat(end_date.replace('Z', '+00:00'))) if end_date else None
         
-        events = query.order_by(Event.start_datetime.asc()).all()
+        # Overlap semantics: events crossing either edge of the window are included,
+        # recurring series are expanded into the occurrences inside it
+        event_dicts = recurrence_service.serialize(
+            recurrence_service.events_in_window(query, start_datetime, end_datetime)
+        )
         
         return jsonify({
-            'events': [event.to_dict() for event in events],
-            'count': len(events)
+            'events': event_dicts,
+            'count': len(event_dicts)
         })
     
     except Exception as e:
@@ -99,27 +110,13 @@ def create_event():
         )
         
         db.session.add(event)
+        db.session.flush()
+        EventParticipant.sync_from_event(event)
+        # Pushed to Google Calendar in the background, committed together with the event
+        google_calendar_outbox_service.enqueue(event, current_user, 'create')
         db.session.commit()
-        
-        # Sync to Google Calendar if enabled and user has Google account
-        print(f"🔄 EVENT CREATE DEBUG: Event {event.id} created")
-        print(f"  - Event google_sync: {getattr(event, 'google_sync', 'NOT_SET')}")
-        print(f"  - User google_id: {current_user.google_id}")
-        print(f"  - User email: {current_user.email}")
-        
-        if event.google_sync and current_user.google_id:
-            try:
-                print(f"🔄 EVENT CREATE DEBUG: Attempting Google Calendar sync...")
-                google_calendar_sync_service.sync_event_to_google_calendar(event, current_user, 'create')
-                print(f"🔄 EVENT CREATE DEBUG: Google Calendar sync completed")
-            except Exception as sync_error:
-                # Log the error but don't fail the event creation
-                print(f"🔄 EVENT CREATE DEBUG: Google Calendar sync failed: {str(sync_error)}")
-                print(f"Warning: Failed to sync event to Google Calendar: {str(sync_error)}")
-        else:
-            print(f"🔄 EVENT CREATE DEBUG: Skipping Google Calendar sync")
-            print(f"  - google_sync enabled: {getattr(event, 'google_sync', False)}")
-            print(f"  - user has google_id: {bool(current_user.google_id)}")
+        agenda_service.invalidate_event(current_user_id, EventParticipant.emails_of(event))
+        google_calendar_outbox_service.wake()
         
         # Notify participants about the new event
         if data.get('participants'):
@@ -129,7 +126,8 @@ def create_event():
         
         return jsonify({
             'message': 'Event created successfully',
-            'event': event.to_dict()
+            'event': event.to_dict(),
+            'conflicts': _find_conflicts(current_user, event)['conflicts']
         }), 201
     
     except Exception as e:
@@ -196,8 +194,10 @@ def update_event(event_id):
             event.event_type = data['event_type']
         if 'project' in data:
             event.project = data['project']
+        removed_participants = []
         if 'participants' in data:
             event.participants = data['participants']
+            _, removed_participants = EventParticipant.sync_from_event(event)
         if 'alert_minutes' in data:
             event.alert_minutes = data['alert_minutes']
         if 'repeat_pattern' in data:
@@ -214,16 +214,12 @@ def update_event(event_id):
             event.google_sync = data['google_sync']
         
         event.updated_at = datetime.utcnow()
+        google_calendar_outbox_service.enqueue(event, current_user, 'update')
         
         db.session.commit()
-        
-        # Sync to Google Calendar if enabled and user has Google account
-        if event.google_sync and current_user.google_id:
-            try:
-                google_calendar_sync_service.sync_event_to_google_calendar(event, current_user, 'update')
-            except Exception as sync_error:
-                # Log the error but don't fail the event update
-                print(f"Warning: Failed to sync event update to Google Calendar: {str(sync_error)}")
+        recurrence_service.invalidate(event.id)
+        agenda_service.invalidate_event(current_user_id, EventParticipant.emails_of(event) + removed_participants)
+        google_calendar_outbox_service.wake()
         
         # Notify participants about the event update
         if event.participants:
@@ -233,7 +229,8 @@ def update_event(event_id):
         
         return jsonify({
             'message': 'Event updated successfully',
-            'event': event.to_dict()
+            'event': event.to_dict(),
+            'conflicts': _find_conflicts(current_user, event)['conflicts']
         })
     
     except Exception as e:
@@ -259,19 +256,15 @@ def delete_event(event_id):
         if not event:
             return jsonify({'error': 'Event not found'}), 404
         
-        # Sync deletion to Google Calendar if enabled and user has Google account
-        if event.google_sync and current_user.google_id:
-            try:
-                google_calendar_sync_service.sync_event_to_google_calendar(event, current_user, 'delete')
-            except Exception as sync_error:
-                # Log the error but don't fail the event deletion
-                print(f"Warning: Failed to sync event deletion to Google Calendar: {str(sync_error)}")
-        
         # Soft delete by setting is_active to False
         event.is_active = False
         event.updated_at = datetime.utcnow()
+        google_calendar_outbox_service.enqueue(event, current_user, 'delete')
         
         db.session.commit()
+        recurrence_service.invalidate(event.id)
+        agenda_service.invalidate_event(current_user_id, EventParticipant.emails_of(event))
+        google_calendar_outbox_service.wake()
         
         return jsonify({'message': 'Event deleted successfully'})
     
@@ -293,17 +286,196 @@ def get_upcoming_events():
         now = datetime.utcnow()
         next_week = now + timedelta(days=7)
         
-        events = Event.query.filter(
+        query = Event.query.filter(
             Event.owner_id == current_user_id,
-            Event.is_active == True,
-            Event.start_datetime >= now,
-            Event.start_datetime <= next_week
-        ).order_by(Event.start_datetime.asc()).all()
+            Event.is_active == True
+        )
+        
+        # Keep only occurrences that have not started yet
+        occurrences = [
+            occurrence for occurrence in recurrence_service.events_in_window(query, now, next_week)
+            if occurrence.start_datetime >= now
+        ]
+        event_dicts = recurrence_service.serialize(occurrences)
+        
+        return jsonify({
+            'events': event_dicts,
+            'count': len(event_dicts)
+        })
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@events_bp.route('/events/conflicts', methods=['POST'])
+@jwt_required()
+def check_event_conflicts():
+    """Check a proposed time against the calendars of the current user and the participants"""
+    try:
+        current_user_id = get_jwt_identity()
+        current_user = User.query.get(current_user_id)
+        
+        if not current_user or not current_user.is_approved:
+            return jsonify({'error': 'Unauthorized'}), 403
+        
+        data = request.get_json() or {}
+        
+        required_fields = ['start_datetime', 'end_datetime']
+        for field in required_fields:
+            if not data.get(field):
+                return jsonify({'error': f'Missing required field: {field}'}), 400
+        
+        try:
+            start_datetime = datetime.fromisoformat(data['start_datetime'].replace('Z', '+00:00'))
+            end_datetime = datetime.fromisoformat(data['end_datetime'].replace('Z', '+00:00'))
+        except ValueError as e:
+            return jsonify({'error': f'Invalid datetime: {str(e)}'}), 400
+        
+        # Only the user and their approved group members can be looked up
+        participant_emails = _participant_emails(data.get('participants'))
+        unknown_emails = availability_service.outside_group(current_user, participant_emails)
+        if unknown_emails:
+            return jsonify({'error': f'Not in your group: {", ".join(unknown_emails)}'}), 403
+        
+        result = availability_service.find_conflicts(
+            current_user, start_datetime, end_datetime, participant_emails,
+            exclude_event_id=data.get('event_id')
+        )
+        return jsonify(result)
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@events_bp.route('/events/find-slots', methods=['POST'])
+@jwt_required()
+def find_slots():
+    """Find free meeting slots across the current user and group members"""
+    try:
+        current_user_id = get_jwt_identity()
+        current_user = User.query.get(current_user_id)
+        
+        if not current_user or not current_user.is_approved:
+            return jsonify({'error': 'Unauthorized'}), 403
+        
+        data = request.get_json() or {}
+        
+        required_fields = ['start_date', 'end_date', 'duration_minutes']
+        for field in required_fields:
+            if not data.get(field):
+                return jsonify({'error': f'Missing required field: {field}'}), 400
+        
+        try:
+            window_start = to_naive_utc(datetime.fromisoformat(data['start_date'].replace('Z', '+00:00')))
+            window_end = to_naive_utc(datetime.fromisoformat(data['end_date'].replace('Z', '+00:00')))
+            duration = timedelta(minutes=int(data['duration_minutes']))
+            utc_offset_minutes = int(data.get('utc_offset_minutes', 0))
+            max_slots = int(data.get('max_slots', 20))
+        except (ValueError, TypeError) as e:
+            return jsonify({'error': f'Invalid request: {str(e)}'}), 400
+        
+        if window_end <= window_start or duration <= timedelta(0):
+            return jsonify({'error': 'end_date must be after start_date and duration_minutes must be positive'}), 400
+        if window_end - window_start > timedelta(days=MAX_WINDOW_DAYS):
+            return jsonify({'error': f'Window cannot be longer than {MAX_WINDOW_DAYS} days'}), 400
+        
+        # Only the user and their approved group members can be looked up
+        emails = {email.strip().lower() for email in data.get('emails') or [] if email}
+        emails.add(current_user.email.lower())
+        
+        unknown_emails = availability_service.outside_group(current_user, emails)
+        if unknown_emails:
+            return jsonify({'error': f'Not in your group: {", ".join(unknown_emails)}'}), 403
+        
+        try:
+            result = availability_service.find_slots(
+                emails, window_start, window_end, duration,
+                working_hours=data.get('working_hours'),
+                utc_offset_minutes=utc_offset_minutes,
+                max_slots=max_slots
+            )
+        except ValueError as e:
+            return jsonify({'error': f'Invalid working_hours: {str(e)}'}), 400
+        
+        result['emails'] = sorted(emails)
+        return jsonify(result)
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@events_bp.route('/events/<int:event_id>/occurrences/<occurrence_start>', methods=['PUT', 'DELETE'])
+@jwt_required()
+def update_event_occurrence(event_id, occurrence_start):
+    """Override (PUT) or cancel (DELETE) a single occurrence of a recurring event"""
+    try:
+        current_user_id = get_jwt_identity()
+        current_user = User.query.get(current_user_id)
+        
+        if not current_user or not current_user.is_approved:
+            return jsonify({'error': 'Unauthorized'}), 403
+        
+        event = Event.query.filter(
+            Event.id == event_id,
+            Event.owner_id == current_user_id
+        ).first()
+        
+        if not event:
+            return jsonify({'error': 'Event not found'}), 404
+        
+        if not event.is_recurring:
+            return jsonify({'error': 'Event is not recurring'}), 400
+        
+        try:
+            original_start = to_naive_utc(datetime.fromisoformat(occurrence_start.replace('Z', '+00:00')))
+            key = occurrence_key(original_start)
+        except ValueError:
+            return jsonify({'error': f'Invalid occurrence_start format: {occurrence_start}'}), 400
+        
+        # Reassign (not mutate) the JSON columns so SQLAlchemy notices the change
+        overrides = dict(event.recurrence_overrides or {})
+        exceptions = list(event.recurrence_exceptions or [])
+        
+        if request.method == 'DELETE':
+            overrides.pop(key, None)
+            if key not in exceptions:
+                exceptions.append(key)
+            message = 'Occurrence cancelled successfully'
+        else:
+            data = request.get_json() or {}
+            override = {field: data[field] for field in OVERRIDABLE_FIELDS if field in data}
+            if not override:
+                return jsonify({'error': f'Nothing to override. Allowed fields: {OVERRIDABLE_FIELDS}'}), 400
+            
+            # Overrides are read on every expansion - store datetimes as naive UTC ISO strings so they always parse
+            for field in ('start_datetime', 'end_datetime'):
+                if override.get(field) is None:
+                    continue
+                try:
+                    override[field] = to_naive_utc(datetime.fromisoformat(override[field].replace('Z', '+00:00'))).isoformat()
+                except (ValueError, AttributeError):
+                    return jsonify({'error': f'Invalid {field} format: {override[field]}'}), 400
+            
+            merged = {**overrides.get(key, {}), **override}
+            new_start = datetime.fromisoformat(merged['start_datetime']) if merged.get('start_datetime') else original_start
+            new_end = (datetime.fromisoformat(merged['end_datetime']) if merged.get('end_datetime')
+                       else new_start + (event.end_datetime - event.start_datetime))
+            if new_end < new_start:
+                return jsonify({'error': 'Occurrence end_datetime must not be before start_datetime'}), 400
+            overrides[key] = merged
+            if key in exceptions:
+                exceptions.remove(key)
+            message = 'Occurrence updated successfully'
+        
+        event.recurrence_overrides = overrides
+        event.recurrence_exceptions = exceptions
+        event.updated_at = datetime.utcnow()
+        db.session.commit()
+        recurrence_service.invalidate(event.id)
+        agenda_service.invalidate_event(current_user_id, EventParticipant.emails_of(event))
         
         return jsonify({
-            'events': [event.to_dict() for event in events],
-            'count': len(events)
+            'message': message,
+            'event': event.to_dict()
         })
     
     except Exception as e:
+        db.session.rollback()
         return jsonify({'error': str(e)}), 500
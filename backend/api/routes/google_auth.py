@@ -1,7 +1,10 @@
 from flask import Blueprint, request, jsonify, redirect
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
 from bl.services.google_auth_service import GoogleAuthService
-from dal.models import User
+from bl.services.preview_snapshot_service import preview_snapshot_service
+from bl.services.google_token_manager import google_token_manager
+from bl.services.google_sync_job_service import google_sync_job_service
+from dal.models import User, GoogleSyncJob
 from dal.database import db
 from datetime import datetime
 import logging
@@ -67,25 +70,14 @@ def google_auth_callback():
         # Create or update user
         user = google_auth_service.create_or_update_user(user_info, tokens)
         
-        # Auto-sync Google data after successful authentication
+        # Initial sync runs in the background; the frontend polls /auth/google/sync-status
+        sync_job_id = None
         try:
-            logger.info(f"Auto-syncing Google data for user {user.id}")
-            
-            # Sync contacts
-            contacts_synced = google_auth_service.sync_contacts(user)
-            logger.info(f"Auto-synced {contacts_synced} contacts for user {user.id}")
-            
-            # Sync calendar events
-            events_synced = google_auth_service.sync_calendar_events(user)
-            logger.info(f"Auto-synced {events_synced} events for user {user.id}")
-            
-            # Update sync timestamps
-            user.google_contacts_synced_at = datetime.utcnow()
-            user.google_calendar_synced_at = datetime.utcnow()
-            db.session.commit()
-            
+            sync_job_id = google_sync_job_service.enqueue(user).id
+            logger.info(f"Queued Google sync job {sync_job_id} for user {user.id}")
         except Exception as sync_error:
-            logger.warning(f"Auto-sync failed for user {user.id}: {str(sync_error)}")
+            logger.warning(f"Could not queue Google sync for user {user.id}: {str(sync_error)}")
+            db.session.rollback()
             # Don't fail the authentication if sync fails
         
         # Create JWT token
@@ -94,6 +86,8 @@ def google_auth_callback():
         # Redirect to frontend with success and token
         frontend_url = "https://d2fq8k5py78ii.cloudfront.net/auth/google/callback"
         redirect_url = f"{frontend_url}?success=true&token={access_token}"
+        if sync_job_id:
+            redirect_url += f"&sync_job={sync_job_id}"
         
         return redirect(redirect_url)
         
@@ -149,6 +143,7 @@ def google_auth_link():
         
         user.updated_at = datetime.utcnow()
         db.session.commit()
+        google_token_manager.forget(user.id)
         
         return jsonify({
             'message': 'Google account linked successfully',
@@ -181,10 +176,13 @@ def google_auth_revoke():
         user.google_refresh_token = None
         user.google_token_expires_at = None
         user.google_contacts_synced_at = None
+        user.google_contacts_sync_token = None
         user.google_calendar_synced_at = None
+        user.google_calendar_sync_token = None
         user.updated_at = datetime.utcnow()
         
         db.session.commit()
+        google_token_manager.forget(user.id)
         
         logger.info(f"Successfully cleared Google data for user {user.id}")
         
@@ -217,10 +215,13 @@ def google_auth_clear():
         user.google_refresh_token = None
         user.google_token_expires_at = None
         user.google_contacts_synced_at = None
+        user.google_contacts_sync_token = None
         user.google_calendar_synced_at = None
+        user.google_calendar_sync_token = None
         user.updated_at = datetime.utcnow()
         
         db.session.commit()
+        google_token_manager.forget(user.id)
         
         logger.info(f"Successfully cleared Google data for user {user.id}")
         
@@ -373,6 +374,24 @@ def google_auth_status():
         logger.error(f"Error getting Google auth status: {str(e)}")
         return jsonify({'error': 'Failed to get Google auth status'}), 500
         
+@google_auth_bp.route('/auth/google/sync-status', methods=['GET'])
+@jwt_required()
+def google_sync_status():
+    """Status and per-resource progress of the user's latest background Google sync"""
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        
+        if not user:
+            return jsonify({'error': 'User not found'}), 404
+        
+        job = GoogleSyncJob.get_latest_for_user(user.id)
+        return jsonify({'job': job.to_dict() if job else None})
+        
+    except Exception as e:
+        logger.error(f"Error getting Google sync status: {str(e)}")
+        return jsonify({'error': 'Failed to get Google sync status'}), 500
+
 @google_auth_bp.route('/auth/google/preview-contacts', methods=['POST'])
 @jwt_required()
 def preview_google_contacts():
@@ -397,8 +416,12 @@ def preview_google_contacts():
         preview_data = google_auth_service.get_contacts_preview(user)
         print(f"📊 Retrieved {len(preview_data)} contacts for preview")
         
+        # Keep the preview so sync-selected applies exactly these items
+        preview_id = preview_snapshot_service.save(user.id, 'contacts', preview_data)
+        
         return jsonify({
             'success': True,
+            'preview_id': preview_id,
             'preview_data': preview_data,
             'total_contacts': len(preview_data),
             'new_contacts': len([c for c in preview_data if not c['is_duplicate']]),
@@ -430,8 +453,12 @@ def preview_google_calendar():
         # Get preview data
         preview_data = google_auth_service.get_calendar_events_preview(user)
         
+        # Keep the preview so sync-selected applies exactly these items
+        preview_id = preview_snapshot_service.save(user.id, 'calendar', preview_data)
+        
         return jsonify({
             'success': True,
+            'preview_id': preview_id,
             'preview_data': preview_data,
             'total_events': len(preview_data),
             'new_events': len([e for e in preview_data if not e['is_duplicate']]),
@@ -461,8 +488,12 @@ def sync_selected_contacts():
         selected_indices = data.get('selected_indices', [])
         show_duplicates = data.get('show_duplicates', False)
         
-        # Get preview data
-        preview_data = google_auth_service.get_contacts_preview(user)
+        # Use the snapshot of the preview the user selected from; fetch again only if it expired
+        preview_id = data.get('preview_id')
+        preview_data = preview_snapshot_service.get(user.id, 'contacts', preview_id)
+        if preview_data is None:
+            logger.info(f"No contacts preview snapshot for user {user.id}, fetching from Google")
+            preview_data = google_auth_service.get_contacts_preview(user)
         
         # Filter based on show_duplicates flag
         if show_duplicates:
@@ -492,6 +523,7 @@ def sync_selected_contacts():
         import uuid
         
         synced_count = 0
+        imported = []
         for contact in selected_contacts:
             # Generate unique email for contacts without email to avoid constraint violation
             email = contact.get('email', '').strip()
@@ -530,17 +562,28 @@ def sync_selected_contacts():
                 phone=contact.get('phone', ''),
                 job_title=contact.get('job_title', ''),
                 owner_id=user.id,
-                source='google_contacts'
+                source='google_contacts',
+                google_contact_id=contact.get('google_id') or None
             )
             db.session.add(person)
+            imported.append(person)
             synced_count += 1
         
+        # The preview only listed basic fields; fetch details for the imported contacts alone
+        try:
+            google_auth_service.enrich_contacts(user, imported)
+        except Exception as e:
+            logger.warning(f"Could not fetch details of imported Google contacts: {str(e)}")
+        
         db.session.commit()
         
         # Update sync timestamp
         user.google_contacts_synced_at = datetime.utcnow()
         db.session.commit()
         
+        # Imported items are duplicates now; the next selection needs a fresh preview
+        preview_snapshot_service.discard(user.id, preview_id)
+        
         return jsonify({
             'success': True,
             'contacts_synced': synced_count,
@@ -570,8 +613,12 @@ def sync_selected_calendar():
         selected_indices = data.get('selected_indices', [])
         show_duplicates = data.get('show_duplicates', False)
         
-        # Get preview data
-        preview_data = google_auth_service.get_calendar_events_preview(user)
+        # Use the snapshot of the preview the user selected from; fetch again only if it expired
+        preview_id = data.get('preview_id')
+        preview_data = preview_snapshot_service.get(user.id, 'calendar', preview_id)
+        if preview_data is None:
+            logger.info(f"No calendar preview snapshot for user {user.id}, fetching from Google")
+            preview_data = google_auth_service.get_calendar_events_preview(user)
         
         # Filter based on show_duplicates flag
         if show_duplicates:
@@ -583,7 +630,7 @@ def sync_selected_calendar():
         selected_events = [items_to_sync[i] for i in selected_indices if i < len(items_to_sync)]
         
         # Import here to avoid circular imports
-        from dal.models import Event
+        from dal.models import Event, EventParticipant
         import uuid
         
         synced_count = 0
@@ -595,11 +642,14 @@ def sync_selected_calendar():
                 end_datetime=datetime.fromisoformat(event_data['end_datetime']),
                 location=event_data['location'],
                 google_event_id=event_data['google_event_id'],
+                participants=event_data.get('participants', []),
                 owner_id=user.id,
                 user_id=user.id,
                 is_active=True
             )
             db.session.add(event)
+            db.session.flush()
+            EventParticipant.sync_from_event(event)
             synced_count += 1
         
         db.session.commit()
@@ -608,6 +658,9 @@ def sync_selected_calendar():
         user.google_calendar_synced_at = datetime.utcnow()
         db.session.commit()
         
+        # Imported items are duplicates now; the next selection needs a fresh preview
+        preview_snapshot_service.discard(user.id, preview_id)
+        
         return jsonify({
             'success': True,
             'events_synced': synced_count,
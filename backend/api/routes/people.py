@@ -4,6 +4,7 @@ from dal.models import Person, User
 from dal.database import db
 from datetime import datetime
 from bl.services.notification_service import notify_contact_shared
+from bl.services.agenda_service import agenda_service
 import uuid
 import logging
 
@@ -103,6 +104,7 @@ def create_person():
         
         db.session.add(person)
         db.session.commit()
+        agenda_service.invalidate(current_user_id)
         
         return jsonify(person.to_dict()), 201
         
@@ -184,6 +186,7 @@ def update_person(person_id):
         print(f"🔍 PEOPLE UPDATE: Data custom_fields: {data.get('custom_fields')}")
         
         db.session.commit()
+        agenda_service.invalidate(person.owner_id)
         
         return jsonify(person.to_dict())
         
@@ -211,6 +214,7 @@ def delete_person(person_id):
         
         db.session.delete(person)
         db.session.commit()
+        agenda_service.invalidate(current_user_id)
         
         return jsonify({'message': 'Person deleted successfully'})
         
@@ -231,6 +235,7 @@ def delete_all_people():
         # Delete all people owned by this user
         deleted_count = Person.query.filter_by(owner_id=current_user_id).delete()
         db.session.commit()
+        agenda_service.invalidate(current_user_id)
         
         return jsonify({'message': f'Successfully deleted {deleted_count} people'})
         
@@ -1,9 +1,11 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from dal.models import Task, User
+from dal.models import Task, User, ProjectParticipant, TaskArchive
 from dal.database import db
 from datetime import datetime
-from bl.services.notification_service import notify_task_assigned, notify_task_updated
+from bl.services.notification_service import notify_task_assigned, notify_task_updated, notify_project_participants_added
+from bl.services.task_archive_service import task_archive_service
+from bl.services.agenda_service import agenda_service
 import uuid
 
 tasks_bp = Blueprint('tasks', __name__)
@@ -56,19 +58,15 @@ def get_projects():
         if not current_user or not current_user.is_approved:
             return jsonify({'error': 'Unauthorized'}), 403
         
+        include_archived = request.args.get('include_archived', 'false').lower() == 'true'
+        
         print(f"🚀 APP VERSION: 12.8 - FIX PROJECTS CORS")
-        print(f"📋 GET /projects - user_id: {current_user_id}")
+        print(f"📋 GET /projects - user_id: {current_user_id}, include_archived: {include_archived}")
         
-        # First, let's check if there are any tasks for this user at all
+        # Count only - archived tasks live in tasks_archive and are not scanned here
         total_tasks = Task.query.filter(Task.owner_id == current_user_id).count()
         print(f"📊 Total tasks for user {current_user_id}: {total_tasks}")
         
-        # Get all tasks for this user to debug
-        all_tasks = Task.query.filter(Task.owner_id == current_user_id).all()
-        print(f"📋 All tasks for user:")
-        for task in all_tasks:
-            print(f"  - Task {task.id}: project='{task.project}', status='{task.status}'")
-        
         # Get distinct projects from tasks table for this user
         distinct_projects = db.session.query(Task.project).filter(
             Task.owner_id == current_user_id,
@@ -77,8 +75,17 @@ def get_projects():
         ).distinct().all()
         
         # Extract project names and sort them
-        projects = [project[0] for project in distinct_projects if project[0]]
-        projects.sort()
+        projects = set(project[0] for project in distinct_projects if project[0])
+        
+        if include_archived:
+            archived_projects = db.session.query(TaskArchive.project).filter(
+                TaskArchive.owner_id == current_user_id,
+                TaskArchive.project.isnot(None),
+                TaskArchive.project != ''
+            ).distinct().all()
+            projects.update(project[0] for project in archived_projects if project[0])
+        
+        projects = sorted(projects)
         
         print(f"📊 Found {len(projects)} distinct projects: {projects}")
         
@@ -88,7 +95,7 @@ def get_projects():
             'total_tasks': total_tasks,
             'debug_info': {
                 'user_id': current_user_id,
-                'all_tasks_count': len(all_tasks)
+                'all_tasks_count': total_tasks
             }
         })
         
@@ -111,56 +118,52 @@ def get_tasks():
         project = request.args.get('project')
         status = request.args.get('status')
         include_scheduled = request.args.get('include_scheduled', 'true').lower() == 'true'
+        include_archived = request.args.get('include_archived', 'false').lower() == 'true'
         
         print(f"🚀 APP VERSION: 8.0 - BACKEND STATUS FILTER FIX")
         print(f"📋 GET /tasks - project: {project}, status: {status}, include_scheduled: {include_scheduled}")
         print(f"🔍 USER DEBUG: Current user ID: {current_user_id}, Email: {current_user.email}")
         
-        # Build query - include tasks owned by user OR where user is a participant
-        from sqlalchemy import or_, text
-        query = Task.query.filter(
-            or_(
-                Task.owner_id == current_user_id,
-                text("participants @> :email").params(email=f'["{current_user.email}"]')
-            )
-        )
-        
-        # Handle missing columns gracefully
+        # Filters apply to both branches - tasks owned by the user and tasks in projects shared with them
+        criteria = []
         if project:
-            # Check if project column exists, otherwise filter by text/notes
-            try:
-                query = query.filter(Task.project == project)
-            except:
-                # Fallback to text field if project column doesn't exist
-                query = query.filter(Task.text.ilike(f'%{project}%'))
+            criteria.append(Task.project == project)
         
         if status:
             # Handle comma-separated status values
             if ',' in status:
                 status_list = [s.strip() for s in status.split(',')]
-                query = query.filter(Task.status.in_(status_list))
+                criteria.append(Task.status.in_(status_list))
             else:
-                query = query.filter(Task.status == status)
+                criteria.append(Task.status == status)
         
         if not include_scheduled:
             # Only show active tasks (not scheduled for future)
-            try:
-                query = query.filter(Task.is_active == True)
-            except:
-                # If is_active column doesn't exist, don't filter
-                pass
-        
-        # Handle ordering gracefully
-        try:
-            tasks = query.order_by(Task.project.asc(), Task.priority.desc(), Task.created_at.desc()).all()
-        except:
-            # Fallback ordering if project column doesn't exist
-            tasks = query.order_by(Task.priority.desc(), Task.created_at.desc()).all()
+            criteria.append(Task.is_active == True)
+        
+        query = ProjectParticipant.visible_query(Task, current_user_id, current_user.email, *criteria)
+        tasks = query.order_by(Task.project.asc(), Task.priority_rank.desc(), Task.created_at.desc()).all()
         
         print(f"📊 Found {len(tasks)} tasks")
         for task in tasks:
             print(f"  - Task: {getattr(task, 'title', 'No title')} | Status: {task.status} | Project: {getattr(task, 'project', 'No project')}")
         
+        # Archived tasks are only read when explicitly requested
+        archived_tasks = []
+        if include_archived:
+            archived_criteria = []
+            if project:
+                archived_criteria.append(TaskArchive.project == project)
+            if status:
+                archived_criteria.append(TaskArchive.status.in_([s.strip() for s in status.split(',')]))
+            archived_query = ProjectParticipant.visible_query(
+                TaskArchive, current_user_id, current_user.email, *archived_criteria)
+            archived_tasks = archived_query.order_by(TaskArchive.project.asc(), TaskArchive.created_at.desc()).all()
+        
+        # Project membership is stored once per project - load it for all owners in one query
+        owner_ids = {task.owner_id for task in tasks} | {archived.owner_id for archived in archived_tasks}
+        project_participants = ProjectParticipant.get_participants_by_project(owner_ids)
+        
         # Group tasks by project
         projects = {}
         for task in tasks:
@@ -168,13 +171,21 @@ def get_tasks():
             project_name = getattr(task, 'project', None) or 'personal'
             if project_name not in projects:
                 projects[project_name] = []
-            projects[project_name].append(task.to_dict())
+            task_dict = task.to_dict()
+            task_dict['participants'] = project_participants.get((task.owner_id, task.project), [])
+            projects[project_name].append(task_dict)
+        
+        for archived in archived_tasks:
+            project_name = archived.project or 'personal'
+            task_dict = archived.to_dict()
+            task_dict['participants'] = project_participants.get((archived.owner_id, archived.project), [])
+            projects.setdefault(project_name, []).append(task_dict)
         
         print(f"📁 Grouped into {len(projects)} projects: {list(projects.keys())}")
         
         return jsonify({
             'projects': projects,
-            'total_tasks': len(tasks)
+            'total_tasks': len(tasks) + len(archived_tasks)
         })
         
     except Exception as e:
@@ -256,6 +267,7 @@ def create_task():
         
         db.session.add(task)
         db.session.commit()
+        agenda_service.invalidate(task.owner_id)
         
         # Notify assigned user about the new task
         if assign_to_email and assign_to_email != current_user.email:
@@ -291,10 +303,9 @@ def update_task(task_id):
             return jsonify({'error': 'Task not found'}), 404
         
         # Check if user owns this task OR is a participant in the project
-        from sqlalchemy import or_, text
         user_can_edit = (
             task.owner_id == current_user_id or
-            text("participants @> :email").params(email=f'["{current_user.email}"]').evaluate(task.participants)
+            ProjectParticipant.is_participant(task.owner_id, task.project, current_user.email)
         )
         
         if not user_can_edit:
@@ -348,6 +359,7 @@ def update_task(task_id):
         task.updated_at = datetime.utcnow()
         
         db.session.commit()
+        agenda_service.invalidate(task.owner_id)
         
         # Notify assigned user about the task update
         if task.assign_to and task.assign_to != current_user.email:
@@ -379,6 +391,7 @@ def delete_task(task_id):
         
         db.session.delete(task)
         db.session.commit()
+        agenda_service.invalidate(current_user_id)
         
         return jsonify({'message': 'Task deleted successfully'})
         
@@ -397,21 +410,11 @@ def get_project_participants(project_name):
         if not current_user or not current_user.is_approved:
             return jsonify({'error': 'Unauthorized'}), 403
         
-        # Get all tasks for this project owned by current user
-        project_tasks = Task.query.filter(
-            Task.project == project_name,
-            Task.owner_id == current_user_id
-        ).all()
-        
-        # Get unique participants from all tasks in this project
-        all_participants = set()
-        for task in project_tasks:
-            if task.participants:
-                all_participants.update(task.participants)
+        participants = ProjectParticipant.get_participants(current_user_id, project_name)
         
         return jsonify({
             'success': True,
-            'participants': list(all_participants)
+            'participants': participants
         })
         
     except Exception as e:
@@ -420,7 +423,7 @@ def get_project_participants(project_name):
 @tasks_bp.route('/projects/<project_name>/participants', methods=['POST'])
 @jwt_required()
 def update_project_participants(project_name):
-    """Update participants for all tasks in a project"""
+    """Update participants of a project (visible on all of its tasks)"""
     try:
         current_user_id = get_jwt_identity()
         current_user = User.query.get(current_user_id)
@@ -441,23 +444,75 @@ def update_project_participants(project_name):
             if invalid_participants:
                 return jsonify({'error': f'Invalid participants: {invalid_participants}. Only group members can be added to projects.'}), 400
         
-        # Update all tasks in this project owned by current user
-        project_tasks = Task.query.filter(
-            Task.project == project_name,
-            Task.owner_id == current_user_id
-        ).all()
+        # Membership is stored once per project, so only the changed members are written
+        added, removed = ProjectParticipant.set_participants(current_user_id, project_name, participants)
+        db.session.commit()
         
-        updated_count = 0
-        for task in project_tasks:
-            task.participants = participants
-            updated_count += 1
+        if added:
+            notify_project_participants_added(current_user.email, project_name, added)
         
-        db.session.commit()
+        return jsonify({
+            'success': True,
+            'message': f'Updated participants for project "{project_name}"',
+            'participants': ProjectParticipant.get_participants(current_user_id, project_name),
+            'added': added,
+            'removed': removed
+        })
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@tasks_bp.route('/tasks/archive', methods=['POST'])
+@jwt_required()
+def archive_tasks():
+    """Move the current user's completed/cancelled tasks to the archive"""
+    try:
+        current_user_id = get_jwt_identity()
+        current_user = User.query.get(current_user_id)
+        
+        if not current_user or not current_user.is_approved:
+            return jsonify({'error': 'Unauthorized'}), 403
+        
+        data = request.get_json(silent=True) or {}
+        older_than_days = data.get('older_than_days')
+        if older_than_days is not None:
+            try:
+                older_than_days = int(older_than_days)
+            except (TypeError, ValueError):
+                return jsonify({'error': f'Invalid older_than_days: {older_than_days}'}), 400
+        
+        archived_count = task_archive_service.archive_finished_tasks(
+            owner_id=current_user_id,
+            older_than_days=older_than_days
+        )
         
         return jsonify({
             'success': True,
-            'message': f'Updated participants for {updated_count} tasks in project "{project_name}"',
-            'participants': participants
+            'archived_count': archived_count
+        })
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@tasks_bp.route('/tasks/<task_id>/restore', methods=['POST'])
+@jwt_required()
+def restore_task(task_id):
+    """Move an archived task back to the active tasks"""
+    try:
+        current_user_id = get_jwt_identity()
+        current_user = User.query.get(current_user_id)
+        
+        if not current_user or not current_user.is_approved:
+            return jsonify({'error': 'Unauthorized'}), 403
+        
+        task = task_archive_service.restore_task(task_id, current_user_id)
+        if not task:
+            return jsonify({'error': 'Archived task not found'}), 404
+        
+        return jsonify({
+            'message': 'Task restored successfully',
+            'task': task.to_dict()
         })
         
     except Exception as e:
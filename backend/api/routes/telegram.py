@@ -1,15 +1,18 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from dal.models import User, Person, Task, Event
+from dal.models import User, Person, Task, Event, EventParticipant
 from dal.database import db
 from bl.services.messaging_service import messaging_service
 from bl.services.message_formatter import message_formatter
+from bl.services.telegram_update_service import telegram_update_service
+from bl.services.agenda_service import agenda_service
 from datetime import datetime, timedelta
 import uuid
 import requests
 import os
 import openai
 import json
+import re
 import logging
 
 # Configure logging for Telegram bot
@@ -21,6 +24,12 @@ telegram_bp = Blueprint('telegram', __name__)
 # Initialize OpenAI
 openai.api_key = os.getenv('OPENAI_API_KEY')
 
+# Whole-message agenda requests: "/agenda", "my agenda tomorrow", "what's on today?", "my day"
+AGENDA_COMMAND = re.compile(
+    r"^(?:/agenda|(?:show\s+)?(?:my\s+)?agenda|(?:show\s+)?my\s+day|what'?s\s+on)"
+    r"(?:\s+(?:for\s+)?(today|tomorrow))?[\s?!.]*$"
+)
+
 # Admin user ID for notifications
 ADMIN_TELEGRAM_ID = 1001816902
 
@@ -413,8 +422,13 @@ def process_simple_commands(text: str, user: User) -> str:
     text_lower = text.lower().strip()
     
     
+    # Agenda - events, tasks and follow-ups together; only whole commands, so "add task plan my day" is left alone
+    agenda_match = AGENDA_COMMAND.match(text_lower)
+    if agenda_match:
+        return show_agenda_from_telegram({"period": agenda_match.group(1) or "today"}, user)
+    
     # Task commands - order matters! More specific patterns first
-    if any(phrase in text_lower for phrase in ['show done tasks', 'done tasks', 'completed tasks']):
+    elif any(phrase in text_lower for phrase in ['show done tasks', 'done tasks', 'completed tasks']):
         return show_tasks_from_telegram({"status": "done"}, user)
     
     elif any(phrase in text_lower for phrase in ['show all tasks', 'all tasks']):
@@ -822,10 +836,19 @@ def show_tasks_from_telegram(args: dict, user: User) -> str:
         # Order by due_date, then by created_at
         tasks = query.order_by(Task.due_date.asc().nulls_last(), Task.created_at.desc()).limit(20).all()
         
-        if not tasks:
+        # Finished tasks older than the archive window live in tasks_archive - only read on request
+        archived_tasks = []
+        if args.get('include_archived') and status_filter in ('all', 'done') and len(tasks) < 20:
+            from dal.models import TaskArchive
+            archived_query = TaskArchive.query.filter(TaskArchive.owner_id == user.id)
+            if project_filter:
+                archived_query = archived_query.filter(TaskArchive.project == project_filter)
+            archived_tasks = archived_query.order_by(TaskArchive.created_at.desc()).limit(20 - len(tasks)).all()
+        
+        if not tasks and not archived_tasks:
             return "📝 No tasks found."
         
-        response = f"📝 Found {len(tasks)} task(s):\n\n"
+        response = f"📝 Found {len(tasks) + len(archived_tasks)} task(s):\n\n"
         for task in tasks:
             status_emoji = "✅" if task.status == "done" else "🔄" if task.status == "in_progress" else "⏳"
             priority_emoji = "🔥" if task.priority == "high" else "🔹" if task.priority == "low" else "📌"
@@ -848,6 +871,17 @@ def show_tasks_from_telegram(args: dict, user: User) -> str:
                 response += f"📝 Notes: {task.notes}\n"
             response += "\n"
         
+        if archived_tasks:
+            response += f"🗄️ Archived ({len(archived_tasks)}):\n\n"
+            for archived in archived_tasks:
+                response += f"• <b>{archived.title or 'Untitled Task'}</b>\n"
+                if archived.project:
+                    response += f"📁 {archived.project}\n"
+                response += f"✅ Status: {archived.status}\n"
+                if archived.due_date:
+                    response += f"📅 Due: {archived.due_date.strftime('%Y-%m-%d %H:%M')}\n"
+                response += "\n"
+        
         return response
         
     except Exception as e:
@@ -920,6 +954,7 @@ def add_people_from_telegram(args: list, user: User) -> str:
                 results.append(f"{person.first_name} {person.last_name or ''}".strip())
         
         db.session.commit()
+        agenda_service.invalidate(user.id)
         
         telegram_logger.info(f"✅ Added {len(results)} people: {results}")
         if results:
@@ -1040,6 +1075,7 @@ def update_task_from_telegram(args: dict, user: User) -> str:
         
         task.updated_at = datetime.utcnow()
         db.session.commit()
+        agenda_service.invalidate(task.owner_id)
         
         telegram_logger.info(f"✅ Task updated: {task_id} - {task.title or task.text}")
         return f"✅ Task '{task.title or task.text}' updated successfully!"
@@ -1130,6 +1166,7 @@ def update_person_from_telegram(args: dict, user: User) -> str:
         
         person.updated_at = datetime.utcnow()
         db.session.commit()
+        agenda_service.invalidate(user.id)
         
         telegram_logger.info(f"✅ Person updated: {person_id} - {person.full_name}")
         return f"✅ Person '{person.full_name}' updated successfully!"
@@ -1161,6 +1198,7 @@ def delete_person_from_telegram(args: any, user: User) -> str:
         person_name = person.full_name
         db.session.delete(person)
         db.session.commit()
+        agenda_service.invalidate(user.id)
         
         telegram_logger.info(f"✅ Person deleted: {person_id} - {person_name}")
         return f"✅ Person '{person_name}' deleted successfully!"
@@ -1200,6 +1238,7 @@ def add_person_from_telegram(args: dict, user: User) -> str:
         
         db.session.add(person)
         db.session.commit()
+        agenda_service.invalidate(user.id)
         
         return f"✅ Added {person.full_name} to your contacts!"
         
@@ -1283,6 +1322,7 @@ def add_task_from_telegram(args: dict, user: User) -> str:
         
         db.session.add(task)
         db.session.commit()
+        agenda_service.invalidate(user.id)
         
         return f"✅ Added task: {task.text}"
         
@@ -1429,13 +1469,39 @@ def telegram_check():
 
 @telegram_bp.route('/telegram/webhook', methods=['POST'])
 def telegram_webhook():
-    """Handle Telegram webhook"""
+    """Store a Telegram update and acknowledge it; a background worker processes it"""
     try:
-        data = request.get_json()
-        telegram_logger.info(f"📨 Webhook received: {json.dumps(data, indent=2)}")
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Invalid update'}), 400
+        
+        update = telegram_update_service.enqueue(data)
+        if not update:
+            # Redelivered by Telegram; already stored and processed or on its way
+            telegram_logger.info(f"🔁 Duplicate update {data.get('update_id')} acknowledged")
+            return jsonify({'status': 'ok', 'duplicate': True})
+        
+        telegram_logger.info(f"📨 Webhook stored update {update.update_id} for chat {update.chat_id}")
+        return jsonify({'status': 'ok'})
+        
+    except Exception as e:
+        # Not acknowledged, so Telegram delivers the update again
+        telegram_logger.error(f"💥 Error storing Telegram update: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+def process_telegram_update(data):
+    """Handle one stored Telegram update; returns the reply sent, if any"""
+    user_id = None
+    try:
+        telegram_logger.info(f"📨 Processing update: {json.dumps(data, indent=2)}")
+        
+        if 'callback_query' in data:
+            # Inline keyboard presses, e.g. approving a voice transcription
+            handle_callback_query(data['callback_query'])
+            return None
         
         if 'message' not in data:
-            return jsonify({'status': 'ok'})
+            return None
         
         message = data['message']
         chat_id = message['chat']['id']
@@ -1519,6 +1585,7 @@ To use this bot, you need to connect your Telegram account via the webapp first.
                         if task:
                             db.session.delete(task)
                             db.session.commit()
+                            agenda_service.invalidate(user.id)
                             
                             # Reset state
                             user.state_data = None
@@ -1586,13 +1653,11 @@ To use this bot, you need to connect your Telegram account via the webapp first.
         except Exception as e:
             telegram_logger.error(f"💥 Error sending message to user {user.full_name}: {str(e)}")
         
-        return jsonify({'status': 'ok', 'response': response_text})
+        return response_text
         
     except Exception as e:
-        telegram_logger.error(f"💥 Error processing Telegram webhook for user {user_id}: {str(e)}")
-        return jsonify({'error': str(e)}), 500
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        telegram_logger.error(f"💥 Error processing Telegram update for user {user_id}: {str(e)}")
+        raise
 
 @telegram_bp.route('/telegram/status', methods=['GET'])
 @jwt_required()
@@ -1619,6 +1684,32 @@ def telegram_status():
         return jsonify({'error': str(e)}), 500
 
 # EVENT FUNCTIONS
+def format_event_conflicts(user: User, event: Event) -> str:
+    """Warning lines for events overlapping the given one (empty when there are none)"""
+    try:
+        from bl.services.availability_service import availability_service
+        
+        participant_emails = [p['email'] for p in event.participants or [] if isinstance(p, dict) and p.get('email')]
+        result = availability_service.find_conflicts(
+            user, event.start_datetime, event.end_datetime, participant_emails, exclude_event_id=event.id
+        )
+        if not result['has_conflicts']:
+            return ""
+        
+        warning = "\n\n⚠️ <b>Overlaps with:</b>\n"
+        for conflict in result['conflicts'][:5]:
+            start = datetime.fromisoformat(conflict['start_datetime']).strftime('%Y-%m-%d %H:%M')
+            end = datetime.fromisoformat(conflict['end_datetime']).strftime('%H:%M')
+            people = ', '.join(email for email in conflict['people'] if email != user.email.lower())
+            warning += f"• {conflict['title']} ({start}-{end})"
+            warning += f" - {people}\n" if people else " - you\n"
+        if len(result['conflicts']) > 5:
+            warning += f"…and {len(result['conflicts']) - 5} more\n"
+        return warning
+    except Exception as e:
+        telegram_logger.error(f"💥 Error checking event conflicts: {str(e)}")
+        return ""
+
 def add_event_from_telegram(args: dict, user: User) -> str:
     """Add an event from Telegram request"""
     try:
@@ -1690,15 +1781,44 @@ def add_event_from_telegram(args: dict, user: User) -> str:
         )
         
         db.session.add(event)
+        db.session.flush()
+        EventParticipant.sync_from_event(event)
         db.session.commit()
+        agenda_service.invalidate_event(user.id, EventParticipant.emails_of(event))
         
         telegram_logger.info(f"✅ Event created: {event.id} - {event.title}")
-        return f"✅ Event '{event.title}' created successfully!"
+        return f"✅ Event '{event.title}' created successfully!" + format_event_conflicts(user, event)
         
     except Exception as e:
         telegram_logger.error(f"💥 Error adding event: {str(e)}")
         return f"❌ Failed to add event. Please try again."
 
+def show_agenda_from_telegram(args: dict, user: User) -> str:
+    """Show today's (or tomorrow's) agenda: events, tasks, follow-ups and birthdays"""
+    try:
+        
+        start_of_day = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        if args.get('period') == 'tomorrow':
+            start_of_day += timedelta(days=1)
+        items = agenda_service.get_agenda(user, start_of_day, start_of_day + timedelta(days=1))
+        
+        if not items:
+            return f"📅 Nothing on your agenda for {start_of_day.strftime('%Y-%m-%d')}."
+        
+        icons = {'event': '📅', 'task_due': '⏰', 'task_scheduled': '🗓️', 'follow_up': '🤝', 'birthday': '🎂'}
+        response = f"📋 <b>Agenda for {start_of_day.strftime('%Y-%m-%d')}:</b>\n\n"
+        for item in items:
+            when = '' if item.get('all_day') else datetime.fromisoformat(item['time']).strftime('%H:%M') + ' '
+            if item.get('end_time'):
+                when = when.strip() + '-' + datetime.fromisoformat(item['end_time']).strftime('%H:%M') + ' '
+            response += f"{icons.get(item['type'], '•')} {when}<b>{item['title']}</b>\n"
+        
+        return response
+        
+    except Exception as e:
+        telegram_logger.error(f"💥 Error showing agenda: {str(e)}")
+        return f"❌ Failed to show agenda. Please try again."
+
 def show_events_from_telegram(args: dict, user: User) -> str:
     """Show events from Telegram request"""
     try:
@@ -1716,12 +1836,12 @@ def show_events_from_telegram(args: dict, user: User) -> str:
         # Build query - include events where user is owner OR participant
         from sqlalchemy import or_, and_, text
         
-        # Single query with OR conditions to avoid UNION issues with JSON fields
+        # Owner OR invited - invitations are an indexed lookup on event_participants
         query = Event.query.filter(
             Event.is_active == True,
             or_(
                 Event.user_id == user.id,  # User is the owner
-                Event.participants.op('@>')(f'[{{"email": "{user.email}"}}]')  # User is a participant
+                EventParticipant.invited_clause(Event, user.email)  # User is a participant
             )
         )
         telegram_logger.info(f"📅 Base query: user_id={user.id} OR participant email={user.email}, is_active=True")
@@ -1730,62 +1850,52 @@ def show_events_from_telegram(args: dict, user: User) -> str:
         now = datetime.utcnow()
         telegram_logger.info(f"📅 Current time: {now}")
         
-        # Apply date filters
+        # Work out the window: explicit dates win, otherwise the named period
+        window_start = None
+        window_end = None
+        
         if start_date:
             try:
-                start_datetime = datetime.strptime(start_date, '%Y-%m-%d %H:%M')
-                query = query.filter(Event.start_datetime >= start_datetime)
-                telegram_logger.info(f"📅 Applied start_date filter: {start_datetime}")
+                window_start = datetime.strptime(start_date, '%Y-%m-%d %H:%M')
             except ValueError:
                 try:
-                    start_datetime = datetime.fromisoformat(start_date.replace('Z', ''))
-                    query = query.filter(Event.start_datetime >= start_datetime)
-                    telegram_logger.info(f"📅 Applied start_date filter (isoformat): {start_datetime}")
+                    window_start = datetime.fromisoformat(start_date.replace('Z', ''))
                 except:
                     return f"❌ Invalid start_date format: {start_date}"
+            telegram_logger.info(f"📅 Applied start_date filter: {window_start}")
         
         if end_date:
             try:
-                end_datetime = datetime.strptime(end_date, '%Y-%m-%d %H:%M')
-                query = query.filter(Event.start_datetime <= end_datetime)
-                telegram_logger.info(f"📅 Applied end_date filter: {end_datetime}")
+                window_end = datetime.strptime(end_date, '%Y-%m-%d %H:%M')
             except ValueError:
                 try:
-                    end_datetime = datetime.fromisoformat(end_date.replace('Z', ''))
-                    query = query.filter(Event.start_datetime <= end_datetime)
-                    telegram_logger.info(f"📅 Applied end_date filter (isoformat): {end_datetime}")
+                    window_end = datetime.fromisoformat(end_date.replace('Z', ''))
                 except:
                     return f"❌ Invalid end_date format: {end_date}"
+            telegram_logger.info(f"📅 Applied end_date filter: {window_end}")
         
         # Apply period filter only if no specific dates are provided
         if not start_date and not end_date:
+            start_of_today = now.replace(hour=0, minute=0, second=0, microsecond=0)
             if period == 'today':
-                start_of_day = now.replace(hour=0, minute=0, second=0, microsecond=0)
-                end_of_day = start_of_day + timedelta(days=1)
-                query = query.filter(Event.start_datetime >= start_of_day, Event.start_datetime < end_of_day)
-                telegram_logger.info(f"📅 Applied today filter: {start_of_day} to {end_of_day}")
+                window_start, window_end = start_of_today, start_of_today + timedelta(days=1)
             elif period == 'tomorrow':
-                start_of_tomorrow = now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
-                end_of_tomorrow = start_of_tomorrow + timedelta(days=1)
-                query = query.filter(Event.start_datetime >= start_of_tomorrow, Event.start_datetime < end_of_tomorrow)
-                telegram_logger.info(f"📅 Applied tomorrow filter: {start_of_tomorrow} to {end_of_tomorrow}")
+                window_start = start_of_today + timedelta(days=1)
+                window_end = window_start + timedelta(days=1)
             elif period == 'weekly':
                 # Show events from today onwards for the rest of this week
-                start_of_today = now.replace(hour=0, minute=0, second=0, microsecond=0)
-                end_of_week = start_of_today + timedelta(days=7)
-                query = query.filter(Event.start_datetime >= start_of_today, Event.start_datetime < end_of_week)
-                telegram_logger.info(f"📅 Applied weekly filter: {start_of_today} to {end_of_week}")
+                window_start, window_end = start_of_today, start_of_today + timedelta(days=7)
             elif period == 'monthly':
-                start_of_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-                if start_of_month.month == 12:
-                    end_of_month = start_of_month.replace(year=start_of_month.year + 1, month=1)
+                window_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+                if window_start.month == 12:
+                    window_end = window_start.replace(year=window_start.year + 1, month=1)
                 else:
-                    end_of_month = start_of_month.replace(month=start_of_month.month + 1)
-                query = query.filter(Event.start_datetime >= start_of_month, Event.start_datetime < end_of_month)
-                telegram_logger.info(f"📅 Applied monthly filter: {start_of_month} to {end_of_month}")
+                    window_end = window_start.replace(month=window_start.month + 1)
             # 'all' period shows all events (no additional filter)
+            telegram_logger.info(f"📅 Applied {period} filter: {window_start} to {window_end}")
         
-        events = query.order_by(Event.start_datetime).all()
+        from bl.services.recurrence_service import recurrence_service
+        events = recurrence_service.events_in_window(query, window_start, window_end)
         telegram_logger.info(f"📅 Found {len(events)} events")
         
         if not events:
@@ -1840,8 +1950,10 @@ def remove_event_from_telegram(args: any, user: User) -> str:
             return f"❌ Event with ID {event_id} not found"
         
         event_title = event.title
+        owner_id, participant_emails = event.owner_id, EventParticipant.emails_of(event)
         db.session.delete(event)
         db.session.commit()
+        agenda_service.invalidate_event(owner_id, participant_emails)
         
         telegram_logger.info(f"✅ Event deleted: {event_id} - {event_title}")
         return f"✅ Event '{event_title}' deleted successfully!"
@@ -1880,6 +1992,7 @@ def update_event_from_telegram(args: dict, user: User) -> str:
             event.location = updates['location']
         if 'event_type' in updates:
             event.event_type = updates['event_type']
+        removed_participants = []
         if 'participants' in updates:
             participants = updates['participants']
             if participants:
@@ -1892,6 +2005,7 @@ def update_event_from_telegram(args: dict, user: User) -> str:
                 participants = resolved_participants
             
             event.participants = participants
+            _, removed_participants = EventParticipant.sync_from_event(event)
         if 'alert_minutes' in updates:
             event.alert_minutes = updates['alert_minutes']
         if 'notes' in updates:
@@ -1920,9 +2034,10 @@ def update_event_from_telegram(args: dict, user: User) -> str:
         
         event.updated_at = datetime.utcnow()
         db.session.commit()
+        agenda_service.invalidate_event(event.owner_id, EventParticipant.emails_of(event) + removed_participants)
         
         telegram_logger.info(f"✅ Event updated: {event_id} - {event.title}")
-        return f"✅ Event '{event.title}' updated successfully!"
+        return f"✅ Event '{event.title}' updated successfully!" + format_event_conflicts(user, event)
         
     except Exception as e:
         telegram_logger.error(f"💥 Error updating event: {str(e)}")
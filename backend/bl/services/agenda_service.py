@@ -0,0 +1,180 @@
+import os
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import List
+from sqlalchemy import and_, or_, extract, func
+from dal.models import User, Event, Task, Person, EventParticipant
+from dal.models.event_participant import normalize_email
+from bl.services.recurrence_service import recurrence_service, to_naive_utc
+
+logger = logging.getLogger(__name__)
+
+# Longest agenda window
+MAX_AGENDA_DAYS = 93
+
+# Tasks in these statuses are not on the agenda
+CLOSED_TASK_STATUSES = ['completed', 'cancelled', 'done']
+
+# Sort order for items starting at the same time
+ITEM_ORDER = {'birthday': 0, 'event': 1, 'task_scheduled': 2, 'task_due': 3, 'follow_up': 4}
+
+
+class AgendaService:
+    """Merged, time-ordered agenda of events, tasks and contact follow-ups/birthdays"""
+
+    def __init__(self):
+        self.cache_ttl_seconds = int(os.getenv('AGENDA_CACHE_TTL_SECONDS', '30'))
+        self.max_cached_agendas = int(os.getenv('AGENDA_CACHE_MAX_ENTRIES', '1000'))
+        self._cache = OrderedDict()  # (user_id, window_start, window_end) -> (expires_at, items)
+        self._lock = threading.Lock()
+
+    # Cache
+
+    def invalidate(self, user_id):
+        """Drop every cached agenda of a user"""
+        with self._lock:
+            for key in [key for key in self._cache if key[0] == user_id]:
+                del self._cache[key]
+
+    def invalidate_event(self, owner_id, emails):
+        """Drop the cached agendas of an event's owner and of the accounts behind its participant emails.
+
+        Pass the emails of invitees the change removed too: their agendas showed the event until now.
+        """
+        user_ids = {owner_id}
+        emails = sorted({normalize_email(email) for email in emails} - {None})
+        if emails:
+            user_ids.update(user_id for (user_id,) in User.query.with_entities(User.id).filter(
+                func.lower(User.email).in_(emails)))
+        for user_id in user_ids:
+            self.invalidate(user_id)
+
+    def _cache_get(self, key):
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return entry[1]
+
+    def _cache_put(self, key, items):
+        with self._lock:
+            self._cache[key] = (time.monotonic() + self.cache_ttl_seconds, items)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_cached_agendas:
+                self._cache.popitem(last=False)
+
+    # Sources - one query each
+
+    def _event_items(self, user: User, window_start: datetime, window_end: datetime) -> List[dict]:
+        query = Event.query.filter(
+            Event.is_active == True,
+            or_(Event.owner_id == user.id, EventParticipant.invited_clause(Event, user.email))
+        )
+        items = []
+        for occurrence in recurrence_service.events_in_window(query, window_start, window_end):
+            items.append({
+                'type': 'event',
+                'time': occurrence.start_datetime.isoformat(),
+                'end_time': occurrence.end_datetime.isoformat(),
+                'title': occurrence.title,
+                'event_id': occurrence.event.id,
+                'location': occurrence.location,
+                'is_recurring_instance': occurrence.is_recurring_instance,
+                'occurrence_start': occurrence.original_start.isoformat() if occurrence.is_recurring_instance else None
+            })
+        return items
+
+    def _task_items(self, user: User, window_start: datetime, window_end: datetime) -> List[dict]:
+        due_in_window = and_(Task.due_date >= window_start, Task.due_date < window_end)
+        scheduled_in_window = and_(Task.scheduled_date >= window_start, Task.scheduled_date < window_end)
+        # No is_active filter: tasks scheduled for the future stay inactive until their scheduled date
+        tasks = Task.query.filter(
+            Task.owner_id == user.id,
+            or_(Task.status.is_(None), Task.status.notin_(CLOSED_TASK_STATUSES)),
+            or_(due_in_window, scheduled_in_window)
+        ).all()
+
+        items = []
+        for task in tasks:
+            for kind, value in (('task_due', task.due_date), ('task_scheduled', task.scheduled_date)):
+                if value and window_start <= value < window_end:
+                    items.append({
+                        'type': kind,
+                        'time': value.isoformat(),
+                        'title': task.title or task.text,
+                        'task_id': task.id,
+                        'project': task.project,
+                        'priority': task.priority,
+                        'status': task.status
+                    })
+        return items
+
+    def _person_items(self, user: User, window_start: datetime, window_end: datetime) -> List[dict]:
+        # Birthdays are matched on month * 100 + day for every calendar day in the window
+        days = {}
+        day = window_start.date()
+        while datetime.combine(day, datetime.min.time()) < window_end:
+            days.setdefault(day.month * 100 + day.day, day)
+            day += timedelta(days=1)
+        birthday_key = extract('month', Person.birthday) * 100 + extract('day', Person.birthday)
+
+        people = Person.query.filter(
+            Person.owner_id == user.id,
+            or_(
+                and_(Person.next_follow_up_date >= window_start, Person.next_follow_up_date < window_end),
+                and_(Person.birthday.isnot(None), birthday_key.in_(list(days)))
+            )
+        ).all()
+
+        items = []
+        for person in people:
+            full_name = f"{person.first_name or ''} {person.last_name or ''}".strip()
+            follow_up = person.next_follow_up_date
+            if follow_up and window_start <= follow_up < window_end:
+                items.append({
+                    'type': 'follow_up',
+                    'time': follow_up.isoformat(),
+                    'title': f'Follow up with {full_name}',
+                    'person_id': person.id
+                })
+            if person.birthday:
+                # Feb 29 birthdays only show up in leap years
+                day = days.get(person.birthday.month * 100 + person.birthday.day)
+                if day:
+                    items.append({
+                        'type': 'birthday',
+                        'time': datetime.combine(day, datetime.min.time()).isoformat(),
+                        'all_day': True,
+                        'title': f"{full_name}'s birthday",
+                        'person_id': person.id,
+                        'age': day.year - person.birthday.year if person.birthday.year > 1900 else None
+                    })
+        return items
+
+    def get_agenda(self, user: User, window_start: datetime, window_end: datetime, use_cache: bool = True) -> List[dict]:
+        """Agenda items in [window_start, window_end), ordered by time"""
+        window_start, window_end = to_naive_utc(window_start), to_naive_utc(window_end)
+        key = (user.id, window_start, window_end)
+        if use_cache:
+            items = self._cache_get(key)
+            if items is not None:
+                return items
+
+        items = (self._event_items(user, window_start, window_end) +
+                 self._task_items(user, window_start, window_end) +
+                 self._person_items(user, window_start, window_end))
+        items.sort(key=lambda item: (item['time'], ITEM_ORDER.get(item['type'], 9)))
+
+        logger.info(f"Built agenda for {user.email}: {len(items)} items between {window_start} and {window_end}")
+        self._cache_put(key, items)
+        return items
+
+# Create a global instance
+agenda_service = AgendaService()
@@ -0,0 +1,200 @@
+import logging
+from datetime import datetime, timedelta, time
+from typing import Iterable, List, Tuple
+from sqlalchemy import func, or_
+from dal.database import db
+from dal.models import User, Event, EventParticipant
+from bl.services.recurrence_service import recurrence_service, to_naive_utc
+
+logger = logging.getLogger(__name__)
+
+# Longest window the slot finder will scan
+MAX_WINDOW_DAYS = 93
+
+DEFAULT_WORKING_HOURS = {'start': '09:00', 'end': '17:00', 'days': [0, 1, 2, 3, 4]}  # Monday=0
+
+Interval = Tuple[datetime, datetime]
+
+
+class AvailabilityService:
+    """Free/busy lookups and meeting slot search across several people's calendars"""
+
+    @staticmethod
+    def visible_emails(user: User) -> set:
+        """Emails whose calendars the user may look up: their own and their approved group members'"""
+        group_members = (user.user_preferences or {}).get('group_members', [])
+        emails = {user.email.lower()}
+        emails.update(
+            member['email'].lower() for member in group_members
+            if member.get('email') and member.get('status', 'approved') == 'approved'
+        )
+        return emails
+
+    @staticmethod
+    def outside_group(user: User, emails: Iterable[str]) -> List[str]:
+        """The emails the user may not look up, sorted; empty when all are visible"""
+        emails = {email.strip().lower() for email in emails if email}
+        return sorted(emails - AvailabilityService.visible_emails(user))
+
+    def busy_intervals(self, emails: Iterable[str], window_start: datetime, window_end: datetime) -> List[Interval]:
+        """Busy [start, end) intervals of everyone in emails (owned or attended events), clipped to the window"""
+        emails = {email.strip().lower() for email in emails if email}
+        user_ids = [user.id for user in User.query.filter(func.lower(User.email).in_(emails)).all()]
+
+        query = Event.query.filter(
+            Event.is_active == True,
+            or_(Event.owner_id.in_(user_ids), EventParticipant.invited_clause(Event, emails, include_declined=False))
+        )
+
+        intervals = []
+        for occurrence in recurrence_service.events_in_window(query, window_start, window_end):
+            start = max(occurrence.start_datetime, window_start)
+            end = min(occurrence.end_datetime, window_end)
+            if start < end:
+                intervals.append((start, end))
+        return intervals
+
+    def find_conflicts(self, owner: User, start: datetime, end: datetime, participant_emails: Iterable[str] = (),
+                       exclude_event_id: int = None) -> dict:
+        """Events of the owner or the participants overlapping [start, end).
+
+        Only the given interval is checked (for a recurring event, its first
+        occurrence); other people's recurring series are expanded into it.
+        Titles of events the owner can neither own nor attend are hidden.
+        Participants outside the owner's group are not looked up.
+        """
+        start, end = to_naive_utc(start), to_naive_utc(end)
+        emails = {email.strip().lower() for email in participant_emails if email} & self.visible_emails(owner)
+        emails.add(owner.email.lower())
+        user_ids = {user.id: user.email.lower() for user in User.query.filter(func.lower(User.email).in_(emails)).all()}
+        user_ids[owner.id] = owner.email.lower()
+
+        query = Event.query.filter(
+            Event.is_active == True,
+            or_(Event.owner_id.in_(list(user_ids)), EventParticipant.invited_clause(Event, emails, include_declined=False))
+        )
+        if exclude_event_id is not None:
+            query = query.filter(Event.id != exclude_event_id)
+
+        occurrences = [occurrence for occurrence in recurrence_service.events_in_window(query, start, end)
+                       if occurrence.start_datetime < end and occurrence.end_datetime > start]
+        if not occurrences:
+            return {'has_conflicts': False, 'conflicts': []}
+
+        # Who is double-booked by each conflicting event: its owner and its (non-declined) invitees
+        invitees = {}
+        for event_id, email in db.session.query(EventParticipant.event_id, EventParticipant.email).filter(
+                EventParticipant.event_id.in_({occurrence.event.id for occurrence in occurrences}),
+                EventParticipant.response_status != 'declined').all():
+            invitees.setdefault(event_id, set()).add(email)
+
+        conflicts = []
+        owner_email = owner.email.lower()
+        for occurrence in occurrences:
+            attendees = set(invitees.get(occurrence.event.id, set()))
+            if occurrence.owner_id in user_ids:
+                attendees.add(user_ids[occurrence.owner_id])
+            visible = occurrence.owner_id == owner.id or owner_email in attendees
+            conflicts.append({
+                'event_id': occurrence.event.id if visible else None,
+                'title': occurrence.title if visible else 'Busy',
+                'start_datetime': occurrence.start_datetime.isoformat(),
+                'end_datetime': occurrence.end_datetime.isoformat(),
+                'people': sorted(attendees & emails)
+            })
+
+        logger.info(f"Found {len(conflicts)} conflicts for {owner.email} between {start} and {end}")
+        return {'has_conflicts': True, 'conflicts': conflicts}
+
+    @staticmethod
+    def merge_intervals(intervals: Iterable[Interval]) -> List[Interval]:
+        """Sweep over intervals sorted by start, merging overlapping and touching ones"""
+        merged = []
+        for start, end in sorted(intervals):
+            if merged and start <= merged[-1][1]:
+                if end > merged[-1][1]:
+                    merged[-1] = (merged[-1][0], end)
+            else:
+                merged.append((start, end))
+        return merged
+
+    @staticmethod
+    def working_intervals(window_start: datetime, window_end: datetime, working_hours: dict,
+                          utc_offset_minutes: int = 0) -> List[Interval]:
+        """Working hours inside the window, in UTC. Working hours are given in the caller's local time.
+
+        Raises ValueError for malformed working hours (they come straight from the request).
+        """
+        if not isinstance(working_hours, dict):
+            raise ValueError("expected an object with start, end and days")
+        offset = timedelta(minutes=utc_offset_minutes)
+        bounds = {}
+        for name in ('start', 'end'):
+            value = working_hours.get(name, DEFAULT_WORKING_HOURS[name])
+            if not isinstance(value, str):
+                raise ValueError(f"{name} must be a time like '09:00'")
+            bounds[name] = time.fromisoformat(value)
+        day_start, day_end = bounds['start'], bounds['end']
+        days = working_hours.get('days', DEFAULT_WORKING_HOURS['days'])
+        if not isinstance(days, list) or not all(isinstance(day, int) and not isinstance(day, bool) and 0 <= day <= 6
+                                                 for day in days):
+            raise ValueError("days must be a list of weekdays, 0 (Monday) to 6")
+        days = set(days)
+
+        intervals = []
+        day = (window_start + offset).date()
+        while True:
+            start = datetime.combine(day, day_start) - offset
+            if start >= window_end:
+                break
+            if day.weekday() in days:
+                end = datetime.combine(day, day_end) - offset
+                start, end = max(start, window_start), min(end, window_end)
+                if start < end:
+                    intervals.append((start, end))
+            day += timedelta(days=1)
+        return intervals
+
+    @staticmethod
+    def free_slots(busy: List[Interval], working: List[Interval], duration: timedelta) -> List[Interval]:
+        """Gaps of at least duration inside the working intervals; both inputs sorted, busy already merged"""
+        slots = []
+        first = 0
+        for work_start, work_end in working:
+            # Busy intervals ending before this working interval cannot matter for later ones either
+            while first < len(busy) and busy[first][1] <= work_start:
+                first += 1
+
+            cursor = work_start
+            index = first
+            while index < len(busy) and busy[index][0] < work_end:
+                busy_start, busy_end = busy[index]
+                if busy_start - cursor >= duration:
+                    slots.append((cursor, busy_start))
+                cursor = max(cursor, busy_end)
+                index += 1
+            if work_end - cursor >= duration:
+                slots.append((cursor, work_end))
+        return slots
+
+    def find_slots(self, emails: Iterable[str], window_start: datetime, window_end: datetime, duration: timedelta,
+                   working_hours: dict = None, utc_offset_minutes: int = 0, max_slots: int = 20) -> dict:
+        """Merge everyone's busy time and return free slots that fit a meeting of the given duration"""
+        busy = self.merge_intervals(self.busy_intervals(emails, window_start, window_end))
+        working = self.working_intervals(window_start, window_end, working_hours or DEFAULT_WORKING_HOURS,
+                                         utc_offset_minutes)
+        slots = self.free_slots(busy, working, duration)
+        logger.info(f"Found {len(slots)} free slots across {len(busy)} busy intervals")
+
+        return {
+            'slots': [{
+                'start': start.isoformat(),
+                'end': end.isoformat(),
+                'duration_minutes': int((end - start).total_seconds() // 60)
+            } for start, end in slots[:max_slots]],
+            'busy': [{'start': start.isoformat(), 'end': end.isoformat()} for start, end in busy],
+            'total_slots': len(slots)
+        }
+
+# Create a global instance
+availability_service = AvailabilityService()
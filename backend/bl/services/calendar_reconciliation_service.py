@@ -0,0 +1,118 @@
+import json
+import hashlib
+import logging
+from datetime import datetime
+from dal.models import Event
+
+logger = logging.getLogger(__name__)
+
+# Event fields kept equal between the app and Google Calendar
+RECONCILED_FIELDS = ['title', 'description', 'location', 'start_datetime', 'end_datetime']
+
+
+class CalendarReconciliationService:
+    """Three-way merge of events edited both in the app and in Google Calendar.
+
+    Each linked event keeps the synced fields as last agreed with Google (the
+    base), a hash of them and Google's etag of that version. An incoming
+    Google version with the stored etag is skipped without looking at fields.
+    Otherwise the hashes tell which side changed; only when both did are the
+    fields compared one by one. A field changed on one side takes that side's
+    value; a field changed differently on both sides is a conflict and keeps
+    the app's value until the user edits the event again.
+    """
+
+    @staticmethod
+    def local_fields(event: Event) -> dict:
+        return {
+            'title': event.title or '',
+            'description': event.description or '',
+            'location': event.location or '',
+            'start_datetime': event.start_datetime.replace(microsecond=0).isoformat() if event.start_datetime else None,
+            'end_datetime': event.end_datetime.replace(microsecond=0).isoformat() if event.end_datetime else None
+        }
+
+    @staticmethod
+    def remote_fields(event_data: dict, start: datetime, end: datetime) -> dict:
+        """Synced fields of a processed Google event; start and end as parsed naive UTC"""
+        return {
+            'title': event_data.get('title') or '',
+            'description': event_data.get('description') or '',
+            'location': event_data.get('location') or '',
+            'start_datetime': start.replace(microsecond=0).isoformat() if start else None,
+            'end_datetime': end.replace(microsecond=0).isoformat() if end else None
+        }
+
+    @staticmethod
+    def content_hash(fields: dict) -> str:
+        return hashlib.sha256(json.dumps(fields, sort_keys=True).encode()).hexdigest()
+
+    def record_base(self, event: Event, fields: dict, etag: str = None):
+        """Remember fields as the version both sides agree on"""
+        event.google_sync_base = dict(fields)
+        event.google_content_hash = self.content_hash(fields)
+        if etag:
+            event.google_etag = etag
+
+    @staticmethod
+    def _apply(event: Event, fields: dict, names):
+        for name in names:
+            value = fields[name]
+            if name in ('start_datetime', 'end_datetime'):
+                value = datetime.fromisoformat(value) if value else None
+            elif name in ('description', 'location'):
+                value = value or None
+            setattr(event, name, value)
+
+    def reconcile(self, event: Event, remote: dict, etag: str = None) -> str:
+        """Merge a Google version into a linked event.
+
+        Returns 'unchanged' (nothing to do), 'pulled' (the app now matches
+        Google), 'merged' (the app has changes Google lacks; push them) or
+        'conflict' (both changed the same field; nothing is pushed).
+        """
+        if etag and event.google_etag == etag:
+            return 'unchanged'
+        # The app's side of an open conflict is not pushed until the user edits the event
+        pending = 'conflict' if event.google_sync_status == 'conflict' else 'merged'
+
+        base_hash = event.google_content_hash
+        if not event.google_sync_base or not base_hash:
+            # Never reconciled (imported before etags were kept): Google's version becomes the base
+            self._apply(event, remote, RECONCILED_FIELDS)
+            self.record_base(event, remote, etag)
+            return 'pulled'
+
+        local = self.local_fields(event)
+        local_changed = self.content_hash(local) != base_hash
+        remote_changed = self.content_hash(remote) != base_hash
+
+        if not local_changed:
+            if remote_changed:
+                self._apply(event, remote, RECONCILED_FIELDS)
+            self.record_base(event, remote, etag)
+            return 'pulled' if remote_changed else 'unchanged'
+        if not remote_changed:
+            # Only Google's metadata changed (e.g. an attendee replied); the app's edit still has to go out
+            if etag:
+                event.google_etag = etag
+            return pending
+
+        base = event.google_sync_base
+        conflicts = [name for name in RECONCILED_FIELDS
+                     if local[name] != base.get(name) and remote[name] != base.get(name) and local[name] != remote[name]]
+        pulled = [name for name in RECONCILED_FIELDS
+                  if name not in conflicts and remote[name] != base.get(name)]
+        self._apply(event, remote, pulled)
+        # Google's version is the new base; what the app still differs in is pushed later
+        self.record_base(event, remote, etag)
+
+        if conflicts:
+            event.google_sync_status = 'conflict'
+            event.google_sync_error = f"Changed both here and in Google Calendar: {', '.join(conflicts)}"
+            logger.warning(f"Event {event.id} conflicts with Google Calendar on {', '.join(conflicts)}")
+            return 'conflict'
+        return 'pulled' if self.local_fields(event) == remote else pending
+
+# Create a global instance
+calendar_reconciliation_service = CalendarReconciliationService()
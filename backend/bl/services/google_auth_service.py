@@ -6,10 +6,12 @@ from datetime import datetime, timedelta
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import Flow
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from dal.models import User
 from dal.database import db
+from bl.services.recurrence_service import to_naive_utc
+from bl.services.google_client_pool import google_client_pool
+from bl.services.google_token_manager import google_token_manager
 
 # Suppress Google API client cache warnings
 import warnings
@@ -17,6 +19,38 @@ warnings.filterwarnings("ignore", message="file_cache is only supported with oau
 
 logger = logging.getLogger(__name__)
 
+# Events per Calendar API page (the API maximum)
+CALENDAR_PAGE_SIZE = 2500
+
+# Person fields listed for previews and syncs: only what is shown and matched on.
+# Incremental syncs must keep asking for the same set
+CONTACT_PERSON_FIELDS = 'names,emailAddresses,phoneNumbers,organizations'
+
+# Fetched with people:batchGet only for contacts that are actually imported
+CONTACT_DETAIL_FIELDS = 'birthdays,addresses,urls'
+
+# people:batchGet accepts up to 200 resource names per call
+CONTACT_BATCH_GET_SIZE = 200
+
+# Person URL columns by the host of a Google contact URL
+CONTACT_URL_COLUMNS = [
+    ('linkedin.com', 'linkedin_url'),
+    ('github.com', 'github_url'),
+    ('facebook.com', 'facebook_url'),
+    ('twitter.com', 'twitter_url'),
+    ('x.com', 'twitter_url'),
+]
+
+
+class SyncTokenExpiredError(Exception):
+    """Google rejected a stored sync token; a full sync is needed"""
+
+
+def is_expired_sync_token_error(error):
+    """People API answers an expired syncToken with 400 EXPIRED_SYNC_TOKEN (410 on older responses)"""
+    status = getattr(getattr(error, 'resp', None), 'status', None)
+    return status == 410 or (status == 400 and 'EXPIRED_SYNC_TOKEN' in str(getattr(error, 'content', b'') or b''))
+
 class GoogleAuthService:
     # OAuth 2.0 scopes
     SCOPES = [
@@ -33,6 +67,11 @@ class GoogleAuthService:
         self.redirect_uri = os.getenv('GOOGLE_REDIRECT_URI', 'https://dkdrn34xpx.us-east-1.awsapprunner.com/api/auth/google/callback')
         
         self.enabled = all([self.client_id, self.client_secret, self.redirect_uri])
+        
+        # Check out a pooled People/Calendar API client for an access token (context managers);
+        # tests swap in fakes
+        self.people_service_factory = lambda access_token: google_client_pool.client(access_token, 'people', 'v1')
+        self.calendar_service_factory = lambda access_token: google_client_pool.client(access_token, 'calendar', 'v3')
         if not self.enabled:
             logger.warning("Google OAuth credentials not configured - Google Auth disabled")
             # Don't raise an error, just disable the service
@@ -118,9 +157,8 @@ class GoogleAuthService:
     def get_user_info(self, access_token):
         """Get user information from Google"""
         try:
-            credentials = Credentials(token=access_token)
-            service = build('oauth2', 'v2', credentials=credentials)
-            user_info = service.userinfo().get().execute()
+            with google_client_pool.client(access_token, 'oauth2', 'v2') as service:
+                user_info = service.userinfo().get().execute()
             
             return {
                 'google_id': user_info.get('id'),
@@ -136,27 +174,6 @@ class GoogleAuthService:
             logger.error(f"Unexpected error getting user info: {str(e)}")
             raise
     
-    def refresh_access_token(self, refresh_token):
-        """Refresh expired access token"""
-        try:
-            credentials = Credentials(
-                token=None,
-                refresh_token=refresh_token,
-                token_uri="https://oauth2.googleapis.com/token",
-                client_id=self.client_id,
-                client_secret=self.client_secret
-            )
-            
-            credentials.refresh(Request())
-            
-            return {
-                'access_token': credentials.token,
-                'expires_at': credentials.expiry.isoformat() if credentials.expiry else None
-            }
-        except Exception as e:
-            logger.error(f"Error refreshing access token: {str(e)}")
-            raise
-    
     def revoke_tokens(self, access_token, refresh_token=None):
         """Revoke access and refresh tokens"""
         try:
@@ -177,104 +194,222 @@ class GoogleAuthService:
     def get_contacts(self, access_token, max_results=2000):
         """Get Google contacts with pagination support"""
         try:
-            credentials = Credentials(token=access_token)
-            service = build('people', 'v1', credentials=credentials)
+            with self.people_service_factory(access_token) as service:
+                all_contacts = []
+                page_token = None
+                page_size = min(1000, max_results)  # Google API max page size is 1000
+                
+                while len(all_contacts) < max_results:
+                    # Calculate how many contacts to fetch in this request
+                    remaining = max_results - len(all_contacts)
+                    current_page_size = min(page_size, remaining)
+                    
+                    request_params = {
+                        'resourceName': 'people/me',
+                        'personFields': CONTACT_PERSON_FIELDS,
+                        'pageSize': current_page_size
+                    }
+                    
+                    if page_token:
+                        request_params['pageToken'] = page_token
+                    
+                    results = service.people().connections().list(**request_params).execute()
+                    
+                    contacts = results.get('connections', [])
+                    all_contacts.extend(contacts)
+                    
+                    # Check if there are more pages
+                    page_token = results.get('nextPageToken')
+                    if not page_token:
+                        break
+                    
+                    logger.info(f"Fetched {len(contacts)} contacts, total so far: {len(all_contacts)}")
             
-            all_contacts = []
-            page_token = None
-            page_size = min(1000, max_results)  # Google API max page size is 1000
+            processed_contacts = [self._process_contact(contact) for contact in all_contacts]
             
-            while len(all_contacts) < max_results:
-                # Calculate how many contacts to fetch in this request
-                remaining = max_results - len(all_contacts)
-                current_page_size = min(page_size, remaining)
-                
+            logger.info(f"Successfully fetched {len(processed_contacts)} contacts from Google")
+            return processed_contacts
+        except HttpError as e:
+            logger.error(f"Error getting contacts: {str(e)}")
+            raise
+        except Exception as e:
+            logger.error(f"Unexpected error getting contacts: {str(e)}")
+            raise
+    
+    @staticmethod
+    def _process_contact(contact):
+        """Flatten a People API person into the contact dict used by previews and syncs"""
+        names = contact.get('names', [])
+        emails = contact.get('emailAddresses', [])
+        phones = contact.get('phoneNumbers', [])
+        organizations = contact.get('organizations', [])
+        
+        return {
+            'google_id': contact.get('resourceName', '').replace('people/', ''),
+            'name': names[0].get('displayName', '') if names else '',
+            'first_name': names[0].get('givenName', '') if names else '',
+            'last_name': names[0].get('familyName', '') if names else '',
+            'email': emails[0].get('value', '') if emails else '',
+            'phone': phones[0].get('value', '') if phones else '',
+            'company': organizations[0].get('name', '') if organizations else '',
+            'job_title': organizations[0].get('title', '') if organizations else '',
+            'is_duplicate': False  # Will be set later in get_contacts_preview
+        }
+    
+    def get_contact_details(self, access_token, google_ids):
+        """Birthday, address and URLs of the given contacts, fetched with people:batchGet.
+        
+        Returns {google_id: details}; contacts Google no longer has are left out.
+        """
+        details = {}
+        google_ids = [google_id for google_id in google_ids if google_id]
+        with self.people_service_factory(access_token) as service:
+            for offset in range(0, len(google_ids), CONTACT_BATCH_GET_SIZE):
+                chunk = google_ids[offset:offset + CONTACT_BATCH_GET_SIZE]
+                results = service.people().getBatchGet(
+                    resourceNames=[f'people/{google_id}' for google_id in chunk],
+                    personFields=CONTACT_DETAIL_FIELDS
+                ).execute()
+                for response in results.get('responses', []):
+                    contact = response.get('person')
+                    if contact:
+                        details[contact.get('resourceName', '').replace('people/', '')] = self._contact_details(contact)
+        return details
+    
+    @staticmethod
+    def _contact_details(contact):
+        """Detail fields of a People API person, keyed by Person column"""
+        details = {}
+        
+        for birthday in contact.get('birthdays', []):
+            date = birthday.get('date', {})
+            # A birthday without a year cannot be stored in a date column
+            if date.get('year') and date.get('month') and date.get('day'):
+                try:
+                    details['birthday'] = datetime(date['year'], date['month'], date['day']).date()
+                    break
+                except ValueError:
+                    continue
+        
+        addresses = contact.get('addresses', [])
+        if addresses:
+            address = addresses[0]
+            details['address'] = address.get('formattedValue') or ', '.join(
+                part for part in (address.get('streetAddress'), address.get('city'),
+                                  address.get('postalCode'), address.get('country')) if part)
+        
+        for url in contact.get('urls', []):
+            value = url.get('value', '').strip()
+            if not value:
+                continue
+            host = value.split('://')[-1].split('/')[0].lower()
+            column = next((column for domain, column in CONTACT_URL_COLUMNS
+                           if host == domain or host.endswith('.' + domain)), 'website_url')
+            details.setdefault(column, value)
+        
+        return {column: value for column, value in details.items() if value}
+    
+    def enrich_contacts(self, user, people):
+        """Second stage of an import: fill the imported people's empty detail fields from Google.
+        
+        Caller commits. Returns how many people got details.
+        """
+        people = [person for person in people if person.google_contact_id]
+        if not people:
+            return 0
+        
+        access_token = self.ensure_valid_token(user)
+        details = self.get_contact_details(access_token, [person.google_contact_id for person in people])
+        
+        enriched = 0
+        for person in people:
+            person_details = details.get(person.google_contact_id)
+            if not person_details:
+                continue
+            for column, value in person_details.items():
+                # Never overwrite what the user entered
+                if not getattr(person, column):
+                    setattr(person, column, value)
+            enriched += 1
+        logger.info(f"Fetched details of {enriched} imported Google contacts for user {user.id}")
+        return enriched
+    
+    def get_contact_changes(self, access_token, sync_token=None):
+        """Connections changed since sync_token (all of them when None).
+        
+        Returns (changed_contacts, deleted_google_ids, next_sync_token). Raises
+        SyncTokenExpiredError when Google no longer accepts sync_token; the
+        caller then does a full sync.
+        """
+        with self.people_service_factory(access_token) as service:
+            changed, deleted = [], []
+            page_token = None
+            next_sync_token = None
+            while True:
+                # Every page of a sync must repeat the same parameters
                 request_params = {
                     'resourceName': 'people/me',
-                    'personFields': 'names,emailAddresses,phoneNumbers,organizations',
-                    'pageSize': current_page_size
+                    'personFields': CONTACT_PERSON_FIELDS,
+                    'pageSize': 1000,
+                    'requestSyncToken': True
                 }
-                
+                if sync_token:
+                    request_params['syncToken'] = sync_token
                 if page_token:
                     request_params['pageToken'] = page_token
                 
-                results = service.people().connections().list(**request_params).execute()
+                try:
+                    results = service.people().connections().list(**request_params).execute()
+                except HttpError as e:
+                    if sync_token and is_expired_sync_token_error(e):
+                        raise SyncTokenExpiredError(str(e))
+                    raise
                 
-                contacts = results.get('connections', [])
-                all_contacts.extend(contacts)
+                for contact in results.get('connections', []):
+                    if contact.get('metadata', {}).get('deleted'):
+                        deleted.append(contact.get('resourceName', '').replace('people/', ''))
+                    else:
+                        changed.append(self._process_contact(contact))
                 
-                # Check if there are more pages
                 page_token = results.get('nextPageToken')
                 if not page_token:
+                    next_sync_token = results.get('nextSyncToken')
                     break
-                
-                logger.info(f"Fetched {len(contacts)} contacts, total so far: {len(all_contacts)}")
-            
-            processed_contacts = []
-            for contact in all_contacts:
-                names = contact.get('names', [])
-                emails = contact.get('emailAddresses', [])
-                phones = contact.get('phoneNumbers', [])
-                organizations = contact.get('organizations', [])
-                
-                processed_contact = {
-                    'google_id': contact.get('resourceName', '').replace('people/', ''),
-                    'name': names[0].get('displayName', '') if names else '',
-                    'first_name': names[0].get('givenName', '') if names else '',
-                    'last_name': names[0].get('familyName', '') if names else '',
-                    'email': emails[0].get('value', '') if emails else '',
-                    'phone': phones[0].get('value', '') if phones else '',
-                    'company': organizations[0].get('name', '') if organizations else '',
-                    'job_title': organizations[0].get('title', '') if organizations else '',
-                    'is_duplicate': False  # Will be set later in get_contacts_preview
-                }
-                processed_contacts.append(processed_contact)
-            
-            logger.info(f"Successfully fetched {len(processed_contacts)} contacts from Google")
-            return processed_contacts
-        except HttpError as e:
-            logger.error(f"Error getting contacts: {str(e)}")
-            raise
-        except Exception as e:
-            logger.error(f"Unexpected error getting contacts: {str(e)}")
-            raise
+        
+        logger.info(f"Fetched {len(changed)} changed and {len(deleted)} deleted contacts "
+                    f"({'incremental' if sync_token else 'full'} sync)")
+        return changed, deleted, next_sync_token
     
     def get_calendar_events(self, access_token, max_results=100, time_min=None, time_max=None):
-        """Get Google calendar events"""
+        """Get Google calendar events of the primary calendar, following pages up to max_results"""
         try:
-            credentials = Credentials(token=access_token)
-            service = build('calendar', 'v3', credentials=credentials)
-            
-            # Get primary calendar
-            calendar_list = service.calendarList().list().execute()
-            primary_calendar = None
-            for calendar in calendar_list.get('items', []):
-                if calendar.get('primary'):
-                    primary_calendar = calendar['id']
-                    break
-            
-            if not primary_calendar:
-                raise ValueError("No primary calendar found")
-            
-            # Set default time range if not provided
-            if not time_min:
-                time_min = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0).isoformat() + 'Z'
-            if not time_max:
-                # Default to next year if not specified
-                today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-                next_year = datetime(today.year + 1, 12, 31, 23, 59, 59)
-                time_max = next_year.isoformat() + 'Z'
-            
-            events_result = service.events().list(
-                calendarId=primary_calendar,
-                timeMin=time_min,
-                timeMax=time_max,
-                maxResults=max_results,
-                singleEvents=True,
-                orderBy='startTime'
-            ).execute()
-            
-            events = events_result.get('items', [])
+            with self.calendar_service_factory(access_token) as service:
+                # Set default time range if not provided
+                if not time_min or not time_max:
+                    default_min, default_max = self._default_calendar_window()
+                    time_min = time_min or default_min
+                    time_max = time_max or default_max
+                
+                events = []
+                page_token = None
+                while len(events) < max_results:
+                    request_params = {
+                        'calendarId': 'primary',
+                        'timeMin': time_min,
+                        'timeMax': time_max,
+                        'maxResults': min(CALENDAR_PAGE_SIZE, max_results - len(events)),
+                        'singleEvents': True,
+                        'orderBy': 'startTime'
+                    }
+                    if page_token:
+                        request_params['pageToken'] = page_token
+                    
+                    events_result = service.events().list(**request_params).execute()
+                    events.extend(events_result.get('items', []))
+                    
+                    page_token = events_result.get('nextPageToken')
+                    if not page_token:
+                        break
             
             logger.info(f"📅 DEBUG: Retrieved {len(events)} events from Google Calendar")
             
@@ -292,24 +427,7 @@ class GoogleAuthService:
                 logger.info(f"  - Start: {event.get('start', {})}")
                 logger.info(f"  - End: {event.get('end', {})}")
                 
-                start = event.get('start', {})
-                end = event.get('end', {})
-                attendees = event.get('attendees', [])
-                
-                # Try multiple fields for title
-                title = event.get('summary') or event.get('title') or event.get('subject') or 'Untitled Event'
-                
-                processed_event = {
-                    'google_id': event.get('id'),
-                    'title': title,
-                    'description': event.get('description', ''),
-                    'start_time': start.get('dateTime') or start.get('date'),
-                    'end_time': end.get('dateTime') or end.get('date'),
-                    'location': event.get('location', ''),
-                    'attendees': [att.get('email', '') for att in attendees],
-                    'creator': event.get('creator', {}).get('email', ''),
-                    'organizer': event.get('organizer', {}).get('email', '')
-                }
+                processed_event = self._process_calendar_event(event)
                 
                 logger.info(f"  - Processed title: '{processed_event['title']}'")
                 processed_events.append(processed_event)
@@ -322,6 +440,108 @@ class GoogleAuthService:
             logger.error(f"Unexpected error getting calendar events: {str(e)}")
             raise
     
+    @staticmethod
+    def _default_calendar_window():
+        """(timeMin, timeMax) of calendar imports: today to the end of next year"""
+        today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        next_year = datetime(today.year + 1, 12, 31, 23, 59, 59)
+        return today.isoformat() + 'Z', next_year.isoformat() + 'Z'
+    
+    @staticmethod
+    def _process_calendar_event(event):
+        """Flatten a Calendar API event into the dict used by previews and syncs"""
+        start = event.get('start', {})
+        end = event.get('end', {})
+        attendees = event.get('attendees', [])
+        
+        # Try multiple fields for title
+        title = event.get('summary') or event.get('title') or event.get('subject') or 'Untitled Event'
+        
+        return {
+            'google_id': event.get('id'),
+            'etag': event.get('etag'),
+            'title': title,
+            'description': event.get('description', ''),
+            'start_time': start.get('dateTime') or start.get('date'),
+            'end_time': end.get('dateTime') or end.get('date'),
+            'location': event.get('location', ''),
+            'attendees': [att.get('email', '') for att in attendees],
+            'participants': [{
+                'email': att.get('email', ''),
+                'name': att.get('displayName', ''),
+                'response_status': att.get('responseStatus', 'needsAction')
+            } for att in attendees if att.get('email')],
+            'creator': event.get('creator', {}).get('email', ''),
+            'organizer': event.get('organizer', {}).get('email', '')
+        }
+    
+    @staticmethod
+    def _parse_event_times(event_data):
+        """(start, end) of a processed event as naive UTC; all-day events span the whole day. (None, None) if unparseable"""
+        def parse(value, all_day_time):
+            if not value:
+                return None
+            if 'T' not in value:
+                value = value + all_day_time
+            return to_naive_utc(datetime.fromisoformat(value.replace('Z', '+00:00')))
+        
+        try:
+            start = parse(event_data.get('start_time'), 'T00:00:00+00:00')
+            end = parse(event_data.get('end_time'), 'T00:00:00+00:00')
+        except ValueError as e:
+            logger.warning(f"Error parsing times of Google event {event_data.get('google_id')}: {e}")
+            return None, None
+        if start and not end:
+            end = start + timedelta(hours=1)
+        return start, end
+    
+    def get_calendar_changes(self, access_token, sync_token=None):
+        """Primary calendar events changed since sync_token (the default window when None).
+        
+        Returns (changed_events, cancelled_google_ids, next_sync_token). Raises
+        SyncTokenExpiredError on 410 Gone; the caller then does a full sync.
+        """
+        with self.calendar_service_factory(access_token) as service:
+            changed, cancelled = [], []
+            page_token = None
+            next_sync_token = None
+            while True:
+                # singleEvents must match between the full sync and the incremental ones
+                request_params = {
+                    'calendarId': 'primary',
+                    'maxResults': CALENDAR_PAGE_SIZE,
+                    'singleEvents': True
+                }
+                if sync_token:
+                    # Cancelled events are included automatically; time bounds are not allowed
+                    request_params['syncToken'] = sync_token
+                else:
+                    request_params['timeMin'], request_params['timeMax'] = self._default_calendar_window()
+                if page_token:
+                    request_params['pageToken'] = page_token
+                
+                try:
+                    results = service.events().list(**request_params).execute()
+                except HttpError as e:
+                    if sync_token and is_expired_sync_token_error(e):
+                        raise SyncTokenExpiredError(str(e))
+                    raise
+                
+                for event in results.get('items', []):
+                    if event.get('status') == 'cancelled':
+                        cancelled.append(event.get('id'))
+                    else:
+                        changed.append(self._process_calendar_event(event))
+                
+                page_token = results.get('nextPageToken')
+                if not page_token:
+                    next_sync_token = results.get('nextSyncToken')
+                    break
+        
+        logger.info(f"Fetched {len(changed)} changed and {len(cancelled)} cancelled calendar events "
+                    f"({'incremental' if sync_token else 'full'} sync)")
+        return changed, cancelled, next_sync_token
+    
     def create_or_update_user(self, user_info, tokens):
         """Create or update user with Google OAuth data"""
         try:
@@ -372,11 +592,15 @@ class GoogleAuthService:
             user.google_access_token = tokens['access_token']
             user.google_refresh_token = tokens['refresh_token']
             user.google_scopes = current_scopes_str  # Store current scopes
+            # Connecting again may fix what made scheduled syncs fail
+            user.google_sync_failures = 0
+            user.google_sync_retry_at = None
             if tokens.get('expires_at'):
                 user.google_token_expires_at = datetime.fromisoformat(tokens['expires_at'].replace('Z', '+00:00'))
             
             user.updated_at = datetime.utcnow()
             db.session.commit()
+            google_token_manager.forget(user.id)
             
             return user
         except Exception as e:
@@ -393,30 +617,7 @@ class GoogleAuthService:
     
     def ensure_valid_token(self, user):
         """Ensure user has a valid Google access token, refresh if needed"""
-        if self.is_token_valid(user):
-            return user.google_access_token
-        
-        if not user.google_refresh_token:
-            raise ValueError("No refresh token available. Please re-authenticate with Google.")
-        
-        logger.info(f"Refreshing expired Google token for user {user.id}")
-        
-        try:
-            refreshed_tokens = self.refresh_access_token(user.google_refresh_token)
-            
-            user.google_access_token = refreshed_tokens['access_token']
-            if refreshed_tokens.get('expires_at'):
-                user.google_token_expires_at = datetime.fromisoformat(
-                    refreshed_tokens['expires_at'].replace('Z', '+00:00')
-                )
-            user.updated_at = datetime.utcnow()
-            db.session.commit()
-            
-            return user.google_access_token
-        except Exception as e:
-            logger.error(f"Error refreshing token for user {user.id}: {str(e)}")
-            # If refresh fails, the user needs to re-authenticate
-            raise ValueError(f"Failed to refresh Google token. Please re-authenticate with Google. Error: {str(e)}")
+        return google_token_manager.get_access_token(user)
     
     def get_contacts_preview(self, user):
         """Get Google contacts preview (without inserting to database)"""
@@ -435,25 +636,33 @@ class GoogleAuthService:
             from dal.models import Person
             from dal.database import db
             
+            # Existing people's keys in one query; matching below runs in memory
+            existing_by_email = {}
+            existing_by_google_id = {}
+            for person_id, email, google_contact_id in db.session.query(
+                    Person.id, Person.email, Person.google_contact_id).filter(Person.owner_id == user.id):
+                if email:
+                    existing_by_email.setdefault(email, person_id)
+                if google_contact_id:
+                    existing_by_google_id.setdefault(google_contact_id, person_id)
+            
             preview_data = []
             logger.info(f"📊 Processing {len(contacts)} contacts for preview")
             
             for contact in contacts:
-                # Check if contact already exists (by email)
-                existing_person = None
-                if contact.get('email'):
-                    existing_person = Person.query.filter_by(
-                        owner_id=user.id,
-                        email=contact['email']
-                    ).first()
+                # Check if contact already exists (by Google id, then by email)
+                existing_id = existing_by_google_id.get(contact.get('google_id'))
+                if not existing_id and contact.get('email'):
+                    existing_id = existing_by_email.get(contact['email'])
                 
                 preview_data.append({
+                    'google_id': contact.get('google_id'),
                     'name': contact.get('name', 'Unknown'),
                     'email': contact.get('email'),
                     'company': contact.get('company'),
                     'phone': contact.get('phone'),
-                    'is_duplicate': existing_person is not None,
-                    'existing_id': existing_person.id if existing_person else None
+                    'is_duplicate': existing_id is not None,
+                    'existing_id': existing_id
                 })
             
             logger.info(f"Generated preview for {len(preview_data)} Google contacts for user {user.id}")
@@ -488,38 +697,16 @@ class GoogleAuthService:
             from dal.models import Event
             from dal.database import db
             
-            preview_data = []
             logger.info(f"📅 CALENDAR PREVIEW DEBUG: Processing {len(events)} events for preview")
             
-            for i, event_data in enumerate(events):
-                logger.info(f"📅 PREVIEW Event {i+1}:")
-                logger.info(f"  - Event data keys: {list(event_data.keys())}")
-                logger.info(f"  - Summary field: '{event_data.get('summary', 'NO_SUMMARY')}'")
-                logger.info(f"  - Title field: '{event_data.get('title', 'NO_TITLE')}'")
-                logger.info(f"  - Subject field: '{event_data.get('subject', 'NO_SUBJECT')}'")
-                
-                # Check if event already exists (by Google event ID or title + start time)
-                existing_event = None
-                
-                # First check by Google event ID
-                if event_data.get('id'):
-                    existing_event = Event.query.filter_by(
-                        user_id=user.id,
-                        google_event_id=event_data['id']
-                    ).first()
-                
-                # Parse event dates safely - try multiple fields for title
-                event_title = event_data.get('summary') or event_data.get('title') or event_data.get('subject') or 'Untitled Event'
-                logger.info(f"  - Final event title: '{event_title}'")
+            parsed = []
+            for event_data in events:
+                event_title = event_data.get('title') or 'Untitled Event'
                 event_start = None
                 event_end = None
                 
-                # Debug logging to see what we're getting
-                logger.info(f"Processing event: {event_title}")
-                logger.info(f"Event data keys: {list(event_data.keys())}")
-                
                 # Handle different date formats - events come with start_time and end_time already processed
-                if 'start_time' in event_data and event_data['start_time']:
+                if event_data.get('start_time'):
                     try:
                         # Parse the start time (could be dateTime or date format)
                         start_time_str = event_data['start_time']
@@ -533,7 +720,7 @@ class GoogleAuthService:
                         logger.warning(f"Error parsing start_time '{event_data['start_time']}': {e}")
                         event_start = None
                 
-                if 'end_time' in event_data and event_data['end_time']:
+                if event_data.get('end_time'):
                     try:
                         # Parse the end time (could be dateTime or date format)
                         end_time_str = event_data['end_time']
@@ -556,13 +743,30 @@ class GoogleAuthService:
                 if not event_end:
                     event_end = event_start + timedelta(hours=1)
                 
-                # If not found by Google ID, check by title + start time
-                if not existing_event:
-                    existing_event = Event.query.filter_by(
-                        user_id=user.id,
-                        title=event_title,
-                        start_datetime=event_start
-                    ).first()
+                parsed.append((event_data, event_title, event_start, event_end))
+            
+            # Existing events' keys in one query each; matching below runs in memory
+            existing_by_google_id = dict(db.session.query(Event.google_event_id, Event.id).filter(
+                Event.owner_id == user.id,
+                Event.google_event_id.isnot(None)
+            ).all())
+            
+            existing_by_title_start = {}
+            if parsed:
+                starts = [to_naive_utc(event_start) for _, _, event_start, _ in parsed]
+                for event_id, title, start_datetime in db.session.query(
+                        Event.id, Event.title, Event.start_datetime).filter(
+                        Event.owner_id == user.id,
+                        Event.start_datetime >= min(starts),
+                        Event.start_datetime <= max(starts)):
+                    existing_by_title_start.setdefault((title, to_naive_utc(start_datetime)), event_id)
+            
+            preview_data = []
+            for event_data, event_title, event_start, event_end in parsed:
+                # Check if event already exists (by Google event ID, then by title + start time)
+                existing_id = existing_by_google_id.get(event_data.get('google_id'))
+                if not existing_id:
+                    existing_id = existing_by_title_start.get((event_title, to_naive_utc(event_start)))
                 
                 preview_data.append({
                     'title': event_title,
@@ -570,9 +774,10 @@ class GoogleAuthService:
                     'start_datetime': event_start.isoformat(),
                     'end_datetime': event_end.isoformat(),
                     'location': event_data.get('location'),
-                    'google_event_id': event_data.get('id'),
-                    'is_duplicate': existing_event is not None,
-                    'existing_id': existing_event.id if existing_event else None
+                    'google_event_id': event_data.get('google_id'),
+                    'participants': event_data.get('participants', []),
+                    'is_duplicate': existing_id is not None,
+                    'existing_id': existing_id
                 })
             
             logger.info(f"Generated preview for {len(preview_data)} Google calendar events for user {user.id}")
@@ -583,7 +788,15 @@ class GoogleAuthService:
             raise
     
     def sync_contacts(self, user):
-        """Sync Google contacts to the database"""
+        """Sync Google contacts to the database.
+        
+        Uses the People API sync token stored on the user, so after the first
+        full sync only connections changed or deleted since the last sync are
+        fetched and applied. Caller updates google_contacts_synced_at.
+        
+        After a full listing, people imported from Google that it no longer
+        returns (deleted while the sync token was invalid) are removed.
+        """
         if not self.enabled:
             raise ValueError("Google OAuth is not configured")
         
@@ -591,68 +804,177 @@ class GoogleAuthService:
             # Get valid access token (refresh if needed)
             access_token = self.ensure_valid_token(user)
             
-            # Get contacts from Google (with pagination support, up to 5000 contacts)
-            contacts = self.get_contacts(access_token, max_results=5000)
+            sync_token = user.google_contacts_sync_token
+            try:
+                contacts, deleted_ids, next_sync_token = self.get_contact_changes(access_token, sync_token)
+            except SyncTokenExpiredError:
+                logger.info(f"Contacts sync token expired for user {user.id}, doing a full sync")
+                sync_token = None
+                contacts, deleted_ids, next_sync_token = self.get_contact_changes(access_token)
             
             # Import here to avoid circular imports
             from dal.models import Person
             from dal.database import db
             
-            synced_count = 0
+            # Match the whole batch in two queries: by Google id first, then by email
+            google_ids = [contact['google_id'] for contact in contacts if contact.get('google_id')]
+            linked = {}
+            if google_ids:
+                linked = {person.google_contact_id: person for person in Person.query.filter(
+                    Person.owner_id == user.id,
+                    Person.google_contact_id.in_(google_ids)
+                ).all()}
+            
+            emails = {}
             for contact in contacts:
-                # Parse name into first_name and last_name
-                full_name = contact.get('name', '')
-                first_name = contact.get('first_name', '')
-                last_name = contact.get('last_name', '')
+                if contact.get('google_id') not in linked:
+                    emails[contact['google_id']] = self._contact_email(contact)
+            by_email = {}
+            if emails:
+                by_email = {person.email: person for person in Person.query.filter(
+                    Person.owner_id == user.id,
+                    Person.email.in_(set(emails.values()))
+                ).all()}
+            
+            created = []
+            updated_count = 0
+            for contact in contacts:
+                first_name, last_name = self._contact_names(contact)
+                person = linked.get(contact.get('google_id'))
                 
-                # If first_name and last_name are empty but we have a full name, split it
-                if not first_name and not last_name and full_name:
-                    name_parts = full_name.strip().split(' ', 1)
-                    first_name = name_parts[0] if len(name_parts) > 0 else ''
-                    last_name = name_parts[1] if len(name_parts) > 1 else ''
+                if person:
+                    # Only people that came from Google are overwritten with Google's data
+                    if person.source == 'google_contacts':
+                        person.first_name = first_name
+                        person.last_name = last_name
+                        person.organization = contact.get('company', '')
+                        person.phone = contact.get('phone', '')
+                        person.job_title = contact.get('job_title', '')
+                        updated_count += 1
+                    continue
                 
-                # Generate unique email for contacts without email to avoid constraint violation
-                email = contact.get('email', '').strip()
-                if not email:
-                    # Create a unique email using name and phone to avoid duplicate key error
-                    name = contact.get('name', 'Unknown').replace(' ', '_')
-                    phone = contact.get('phone', '').replace('+', '').replace('-', '').replace(' ', '')
-                    email = f"{name}_{phone}@noemail.local" if phone else f"{name}@noemail.local"
+                email = emails[contact['google_id']]
+                existing_person = by_email.get(email)
+                if existing_person:
+                    # Link the existing person so later syncs find it by id
+                    if not existing_person.google_contact_id:
+                        existing_person.google_contact_id = contact.get('google_id') or None
+                    logger.info(f"Skipping duplicate contact: {contact.get('name', 'Unknown')} ({contact.get('email', 'No email')})")
+                    continue
                 
-                # Check if contact already exists (by email)
-                existing_person = Person.query.filter_by(
+                person = Person(
+                    first_name=first_name,
+                    last_name=last_name,
+                    email=email,
+                    organization=contact.get('company', ''),
+                    phone=contact.get('phone', ''),
+                    job_title=contact.get('job_title', ''),
                     owner_id=user.id,
-                    email=email
-                ).first()
-                
-                if not existing_person:
-                    
-                    # Create new person
-                    person = Person(
-                        first_name=first_name,
-                        last_name=last_name,
-                        email=email,
-                        organization=contact.get('company', ''),
-                        phone=contact.get('phone', ''),
-                        job_title=contact.get('job_title', ''),
-                        owner_id=user.id,
-                        source='google_contacts'
-                    )
-                    db.session.add(person)
-                    synced_count += 1
-                else:
-                    logger.info(f"Skipping duplicate contact: {contact.get('name', 'Unknown')} ({contact.get('email', 'No email')})")
+                    source='google_contacts',
+                    google_contact_id=contact.get('google_id') or None
+                )
+                db.session.add(person)
+                by_email[email] = person
+                created.append(person)
+            
+            # Contacts deleted in Google are removed only if they were imported from Google
+            deleted_count = 0
+            if not sync_token:
+                # A full listing has no deletion markers; whatever it left out is gone
+                deleted_count = self._delete_missing_contacts(user, {contact.get('google_id') for contact in contacts})
+            elif deleted_ids:
+                deleted_count = Person.query.filter(
+                    Person.owner_id == user.id,
+                    Person.source == 'google_contacts',
+                    Person.google_contact_id.in_(deleted_ids)
+                ).delete(synchronize_session=False)
+            
+            # Details only for the contacts imported now; the listing stays minimal
+            try:
+                self.enrich_contacts(user, created)
+            except Exception as e:
+                logger.warning(f"Could not fetch details of imported Google contacts for user {user.id}: {str(e)}")
             
+            user.google_contacts_sync_token = next_sync_token
             db.session.commit()
-            logger.info(f"Synced {synced_count} Google contacts for user {user.id}")
-            return synced_count
+            logger.info(f"Synced Google contacts for user {user.id}: {len(created)} created, "
+                        f"{updated_count} updated, {deleted_count} deleted")
+            return len(created) + updated_count
             
         except Exception as e:
             logger.error(f"Error syncing contacts: {str(e)}")
             raise
     
+    @staticmethod
+    def _contact_names(contact):
+        """(first_name, last_name), split from the display name when Google has no given/family name"""
+        full_name = contact.get('name', '')
+        first_name = contact.get('first_name', '')
+        last_name = contact.get('last_name', '')
+        
+        if not first_name and not last_name and full_name:
+            name_parts = full_name.strip().split(' ', 1)
+            first_name = name_parts[0] if len(name_parts) > 0 else ''
+            last_name = name_parts[1] if len(name_parts) > 1 else ''
+        return first_name, last_name
+    
+    @staticmethod
+    def _contact_email(contact):
+        """Contact email, or a unique placeholder for contacts without one (people.email is unique)"""
+        email = contact.get('email', '').strip()
+        if not email:
+            name = contact.get('name', 'Unknown').replace(' ', '_')
+            phone = contact.get('phone', '').replace('+', '').replace('-', '').replace(' ', '')
+            email = f"{name}_{phone}@noemail.local" if phone else f"{name}@noemail.local"
+        return email
+    
+    def _delete_missing_contacts(self, user, listed_ids):
+        """Delete people imported from Google that a full listing did not return; returns how many"""
+        from dal.models import Person
+        
+        missing = [person_id for person_id, google_contact_id in db.session.query(Person.id, Person.google_contact_id).filter(
+            Person.owner_id == user.id,
+            Person.source == 'google_contacts',
+            Person.google_contact_id.isnot(None)
+        ).all() if google_contact_id not in listed_ids]
+        
+        for i in range(0, len(missing), 500):
+            Person.query.filter(Person.id.in_(missing[i:i + 500])).delete(synchronize_session=False)
+        if missing:
+            logger.info(f"Deleted {len(missing)} contacts no longer in Google Contacts for user {user.id}")
+        return len(missing)
+    
+    def _deactivate_missing_events(self, user, listed_ids):
+        """Soft-delete linked events of the full-sync window that Google did not list; returns how many"""
+        from dal.models import Event
+        
+        time_min, time_max = (datetime.fromisoformat(bound.rstrip('Z')) for bound in self._default_calendar_window())
+        missing = [event_id for event_id, google_event_id in db.session.query(Event.id, Event.google_event_id).filter(
+            Event.owner_id == user.id,
+            Event.google_event_id.isnot(None),
+            Event.is_active == True,
+            Event.end_datetime > time_min,
+            Event.start_datetime < time_max
+        ).all() if google_event_id not in listed_ids]
+        
+        for i in range(0, len(missing), 500):
+            Event.query.filter(Event.id.in_(missing[i:i + 500])).update(
+                {'is_active': False, 'updated_at': datetime.utcnow()}, synchronize_session=False
+            )
+        if missing:
+            logger.info(f"Deactivated {len(missing)} events no longer in Google Calendar for user {user.id}")
+        return len(missing)
+    
     def sync_calendar_events(self, user):
-        """Sync Google calendar events to the database"""
+        """Sync Google calendar events to the database.
+        
+        The first sync imports every event of the default window, page by page,
+        and stores Google's sync token on the user; later syncs only apply the
+        events changed or cancelled since. Caller updates google_calendar_synced_at.
+        
+        After a full listing, linked events in its window that Google no longer
+        returns (deleted while the sync token was invalid) are soft-deleted.
+        """
         if not self.enabled:
             raise ValueError("Google OAuth is not configured")
         
@@ -660,58 +982,136 @@ class GoogleAuthService:
             # Get valid access token (refresh if needed)
             access_token = self.ensure_valid_token(user)
             
-            # Get calendar events from Google
-            events = self.get_calendar_events(access_token, max_results=1000)
+            sync_token = user.google_calendar_sync_token
+            try:
+                events, cancelled_ids, next_sync_token = self.get_calendar_changes(access_token, sync_token)
+            except SyncTokenExpiredError:
+                logger.info(f"Calendar sync token expired for user {user.id}, doing a full resync")
+                sync_token = None
+                events, cancelled_ids, next_sync_token = self.get_calendar_changes(access_token)
             
             # Import here to avoid circular imports
-            from dal.models import Event
+            from dal.models import Event, EventParticipant
             from dal.database import db
+            from bl.services.recurrence_service import recurrence_service
+            from bl.services.calendar_reconciliation_service import calendar_reconciliation_service
+            from bl.services.google_calendar_outbox_service import google_calendar_outbox_service
             
-            synced_count = 0
+            # Match the whole batch in two queries: by Google event id, then by title + start time
+            parsed = []
             for event_data in events:
-                # Check if event already exists (by Google event ID or title + start time)
-                existing_event = None
-                
-                # First check by Google event ID
-                if event_data.get('id'):
-                    existing_event = Event.query.filter_by(
-                        user_id=user.id,
-                        google_event_id=event_data['id']
-                    ).first()
-                
-                # If not found by Google ID, check by title + start time
-                if not existing_event:
-                    event_title = event_data.get('summary', 'Untitled Event')
-                    event_start = datetime.fromisoformat(event_data['start']['dateTime'].replace('Z', '+00:00'))
-                    
-                    existing_event = Event.query.filter_by(
-                        user_id=user.id,
-                        title=event_title,
-                        start_datetime=event_start
-                    ).first()
+                event_start, event_end = self._parse_event_times(event_data)
+                if not event_start:
+                    logger.warning(f"Skipping event '{event_data.get('title')}' - no valid start time")
+                    continue
+                parsed.append((event_data, event_start, event_end))
+            
+            google_ids = [event_data['google_id'] for event_data, _, _ in parsed if event_data.get('google_id')]
+            linked = {}
+            if google_ids:
+                linked = {event.google_event_id: event for event in Event.query.filter(
+                    Event.owner_id == user.id,
+                    Event.google_event_id.in_(google_ids)
+                ).all()}
+            
+            starts = {event_start for event_data, event_start, _ in parsed if event_data.get('google_id') not in linked}
+            by_title_start = {}
+            if starts:
+                by_title_start = {(event.title, event.start_datetime): event for event in Event.query.filter(
+                    Event.owner_id == user.id,
+                    Event.google_event_id.is_(None),
+                    Event.start_datetime.in_(starts)
+                ).all()}
+            
+            created_count = 0
+            updated_count = 0
+            skipped_count = 0
+            merged, conflicted, touched = [], [], []
+            for event_data, event_start, event_end in parsed:
+                remote = calendar_reconciliation_service.remote_fields(event_data, event_start, event_end)
+                event = linked.get(event_data.get('google_id'))
+                newly_linked = False
+                if not event:
+                    event = by_title_start.get((event_data['title'], event_start))
+                    newly_linked = event is not None
+                    if event:
+                        # Same event created locally; link it instead of importing a duplicate
+                        event.google_event_id = event_data.get('google_id')
+                        logger.info(f"Linked existing event: {event.title} at {event_start}")
                 
-                if not existing_event:
-                    # Create new event
+                if event:
+                    # Changes made here since the last sync are kept, not overwritten
+                    outcome = calendar_reconciliation_service.reconcile(event, remote, event_data.get('etag'))
+                    if outcome == 'unchanged':
+                        skipped_count += 1
+                        continue
+                    if outcome == 'merged':
+                        merged.append(event)
+                    elif outcome == 'conflict':
+                        conflicted.append(event)
+                    elif event.google_sync_status == 'conflict':
+                        # Both sides ended up equal
+                        event.google_sync_status = 'synced'
+                        event.google_sync_error = None
+                    event.participants = event_data.get('participants', [])
+                    event.is_active = True
+                    recurrence_service.invalidate(event.id)
+                    if not newly_linked:
+                        updated_count += 1
+                else:
                     event = Event(
-                        id=str(uuid.uuid4()),
-                        title=event_title,
+                        title=event_data['title'],
                         description=event_data.get('description'),
                         start_datetime=event_start,
-                        end_datetime=datetime.fromisoformat(event_data['end']['dateTime'].replace('Z', '+00:00')),
+                        end_datetime=event_end,
                         location=event_data.get('location'),
-                        google_event_id=event_data.get('id'),
+                        google_event_id=event_data.get('google_id'),
+                        participants=event_data.get('participants', []),
+                        owner_id=user.id,
                         user_id=user.id,
-                        created_by=user.id,
                         is_active=True
                     )
+                    calendar_reconciliation_service.record_base(event, remote, event_data.get('etag'))
                     db.session.add(event)
-                    synced_count += 1
-                else:
-                    logger.info(f"Skipping duplicate event: {event_title} at {event_start}")
+                    created_count += 1
+                touched.append(event)
+            
+            # One flush for the new events' ids, then the invitations of the whole batch together
+            if touched:
+                db.session.flush()
+                EventParticipant.sync_from_events(touched)
             
+            # Merged app-side changes go back to Google; conflicting ones wait for the user
+            for event in merged:
+                google_calendar_outbox_service.enqueue(event, user, 'update')
+            for event in conflicted:
+                google_calendar_outbox_service.hold(event)
+            
+            # Events cancelled in Google are soft-deleted like events deleted in the app
+            cancelled_count = 0
+            if cancelled_ids:
+                cancelled_count = Event.query.filter(
+                    Event.owner_id == user.id,
+                    Event.google_event_id.in_(cancelled_ids),
+                    Event.is_active == True
+                ).update({'is_active': False, 'updated_at': datetime.utcnow()}, synchronize_session=False)
+            
+            if not sync_token:
+                cancelled_count += self._deactivate_missing_events(user, {event_data.get('google_id') for event_data in events})
+            
+            user.google_calendar_sync_token = next_sync_token
             db.session.commit()
-            logger.info(f"Synced {synced_count} Google calendar events for user {user.id}")
-            return synced_count
+            if merged:
+                google_calendar_outbox_service.wake()
+            
+            if created_count or updated_count or cancelled_count:
+                from bl.services.agenda_service import agenda_service
+                agenda_service.invalidate(user.id)
+            
+            logger.info(f"Synced Google calendar events for user {user.id}: {created_count} created, "
+                        f"{updated_count} updated, {skipped_count} unchanged, {cancelled_count} cancelled, "
+                        f"{len(merged)} merged, {len(conflicted)} in conflict")
+            return created_count + updated_count
             
         except Exception as e:
             logger.error(f"Error syncing calendar events: {str(e)}")
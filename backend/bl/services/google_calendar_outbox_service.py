@@ -0,0 +1,258 @@
+import os
+import logging
+import threading
+from datetime import datetime, timedelta
+from dal.database import db
+from dal.models import User, Event, GoogleCalendarOutbox
+
+logger = logging.getLogger(__name__)
+
+
+class GoogleCalendarOutboxService:
+    """Write-behind queue of event changes to push to Google Calendar.
+
+    Routes enqueue a sync intent in the same transaction as the event change
+    and return; a background worker pushes it. Changes to the same event made
+    while its intent is still pending are merged into one call. Failed pushes
+    are retried with exponential backoff.
+    """
+
+    def __init__(self):
+        self.poll_seconds = float(os.getenv('GOOGLE_OUTBOX_POLL_SECONDS', '10'))
+        self.batch_size = int(os.getenv('GOOGLE_OUTBOX_BATCH_SIZE', '50'))
+        self.max_attempts = int(os.getenv('GOOGLE_OUTBOX_MAX_ATTEMPTS', '8'))
+        self.backoff_base_seconds = int(os.getenv('GOOGLE_OUTBOX_BACKOFF_SECONDS', '30'))
+        self.backoff_max_seconds = int(os.getenv('GOOGLE_OUTBOX_BACKOFF_MAX_SECONDS', '3600'))
+        self.stale_after_seconds = int(os.getenv('GOOGLE_OUTBOX_STALE_SECONDS', '600'))
+        self.app = None
+        self._wakeup = threading.Event()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+    def init_app(self, app):
+        """Remember the app for the worker's app context; start draining unless testing"""
+        self.app = app
+        if not app.config.get('TESTING'):
+            self.start_worker()
+
+    # Producer side
+
+    def enqueue(self, event: Event, user: User, operation: str):
+        """Record that the event must be pushed; caller commits, then calls wake().
+
+        Returns the outbox row, or None when nothing needs to reach Google.
+        """
+        if not event.google_sync or not user.google_id:
+            return None
+
+        row = GoogleCalendarOutbox.get_pending_for_event(event.id)
+        if row:
+            if operation == 'delete' and row.operation == 'create' and not event.google_event_id:
+                # Never reached Google, so there is nothing to delete there
+                db.session.delete(row)
+                event.google_sync_status = None
+                return None
+            # create + update stays a create; anything + delete becomes a delete
+            if not (row.operation == 'create' and operation == 'update'):
+                row.operation = operation
+            row.attempts = 0
+            row.next_attempt_at = datetime.utcnow()
+            row.last_error = None
+        else:
+            row = GoogleCalendarOutbox(event_id=event.id, user_id=user.id, operation=operation,
+                                       status='pending', attempts=0, next_attempt_at=datetime.utcnow())
+            db.session.add(row)
+
+        event.google_sync_status = 'pending'
+        event.google_sync_error = None
+        return row
+
+    def hold(self, event: Event):
+        """Stop pushing an event whose app-side changes conflict with Google; caller commits.
+
+        The held rows stay as a record; the user's next edit of the event queues a new push.
+        """
+        GoogleCalendarOutbox.query.filter_by(event_id=event.id, status='pending').update(
+            {'status': 'conflict', 'updated_at': datetime.utcnow()}, synchronize_session=False
+        )
+
+    def wake(self):
+        """Tell the worker there is work, without waiting for the next poll"""
+        self._wakeup.set()
+
+    # Worker side
+
+    def start_worker(self):
+        with self._worker_lock:
+            if self._worker and self._worker.is_alive():
+                return
+            self._worker = threading.Thread(target=self._run, name='google-calendar-outbox', daemon=True)
+            self._worker.start()
+            logger.info("Started Google Calendar outbox worker")
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.poll_seconds)
+            self._wakeup.clear()
+            try:
+                with self.app.app_context():
+                    while self.process_due() == self.batch_size:
+                        pass
+            except Exception as e:
+                logger.error(f"Google Calendar outbox worker error: {str(e)}")
+
+    def process_due(self, now: datetime = None) -> int:
+        """Push every due intent once; returns how many rows were attempted"""
+        now = now or datetime.utcnow()
+
+        # Rows left in_progress by a worker that died are retried
+        stale = GoogleCalendarOutbox.query.filter(
+            GoogleCalendarOutbox.status == 'in_progress',
+            GoogleCalendarOutbox.updated_at < now - timedelta(seconds=self.stale_after_seconds)
+        ).update({'status': 'pending'}, synchronize_session=False)
+        if stale:
+            db.session.commit()
+            logger.warning(f"Requeued {stale} stale Google Calendar outbox rows")
+
+        rows = GoogleCalendarOutbox.get_due(now, self.batch_size)
+        claimed = []
+        for row in rows:
+            # One push per event at a time, so a create is never sent twice
+            if GoogleCalendarOutbox.query.filter_by(event_id=row.event_id, status='in_progress').first():
+                continue
+            if GoogleCalendarOutbox.claim(row.id):
+                claimed.append(row.id)
+        db.session.commit()
+        if not claimed:
+            return 0
+
+        # One batch request per user: the calls share that user's credentials
+        by_user = {}
+        for row in GoogleCalendarOutbox.query.filter(GoogleCalendarOutbox.id.in_(claimed)).order_by(GoogleCalendarOutbox.id):
+            by_user.setdefault(row.user_id, []).append(row)
+        for user_id, user_rows in by_user.items():
+            self._push_user(user_id, user_rows)
+        return len(claimed)
+
+    def _push_user(self, user_id, rows):
+        # Imported here to avoid a circular import with the Google services
+        from bl.services.google_calendar_sync_service import google_calendar_sync_service
+
+        user = User.query.get(user_id)
+        events = {event.id: event for event in Event.query.filter(Event.id.in_([row.event_id for row in rows]))}
+
+        done = {'ok': True, 'google_event_id': None, 'etag': None, 'error': None, 'not_found': False}
+        results = {}
+        operations = []
+        for row in rows:
+            event = events.get(row.event_id)
+            if not event or not user or not user.google_id or not event.google_sync:
+                results[row.id] = done  # Nothing to push any more
+            elif row.operation == 'delete':
+                if event.google_event_id:
+                    operations.append((row.id, 'delete', event))
+                else:
+                    results[row.id] = done
+            else:
+                # An update of an event that never reached Google creates it
+                operations.append((row.id, 'update' if event.google_event_id else 'create', event))
+
+        if operations:
+            try:
+                results.update(google_calendar_sync_service.push_batch(user, operations))
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Google Calendar push failed for user {user_id}: {str(e)}")
+            for key, operation, event in operations:
+                results.setdefault(key, {'ok': False, 'google_event_id': None, 'not_found': False,
+                                         'error': f"Google Calendar {operation} failed"})
+                if results[key].get('precondition_failed'):
+                    results[key] = self._reconcile_rejected_update(user, event, results[key])
+
+        for row in rows:
+            self._finish(row, events.get(row.event_id), results[row.id])
+        db.session.commit()
+
+    def _reconcile_rejected_update(self, user: User, event: Event, result: dict) -> dict:
+        """An update Google refused because its copy changed: merge that copy in, then retry or stop"""
+        from bl.services.google_calendar_sync_service import google_calendar_sync_service
+        from bl.services.calendar_reconciliation_service import calendar_reconciliation_service
+
+        try:
+            current = google_calendar_sync_service.fetch_event(user, event.google_event_id)
+        except Exception as e:
+            return {**result, 'error': f"Could not fetch the changed Google event: {str(e)}"}
+        if current is None:
+            return {**result, 'not_found': True}
+
+        event_data, start, end = current
+        outcome = calendar_reconciliation_service.reconcile(
+            event, calendar_reconciliation_service.remote_fields(event_data, start, end), event_data.get('etag'))
+        if outcome == 'conflict':
+            return {**result, 'conflict': True}
+        # Push again right away against the new etag (also after 'pulled': fields outside the merge may differ)
+        return {**result, 'retry_now': True, 'error': None}
+
+    def _finish(self, row: GoogleCalendarOutbox, event: Event, result: dict):
+        """Record the outcome of a push on the row and its event"""
+        # Imported here to avoid a circular import with the Google services
+        from bl.services.calendar_reconciliation_service import calendar_reconciliation_service
+
+        # An intent queued while this one was in flight carries the event's latest state
+        newer = GoogleCalendarOutbox.query.filter(
+            GoogleCalendarOutbox.event_id == row.event_id,
+            GoogleCalendarOutbox.id != row.id,
+            GoogleCalendarOutbox.status == 'pending'
+        ).first()
+
+        ok, error = result['ok'], result['error']
+        if event and ok and row.operation != 'delete':
+            if result['google_event_id']:
+                event.google_event_id = result['google_event_id']
+            if newer:
+                # The event may already hold changes that were not pushed; only the etag is current
+                event.google_etag = result.get('etag') or event.google_etag
+            else:
+                # What was pushed is now the version both sides agree on
+                calendar_reconciliation_service.record_base(
+                    event, calendar_reconciliation_service.local_fields(event), result.get('etag'))
+        if event and not ok and result['not_found'] and row.operation != 'delete':
+            # Deleted in Google meanwhile: the retry creates it again
+            event.google_event_id = None
+            event.google_etag = None
+
+        row.attempts += 1
+        row.last_error = error
+        if ok:
+            row.status = 'done'
+        elif result.get('conflict'):
+            # Changed on both sides: reconcile flagged the event and nothing more is pushed
+            row.status = 'conflict'
+            row.last_error = event.google_sync_error if event else error
+            if event:
+                self.hold(event)
+            newer = None
+        elif newer:
+            # The newer intent pushes the latest state (creating the event if this create failed)
+            row.status = 'superseded'
+        elif row.attempts >= self.max_attempts:
+            row.status = 'failed'
+        elif result.get('retry_now'):
+            # Google's changes are merged in; push again against its new version
+            row.status = 'pending'
+            row.next_attempt_at = datetime.utcnow()
+        else:
+            delay = min(self.backoff_base_seconds * 2 ** (row.attempts - 1), self.backoff_max_seconds)
+            row.status = 'pending'
+            row.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+
+        if event and not newer:
+            event.google_sync_status = {'done': 'synced', 'failed': 'failed', 'conflict': 'conflict'}.get(row.status, 'pending')
+            event.google_sync_error = row.last_error
+
+        if not ok and not result.get('retry_now'):
+            logger.warning(f"Google Calendar {row.operation} of event {row.event_id} failed "
+                           f"(attempt {row.attempts}/{self.max_attempts}): {error}")
+
+# Create a global instance
+google_calendar_outbox_service = GoogleCalendarOutboxService()
@@ -1,15 +1,14 @@
-import os
 import logging
-from datetime import datetime, timedelta
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from dal.models import User, Event
-from dal.database import db
+from bl.services.google_client_pool import google_client_pool
+from bl.services.google_token_manager import google_token_manager, GoogleTokenError
 
 logger = logging.getLogger(__name__)
 
+# Google accepts up to 50 calls per Calendar batch request
+GOOGLE_BATCH_SIZE = 50
+
 class GoogleCalendarSyncService:
     """Service for syncing events with Google Calendar"""
     
@@ -18,286 +17,133 @@ class GoogleCalendarSyncService:
     
     def ensure_valid_token(self, user: User) -> str:
         """Ensure user has a valid Google access token"""
-        if not user.google_access_token:
-            logger.warning(f"No Google access token found for user {user.id}. Google Calendar sync will be skipped.")
-            return None
-        
-        # Check if token is expired
-        if user.google_token_expires_at and user.google_token_expires_at <= datetime.utcnow():
-            if not user.google_refresh_token:
-                logger.warning(f"Google token expired and no refresh token available for user {user.id}. Google Calendar sync will be skipped.")
-                return None
-            
-            # Refresh the token
-            try:
-                credentials = Credentials(
-                    token=user.google_access_token,
-                    refresh_token=user.google_refresh_token,
-                    token_uri="https://oauth2.googleapis.com/token",
-                    client_id=os.getenv('GOOGLE_CLIENT_ID'),
-                    client_secret=os.getenv('GOOGLE_CLIENT_SECRET')
-                )
-                
-                credentials.refresh(Request())
-                
-                # Update user with new tokens
-                user.google_access_token = credentials.token
-                if credentials.refresh_token:
-                    user.google_refresh_token = credentials.refresh_token
-                if credentials.expiry:
-                    user.google_token_expires_at = credentials.expiry
-                
-                db.session.commit()
-                logger.info(f"Refreshed Google token for user {user.id}")
-                
-            except Exception as e:
-                logger.error(f"Failed to refresh Google token for user {user.id}: {str(e)}")
-                logger.warning("Google Calendar sync will be skipped due to token refresh failure")
-                return None
-        
-        return user.google_access_token
-    
-    def create_event_in_google_calendar(self, event: Event, user: User) -> str:
-        """Create an event in Google Calendar and return the Google event ID"""
         try:
-            access_token = self.ensure_valid_token(user)
-            if not access_token:
-                logger.warning("No valid Google access token available - skipping Google Calendar event creation")
-                return None
-            
-            credentials = Credentials(token=access_token)
-            service = build('calendar', 'v3', credentials=credentials)
-            
-            # Convert our event to Google Calendar format
-            google_event = {
-                'summary': event.title,
-                'description': event.description or '',
-                'location': event.location or '',
-                'start': {
-                    'dateTime': event.start_datetime.isoformat(),
-                    'timeZone': 'UTC'
-                },
-                'end': {
-                    'dateTime': event.end_datetime.isoformat(),
-                    'timeZone': 'UTC'
-                },
-                'reminders': {
-                    'useDefault': False,
-                    'overrides': [
-                        {'method': 'popup', 'minutes': event.alert_minutes or 15}
-                    ]
-                }
-            }
-            
-            # Add participants if any
-            if event.participants:
-                attendees = []
-                for participant in event.participants:
-                    if participant.get('email'):
-                        attendees.append({
-                            'email': participant['email'],
-                            'displayName': participant.get('name', participant['email'])
-                        })
-                if attendees:
-                    google_event['attendees'] = attendees
-            
-            # Create the event
-            created_event = service.events().insert(
-                calendarId='primary',
-                body=google_event
-            ).execute()
-            
-            google_event_id = created_event['id']
-            logger.info(f"Created Google Calendar event {google_event_id} for event {event.id}")
-            
-            return google_event_id
-            
-        except HttpError as e:
-            if e.resp.status == 403 and "insufficientPermissions" in str(e.content):
-                logger.error(f"Google Calendar API error: Insufficient permissions. User needs to re-authenticate with Google to get write access.")
-                logger.warning("Google Calendar sync will be skipped due to insufficient permissions")
-                return None
-            else:
-                logger.error(f"Error creating Google Calendar event: {str(e)}")
-                logger.warning("Google Calendar sync will be skipped due to API error")
-                return None
-        except Exception as e:
-            logger.error(f"Unexpected error creating Google Calendar event: {str(e)}")
-            logger.warning("Google Calendar sync will be skipped due to unexpected error")
+            return google_token_manager.get_access_token(user)
+        except GoogleTokenError as e:
+            logger.warning(f"No valid Google token for user {user.id}, Google Calendar sync will be skipped: {str(e)}")
             return None
     
-    def update_event_in_google_calendar(self, event: Event, user: User) -> bool:
-        """Update an event in Google Calendar"""
-        try:
-            if not event.google_event_id:
-                logger.warning(f"Event {event.id} has no Google event ID, creating new event")
-                google_event_id = self.create_event_in_google_calendar(event, user)
-                event.google_event_id = google_event_id
-                db.session.commit()
-                return True
-            
-            access_token = self.ensure_valid_token(user)
-            if not access_token:
-                logger.warning("No valid Google access token available - skipping Google Calendar event update")
-                return False
-            
-            credentials = Credentials(token=access_token)
-            service = build('calendar', 'v3', credentials=credentials)
-            
-            # Convert our event to Google Calendar format
-            google_event = {
-                'summary': event.title,
-                'description': event.description or '',
-                'location': event.location or '',
-                'start': {
-                    'dateTime': event.start_datetime.isoformat(),
-                    'timeZone': 'UTC'
-                },
-                'end': {
-                    'dateTime': event.end_datetime.isoformat(),
-                    'timeZone': 'UTC'
-                },
-                'reminders': {
-                    'useDefault': False,
-                    'overrides': [
-                        {'method': 'popup', 'minutes': event.alert_minutes or 15}
-                    ]
-                }
+    @staticmethod
+    def to_google_event(event: Event) -> dict:
+        """Convert our event to Google Calendar format"""
+        google_event = {
+            'summary': event.title,
+            'description': event.description or '',
+            'location': event.location or '',
+            'start': {
+                'dateTime': event.start_datetime.isoformat(),
+                'timeZone': 'UTC'
+            },
+            'end': {
+                'dateTime': event.end_datetime.isoformat(),
+                'timeZone': 'UTC'
+            },
+            'reminders': {
+                'useDefault': False,
+                'overrides': [
+                    {'method': 'popup', 'minutes': event.alert_minutes or 15}
+                ]
             }
-            
-            # Add participants if any
-            if event.participants:
-                attendees = []
-                for participant in event.participants:
-                    if participant.get('email'):
-                        attendees.append({
-                            'email': participant['email'],
-                            'displayName': participant.get('name', participant['email'])
-                        })
-                if attendees:
-                    google_event['attendees'] = attendees
-            
-            # Update the event
-            service.events().update(
-                calendarId='primary',
-                eventId=event.google_event_id,
-                body=google_event
-            ).execute()
-            
-            logger.info(f"Updated Google Calendar event {event.google_event_id} for event {event.id}")
-            return True
-            
-        except HttpError as e:
-            if e.resp.status == 403 and "insufficientPermissions" in str(e.content):
-                logger.error(f"Google Calendar API error: Insufficient permissions. User needs to re-authenticate with Google to get write access.")
-                logger.warning("Google Calendar sync will be skipped due to insufficient permissions")
-                return False
-            elif e.resp.status == 404:
-                logger.warning(f"Google Calendar event {event.google_event_id} not found, creating new event")
-                google_event_id = self.create_event_in_google_calendar(event, user)
-                if google_event_id:
-                    event.google_event_id = google_event_id
-                    db.session.commit()
-                    return True
+        }
+        
+        # Add participants if any
+        if event.participants:
+            attendees = []
+            for participant in event.participants:
+                if participant.get('email'):
+                    attendees.append({
+                        'email': participant['email'],
+                        'displayName': participant.get('name', participant['email'])
+                    })
+            if attendees:
+                google_event['attendees'] = attendees
+        
+        return google_event
+    
+    def push_batch(self, user: User, operations) -> dict:
+        """Send many event changes in Google batch requests of up to GOOGLE_BATCH_SIZE calls.
+        
+        operations is a list of (key, operation, event) with operation 'create',
+        'update' or 'delete'. Returns {key: {'ok', 'google_event_id', 'etag',
+        'error', 'not_found', 'precondition_failed'}}; a create reports the new
+        Google event ID. Updates only apply to the Google version last
+        reconciled (If-Match on its etag); precondition_failed means Google's
+        copy changed since. Items fail and succeed independently, so callers
+        retry only the failed ones.
+        """
+        results = {}
+        access_token = self.ensure_valid_token(user)
+        if not access_token:
+            for key, _, _ in operations:
+                results[key] = {'ok': False, 'google_event_id': None, 'etag': None, 'not_found': False,
+                                'precondition_failed': False, 'error': 'No valid Google access token'}
+            return results
+        
+        def callback_for(key, operation, event):
+            def callback(request_id, response, exception):
+                result = {'ok': False, 'google_event_id': None, 'etag': None, 'error': None,
+                          'not_found': False, 'precondition_failed': False}
+                if exception is None:
+                    result.update(ok=True, google_event_id=(response or {}).get('id') or event.google_event_id,
+                                  etag=(response or {}).get('etag'))
+                    results[key] = result
+                    return
+                status = getattr(getattr(exception, 'resp', None), 'status', None)
+                if operation == 'delete' and status in (404, 410):
+                    # Already gone from Google
+                    result.update(ok=True, not_found=True)
                 else:
-                    logger.warning("Failed to create new Google Calendar event")
-                    return False
-            else:
-                logger.error(f"Error updating Google Calendar event: {str(e)}")
-                logger.warning("Google Calendar sync will be skipped due to API error")
-                return False
-        except Exception as e:
-            logger.error(f"Unexpected error updating Google Calendar event: {str(e)}")
-            logger.warning("Google Calendar sync will be skipped due to unexpected error")
-            return False
+                    result.update(error=str(exception), not_found=status in (404, 410),
+                                  precondition_failed=status == 412)
+                results[key] = result
+            return callback
+        
+        with google_client_pool.client(access_token, 'calendar', 'v3') as service:
+            for offset in range(0, len(operations), GOOGLE_BATCH_SIZE):
+                chunk = operations[offset:offset + GOOGLE_BATCH_SIZE]
+                batch = service.new_batch_http_request()
+                for key, operation, event in chunk:
+                    if operation == 'delete':
+                        request = service.events().delete(calendarId='primary', eventId=event.google_event_id)
+                    elif operation == 'update':
+                        request = service.events().update(calendarId='primary', eventId=event.google_event_id,
+                                                          body=self.to_google_event(event))
+                        if event.google_etag:
+                            # Never overwrite an edit made in Google that has not been reconciled
+                            request.headers['If-Match'] = event.google_etag
+                    else:
+                        request = service.events().insert(calendarId='primary', body=self.to_google_event(event))
+                    batch.add(request, callback=callback_for(key, operation, event), request_id=str(key))
+                try:
+                    batch.execute()
+                except Exception as e:
+                    logger.error(f"Google Calendar batch request failed for user {user.id}: {str(e)}")
+                    for key, _, _ in chunk:
+                        results.setdefault(key, {'ok': False, 'google_event_id': None, 'etag': None, 'error': str(e),
+                                                 'not_found': False, 'precondition_failed': False})
+                logger.info(f"Sent {len(chunk)} Google Calendar changes in one batch for user {user.id}")
+        
+        return results
     
-    def delete_event_from_google_calendar(self, event: Event, user: User) -> bool:
-        """Delete an event from Google Calendar"""
+    def fetch_event(self, user: User, google_event_id: str):
+        """Current Google version of one event as (processed event dict, start, end); None if gone"""
+        from bl.services.google_auth_service import GoogleAuthService
+        
+        access_token = self.ensure_valid_token(user)
+        if not access_token:
+            raise ValueError("No valid Google access token")
         try:
-            if not event.google_event_id:
-                logger.warning(f"Event {event.id} has no Google event ID, nothing to delete")
-                return True
-            
-            access_token = self.ensure_valid_token(user)
-            if not access_token:
-                logger.warning("No valid Google access token available - skipping Google Calendar event deletion")
-                return False
-            
-            credentials = Credentials(token=access_token)
-            service = build('calendar', 'v3', credentials=credentials)
-            
-            # Delete the event
-            service.events().delete(
-                calendarId='primary',
-                eventId=event.google_event_id
-            ).execute()
-            
-            logger.info(f"Deleted Google Calendar event {event.google_event_id} for event {event.id}")
-            return True
-            
+            with google_client_pool.client(access_token, 'calendar', 'v3') as service:
+                google_event = service.events().get(calendarId='primary', eventId=google_event_id).execute()
         except HttpError as e:
-            if e.resp.status == 403 and "insufficientPermissions" in str(e.content):
-                logger.error(f"Google Calendar API error: Insufficient permissions. User needs to re-authenticate with Google to get write access.")
-                logger.warning("Google Calendar sync will be skipped due to insufficient permissions")
-                return False
-            elif e.resp.status == 404:
-                logger.warning(f"Google Calendar event {event.google_event_id} not found, already deleted")
-                return True
-            else:
-                logger.error(f"Error deleting Google Calendar event: {str(e)}")
-                logger.warning("Google Calendar sync will be skipped due to API error")
-                return False
-        except Exception as e:
-            logger.error(f"Unexpected error deleting Google Calendar event: {str(e)}")
-            logger.warning("Google Calendar sync will be skipped due to unexpected error")
-            return False
-    
-    def sync_event_to_google_calendar(self, event: Event, user: User, operation: str = 'create') -> bool:
-        """Sync an event to Google Calendar based on operation"""
-        try:
-            logger.info(f"🔄 GOOGLE SYNC DEBUG: Starting {operation} sync for event {event.id}")
-            logger.info(f"  - Event title: {event.title}")
-            logger.info(f"  - Event google_sync: {getattr(event, 'google_sync', 'NOT_SET')}")
-            logger.info(f"  - User google_id: {user.google_id}")
-            logger.info(f"  - User email: {user.email}")
-            
-            # Check if Google sync is enabled for this event
-            if hasattr(event, 'google_sync') and not event.google_sync:
-                logger.info(f"🔄 GOOGLE SYNC DEBUG: Google sync disabled for event {event.id}, skipping")
-                return True
-            
-            # Check if user has Google account connected
-            if not user.google_id:
-                logger.warning(f"🔄 GOOGLE SYNC DEBUG: User {user.id} has no Google account connected, skipping sync")
-                return True
-            
-            logger.info(f"🔄 GOOGLE SYNC DEBUG: Proceeding with {operation} sync...")
-            
-            if operation == 'create':
-                google_event_id = self.create_event_in_google_calendar(event, user)
-                event.google_event_id = google_event_id
-                db.session.commit()
-                logger.info(f"🔄 GOOGLE SYNC DEBUG: Created Google event {google_event_id} for event {event.id}")
-                return True
-            elif operation == 'update':
-                result = self.update_event_in_google_calendar(event, user)
-                logger.info(f"🔄 GOOGLE SYNC DEBUG: Updated Google event for event {event.id}: {result}")
-                return result
-            elif operation == 'delete':
-                result = self.delete_event_from_google_calendar(event, user)
-                logger.info(f"🔄 GOOGLE SYNC DEBUG: Deleted Google event for event {event.id}: {result}")
-                return result
-            else:
-                logger.error(f"🔄 GOOGLE SYNC DEBUG: Unknown operation: {operation}")
-                return False
-                
-        except Exception as e:
-            logger.error(f"🔄 GOOGLE SYNC DEBUG: Error syncing event {event.id} to Google Calendar: {str(e)}")
-            logger.error(f"🔄 GOOGLE SYNC DEBUG: Exception type: {type(e).__name__}")
-            import traceback
-            logger.error(f"🔄 GOOGLE SYNC DEBUG: Traceback: {traceback.format_exc()}")
-            # Don't raise the exception to avoid breaking the main operation
-            return False
+            if e.resp.status in (404, 410):
+                return None
+            raise
+        if google_event.get('status') == 'cancelled':
+            return None
+        event_data = GoogleAuthService._process_calendar_event(google_event)
+        start, end = GoogleAuthService._parse_event_times(event_data)
+        return event_data, start, end
 
 # Create a global instance
 google_calendar_sync_service = GoogleCalendarSyncService()
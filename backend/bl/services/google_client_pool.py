@@ -0,0 +1,128 @@
+import os
+import json
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+import httplib2
+import google_auth_httplib2
+from google.oauth2.credentials import Credentials
+from googleapiclient import discovery_cache
+from googleapiclient.discovery import build_from_document
+from bl.services.google_rate_limiter import google_rate_limiter, RateLimitedHttp
+
+logger = logging.getLogger(__name__)
+
+
+class GoogleClientPool:
+    """Reusable Google API clients.
+
+    Discovery documents are read from the copies bundled with
+    google-api-python-client and parsed once per process. Built clients keep
+    their httplib2 connection, so consecutive calls for the same credentials
+    skip the TLS handshake, and send through the shared rate limiter. httplib2 is not thread-safe: a client is checked
+    out by one caller at a time, and concurrent callers get their own.
+    """
+
+    def __init__(self):
+        self.max_idle_clients = int(os.getenv('GOOGLE_CLIENT_POOL_MAX_IDLE', '64'))
+        self.timeout_seconds = int(os.getenv('GOOGLE_API_TIMEOUT_SECONDS', '30'))
+        # Base URL overrides per API, e.g. to point the sync at a local fake Google server
+        self.api_endpoints = {
+            api: endpoint for api, endpoint in (
+                ('people', os.getenv('GOOGLE_PEOPLE_API_ENDPOINT')),
+                ('calendar', os.getenv('GOOGLE_CALENDAR_API_ENDPOINT'))
+            ) if endpoint
+        }
+        self._documents = {}  # (api, version) -> parsed discovery document
+        self._idle = OrderedDict()  # (api, version, access_token) -> [client, ...]; least recently used first
+        self._idle_count = 0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'in_use': 0}
+
+    def _document(self, api, version):
+        document = self._documents.get((api, version))
+        if document is None:
+            static_document = discovery_cache.get_static_doc(api, version)
+            if static_document is None:
+                raise ValueError(f"No bundled discovery document for {api} {version}")
+            # build_from_document accepts the parsed dict, so the JSON is decoded only once
+            document = json.loads(static_document)
+            self._documents[(api, version)] = document
+        return document
+
+    def _build(self, api, version, access_token):
+        http = google_auth_httplib2.AuthorizedHttp(
+            Credentials(token=access_token),
+            http=httplib2.Http(timeout=self.timeout_seconds)
+        )
+        # Every request of the client waits for a slot of the API's shared quota
+        http = RateLimitedHttp(http, google_rate_limiter, api)
+        endpoint = self.api_endpoints.get(api)
+        client_options = {'api_endpoint': endpoint} if endpoint else None
+        return build_from_document(self._document(api, version), http=http, client_options=client_options)
+
+    def acquire(self, access_token, api, version):
+        """Check out a client for the access token, building one if none is idle"""
+        key = (api, version, access_token)
+        with self._lock:
+            self._stats['in_use'] += 1
+            clients = self._idle.get(key)
+            if clients:
+                client = clients.pop()
+                self._idle_count -= 1
+                if not clients:
+                    del self._idle[key]
+                self._stats['hits'] += 1
+                return client
+            self._stats['misses'] += 1
+        try:
+            return self._build(api, version, access_token)
+        except Exception:
+            with self._lock:
+                self._stats['in_use'] -= 1
+            raise
+
+    def release(self, access_token, api, version, client):
+        """Return a checked-out client to the pool, evicting the least recently used idle ones"""
+        key = (api, version, access_token)
+        with self._lock:
+            self._stats['in_use'] -= 1
+            self._idle.setdefault(key, []).append(client)
+            self._idle.move_to_end(key)
+            self._idle_count += 1
+            while self._idle_count > self.max_idle_clients:
+                oldest_key, clients = next(iter(self._idle.items()))
+                clients.pop(0)
+                self._idle_count -= 1
+                if not clients:
+                    del self._idle[oldest_key]
+                self._stats['evictions'] += 1
+
+    @contextmanager
+    def client(self, access_token, api, version):
+        """with google_client_pool.client(token, 'calendar', 'v3') as service: ..."""
+        service = self.acquire(access_token, api, version)
+        try:
+            yield service
+        finally:
+            self.release(access_token, api, version, service)
+
+    def discard_token(self, access_token):
+        """Drop idle clients of a token that was refreshed or revoked"""
+        with self._lock:
+            for key in [key for key in self._idle if key[2] == access_token]:
+                self._idle_count -= len(self._idle.pop(key))
+
+    def stats(self):
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return {
+                **self._stats,
+                'idle': self._idle_count,
+                'hit_rate': round(self._stats['hits'] / lookups, 3) if lookups else None,
+                'discovery_documents': len(self._documents)
+            }
+
+# Create a global instance
+google_client_pool = GoogleClientPool()
@@ -0,0 +1,112 @@
+import os
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class GoogleRateLimitTimeout(Exception):
+    """No request slot became free within the limiter's timeout"""
+
+
+class TokenBucket:
+    """Token bucket that hands out slots in arrival order.
+
+    Each caller reserves the next free slot under the lock and then sleeps
+    until it, so a steady caller cannot starve the others and bursts of up
+    to `capacity` requests go through without waiting.
+    """
+
+    def __init__(self, rate, capacity):
+        self.interval = 1.0 / rate
+        self.burst = (capacity - 1) * self.interval
+        self._next_slot = 0.0  # Theoretical arrival time of the next request
+        self._lock = threading.Lock()
+        self.waited_seconds = 0.0
+
+    def reserve(self, timeout=None, slots=1):
+        """Seconds to wait before the reserved slots may be used; None when that exceeds timeout"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next_slot, now)
+            # Several slots go out together, so wait until the last of them is free
+            wait = max(slot + (slots - 1) * self.interval - self.burst - now, 0.0)
+            if timeout is not None and wait > timeout:
+                return None
+            self._next_slot = slot + slots * self.interval
+            self.waited_seconds += wait
+            return wait
+
+    def acquire(self, timeout=None, slots=1):
+        wait = self.reserve(timeout, slots)
+        if wait is None:
+            return False
+        if wait:
+            time.sleep(wait)
+        return True
+
+
+class GoogleRateLimiter:
+    """Per-API request budgets shared by every Google call of the process.
+
+    Defaults sit below Google's per-project quotas: the People API allows 90
+    contact reads per minute, the Calendar API 600 requests per minute.
+    """
+
+    def __init__(self):
+        self.timeout_seconds = float(os.getenv('GOOGLE_RATE_LIMIT_TIMEOUT_SECONDS', '120'))
+        self.buckets = {
+            'people': TokenBucket(float(os.getenv('GOOGLE_PEOPLE_REQUESTS_PER_SECOND', '1.4')),
+                                  int(os.getenv('GOOGLE_PEOPLE_REQUEST_BURST', '10'))),
+            'calendar': TokenBucket(float(os.getenv('GOOGLE_CALENDAR_REQUESTS_PER_SECOND', '9')),
+                                    int(os.getenv('GOOGLE_CALENDAR_REQUEST_BURST', '20')))
+        }
+        self._requests = {api: 0 for api in self.buckets}
+
+    def acquire(self, api, requests=1):
+        """Block until requests to the API may be sent; APIs without a bucket are not limited"""
+        bucket = self.buckets.get(api)
+        if bucket is None:
+            return
+        if not bucket.acquire(self.timeout_seconds, requests):
+            raise GoogleRateLimitTimeout(f"Google {api} request budget exhausted")
+        self._requests[api] += requests
+
+    def stats(self):
+        return {api: {'requests': self._requests[api], 'waited_seconds': round(bucket.waited_seconds, 3)}
+                for api, bucket in self.buckets.items()}
+
+
+def batch_request_count(headers, body):
+    """Calls carried by one HTTP request: the parts of a multipart/mixed batch, else 1"""
+    content_type = next((value for key, value in (headers or {}).items() if key.lower() == 'content-type'), '')
+    if not content_type.startswith('multipart/mixed') or 'boundary=' not in content_type or not body:
+        return 1
+    if isinstance(body, bytes):
+        body = body.decode('utf-8', errors='replace')
+    delimiter = '--' + content_type.split('boundary=', 1)[1].strip().strip('"')
+    return max(sum(1 for line in body.splitlines() if line.rstrip() == delimiter), 1)
+
+
+class RateLimitedHttp:
+    """httplib2-compatible wrapper that takes a request slot before every call.
+
+    Google counts every call inside a batch request against the quota, so a
+    batch takes one slot per call.
+    """
+
+    def __init__(self, http, limiter, api):
+        self.http = http
+        self.limiter = limiter
+        self.api = api
+
+    def request(self, uri, method='GET', body=None, headers=None, *args, **kwargs):
+        self.limiter.acquire(self.api, batch_request_count(headers, body))
+        return self.http.request(uri, method, body, headers, *args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.http, name)
+
+# Create a global instance
+google_rate_limiter = GoogleRateLimiter()
@@ -0,0 +1,268 @@
+import os
+import socket
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from dal.database import db
+from dal.models import User, GoogleSyncJob, BackgroundLease
+from bl.services.google_rate_limiter import GoogleRateLimitTimeout
+
+logger = logging.getLogger(__name__)
+
+
+def is_retryable_google_error(error):
+    """Quota (429) and server (5xx) errors are worth retrying later; anything else is not"""
+    if isinstance(error, GoogleRateLimitTimeout):
+        return True
+    status = getattr(getattr(error, 'resp', None), 'status', None)
+    try:
+        status = int(status)
+    except (TypeError, ValueError):
+        return False
+    return status == 429 or status >= 500
+
+
+class GoogleSyncJobService:
+    """Runs Google contact and calendar syncs outside the request.
+
+    A job is a row recording its status and per-resource progress, so the UI
+    can poll it. Jobs run on a bounded thread pool; a user has at most one
+    queued or running job at a time.
+
+    Besides the sync queued after login, a scheduler periodically queues an
+    incremental sync for every connected user, least recently synced first.
+    Only the process holding the scheduler lease queues them. A user whose
+    sync failed is not scheduled again until a backoff stored on the user has
+    passed: exponential from minutes for Google quota or server errors, from
+    an hour for anything else (a revoked token, a bad response).
+
+    A job still queued or running after GOOGLE_SYNC_JOB_STALE_SECONDS was
+    lost with the process that ran it; it is marked failed so the user's
+    next sync can be queued.
+    """
+
+    def __init__(self):
+        self.max_workers = int(os.getenv('GOOGLE_SYNC_MAX_WORKERS', '4'))
+        self.schedule_interval_seconds = int(os.getenv('GOOGLE_SCHEDULED_SYNC_INTERVAL_SECONDS', '3600'))
+        self.schedule_poll_seconds = float(os.getenv('GOOGLE_SCHEDULED_SYNC_POLL_SECONDS', '60'))
+        self.backoff_base_seconds = int(os.getenv('GOOGLE_SYNC_BACKOFF_SECONDS', '300'))
+        self.backoff_max_seconds = int(os.getenv('GOOGLE_SYNC_BACKOFF_MAX_SECONDS', '21600'))
+        self.failure_backoff_base_seconds = int(os.getenv('GOOGLE_SYNC_FAILURE_BACKOFF_SECONDS', '3600'))
+        self.failure_backoff_max_seconds = int(os.getenv('GOOGLE_SYNC_FAILURE_BACKOFF_MAX_SECONDS', '86400'))
+        self.job_retention_days = int(os.getenv('GOOGLE_SYNC_JOB_RETENTION_DAYS', '7'))
+        self.stale_after_seconds = int(os.getenv('GOOGLE_SYNC_JOB_STALE_SECONDS', '1800'))
+        self.app = None
+        self.google_auth_service = None  # Created on first use; tests swap in one with fake clients
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._scheduler = None
+        self._holder = f"{socket.gethostname()}:{os.getpid()}"
+
+    def init_app(self, app):
+        """Remember the app for the jobs' app context; start the scheduler unless testing or disabled"""
+        self.app = app
+        if not app.config.get('TESTING') and self.schedule_interval_seconds > 0:
+            self.start_scheduler()
+
+    def enqueue(self, user: User) -> GoogleSyncJob:
+        """Queue a sync of the user's Google data; returns the already active job if there is one"""
+        job = GoogleSyncJob.get_active_for_user(user.id)
+        if job and self._is_stale(job):
+            self._fail_stale(job)
+            job = None
+        if job:
+            return job
+
+        job = GoogleSyncJob(user_id=user.id, status='queued', progress=GoogleSyncJob.new_progress())
+        db.session.add(job)
+        db.session.commit()
+        self._submit(job.id)
+        return job
+
+    def _submit(self, job_id):
+        # Tests run jobs synchronously through run_job
+        if self.app is None or self.app.config.get('TESTING'):
+            return
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='google-sync')
+        self._executor.submit(self._run_in_app, job_id)
+
+    def _run_in_app(self, job_id):
+        with self.app.app_context():
+            try:
+                self.run_job(job_id)
+            except Exception as e:
+                logger.error(f"Google sync job {job_id} crashed: {str(e)}")
+            finally:
+                db.session.remove()
+
+    def _is_stale(self, job, now=None):
+        cutoff = (now or datetime.utcnow()) - timedelta(seconds=self.stale_after_seconds)
+        since = job.started_at if job.status == 'running' else job.created_at
+        return since is not None and since < cutoff
+
+    def _fail_stale(self, job):
+        # Caller commits
+        for resource, state in job.progress.items():
+            if state['status'] in ('pending', 'running'):
+                self._set_progress(job, resource, status='failed', error='Sync was interrupted')
+        job.status = 'failed'
+        job.finished_at = datetime.utcnow()
+        logger.warning(f"Google sync job {job.id} of user {job.user_id} was abandoned; marked failed")
+
+    def fail_stale_jobs(self, now=None) -> int:
+        """Mark failed the jobs lost by a process that restarted or died; returns how many"""
+        now = now or datetime.utcnow()
+        cutoff = now - timedelta(seconds=self.stale_after_seconds)
+        jobs = GoogleSyncJob.query.filter(db.or_(
+            db.and_(GoogleSyncJob.status == 'queued', GoogleSyncJob.created_at < cutoff),
+            db.and_(GoogleSyncJob.status == 'running', GoogleSyncJob.started_at < cutoff)
+        )).all()
+        for job in jobs:
+            self._fail_stale(job)
+        db.session.commit()
+        return len(jobs)
+
+    # Scheduled syncs
+
+    def start_scheduler(self):
+        with self._executor_lock:
+            if self._scheduler and self._scheduler.is_alive():
+                return
+            self._scheduler = threading.Thread(target=self._schedule_loop, name='google-sync-scheduler', daemon=True)
+            self._scheduler.start()
+            logger.info("Started Google sync scheduler")
+
+    def _schedule_loop(self):
+        while True:
+            try:
+                with self.app.app_context():
+                    self.schedule_once()
+            except Exception as e:
+                logger.error(f"Google sync scheduler error: {str(e)}")
+            finally:
+                db.session.remove()
+            threading.Event().wait(self.schedule_poll_seconds)
+
+    def schedule_once(self, now=None):
+        """Queue due syncs if this process holds the scheduler lease; None when another one does"""
+        # Outlives a couple of polls, so the lease moves on only when its holder is gone
+        if not BackgroundLease.acquire('google-sync-scheduler', self._holder, self.schedule_poll_seconds * 3, now):
+            return None
+        return self.enqueue_due_users(now)
+
+    @staticmethod
+    def is_backing_off(user: User, now=None):
+        return bool(user.google_sync_retry_at) and user.google_sync_retry_at > (now or datetime.utcnow())
+
+    def _record_outcome(self, user: User, failure):
+        """Clear the backoff after a clean sync, extend it after a 'retryable' or 'permanent' failure; caller commits"""
+        if not failure:
+            user.google_sync_failures = 0
+            user.google_sync_retry_at = None
+            return
+        failures = (user.google_sync_failures or 0) + 1
+        if failure == 'retryable':
+            delay = min(self.backoff_base_seconds * 2 ** (failures - 1), self.backoff_max_seconds)
+        else:
+            delay = min(self.failure_backoff_base_seconds * 2 ** (failures - 1), self.failure_backoff_max_seconds)
+        user.google_sync_failures = failures
+        user.google_sync_retry_at = datetime.utcnow() + timedelta(seconds=delay)
+        logger.warning(f"Backing off Google sync of user {user.id} for {delay}s after {failures} failed attempts ({failure})")
+
+    def enqueue_due_users(self, now=None) -> list:
+        """Queue syncs for connected users not synced within the interval; returns the new job ids.
+
+        Only as many jobs are queued as the pool can start soon, so a sync
+        queued after a login never waits behind a long scheduled backlog.
+        """
+        now = now or datetime.utcnow()
+        cutoff = now - timedelta(seconds=self.schedule_interval_seconds)
+
+        GoogleSyncJob.query.filter(
+            GoogleSyncJob.status.in_(['done', 'failed']),
+            GoogleSyncJob.finished_at < now - timedelta(days=self.job_retention_days)
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        self.fail_stale_jobs(now)
+
+        active_user_ids = db.session.query(GoogleSyncJob.user_id).filter(GoogleSyncJob.status.in_(['queued', 'running']))
+        capacity = self.max_workers * 2 - active_user_ids.count()
+        if capacity <= 0:
+            return []
+
+        candidates = User.query.filter(
+            User.google_id.isnot(None),
+            User.google_refresh_token.isnot(None),
+            db.or_(User.google_contacts_synced_at.is_(None), User.google_contacts_synced_at < cutoff,
+                   User.google_calendar_synced_at.is_(None), User.google_calendar_synced_at < cutoff),
+            db.or_(User.google_sync_retry_at.is_(None), User.google_sync_retry_at <= now),
+            ~User.id.in_(active_user_ids)
+        ).order_by(
+            # Least recently synced first, so every user gets a turn
+            db.func.coalesce(User.google_calendar_synced_at, User.google_contacts_synced_at).asc().nulls_first(),
+            User.id
+        ).limit(capacity).all()
+
+        job_ids = [self.enqueue(user).id for user in candidates]
+        if job_ids:
+            logger.info(f"Queued {len(job_ids)} scheduled Google syncs")
+        return job_ids
+
+    def _auth_service(self):
+        if self.google_auth_service is None:
+            # Imported here: the auth service pulls in the Google client libraries
+            from bl.services.google_auth_service import GoogleAuthService
+            self.google_auth_service = GoogleAuthService()
+        return self.google_auth_service
+
+    def _set_progress(self, job, resource, **changes):
+        # Assign a new dict so the JSON column is flagged as changed
+        progress = {name: dict(state) for name, state in job.progress.items()}
+        progress[resource].update(changes)
+        job.progress = progress
+
+    def run_job(self, job_id) -> GoogleSyncJob:
+        """Sync each resource of a queued job, committing progress as it goes"""
+        job = GoogleSyncJob.query.get(job_id)
+        if not job or job.status != 'queued':
+            return job
+        job.status = 'running'
+        job.started_at = datetime.utcnow()
+        db.session.commit()
+
+        user = User.query.get(job.user_id)
+        failed = []
+        failure = None
+        for resource in list(job.progress):
+            self._set_progress(job, resource, status='running')
+            db.session.commit()
+            try:
+                service = self._auth_service()
+                if resource == 'contacts':
+                    synced = service.sync_contacts(user)
+                    user.google_contacts_synced_at = datetime.utcnow()
+                else:
+                    synced = service.sync_calendar_events(user)
+                    user.google_calendar_synced_at = datetime.utcnow()
+                self._set_progress(job, resource, status='done', synced=synced)
+                logger.info(f"Synced {synced} Google {resource} for user {job.user_id}")
+            except Exception as e:
+                db.session.rollback()
+                failed.append(resource)
+                # Anything but quota or server errors will fail again soon, so it backs off longer
+                failure = (failure or 'retryable') if is_retryable_google_error(e) else 'permanent'
+                self._set_progress(job, resource, status='failed', error=str(e))
+                logger.warning(f"Google {resource} sync failed for user {job.user_id}: {str(e)}")
+            db.session.commit()
+
+        job.status = 'failed' if failed else 'done'
+        job.finished_at = datetime.utcnow()
+        self._record_outcome(user, failure)
+        db.session.commit()
+        return job
+
+# Create a global instance
+google_sync_job_service = GoogleSyncJobService()
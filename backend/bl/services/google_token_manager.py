@@ -0,0 +1,173 @@
+import os
+import time
+import logging
+import threading
+from datetime import datetime, timedelta
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from dal.models import User
+from dal.database import db
+from bl.services.google_client_pool import google_client_pool
+
+logger = logging.getLogger(__name__)
+
+
+class GoogleTokenError(ValueError):
+    """No usable Google access token; the user has to re-authenticate"""
+
+
+class GoogleTokenManager:
+    """Hands out valid Google access tokens for users.
+
+    Tokens are refreshed a few minutes before they expire rather than after a
+    call fails. Concurrent callers for the same user share one refresh:
+    threads of this process wait on a per-user lock, and other processes are
+    kept out by a short lease stored on the user row, written on a separate
+    session so the caller's own changes are left alone. Refreshed tokens are
+    remembered in memory, so callers still holding an older copy of the user
+    row do not refresh again.
+    """
+
+    def __init__(self):
+        self.client_id = os.getenv('GOOGLE_CLIENT_ID')
+        self.client_secret = os.getenv('GOOGLE_CLIENT_SECRET')
+        self.refresh_margin_seconds = int(os.getenv('GOOGLE_TOKEN_REFRESH_MARGIN_SECONDS', '300'))
+        self.lease_seconds = int(os.getenv('GOOGLE_TOKEN_REFRESH_LEASE_SECONDS', '30'))
+        self.lease_poll_seconds = float(os.getenv('GOOGLE_TOKEN_LEASE_POLL_SECONDS', '0.5'))
+        self._tokens = {}  # user_id -> (access_token, expires_at, refresh_token)
+        self._locks = {}  # user_id -> lock held while refreshing
+        self._locks_lock = threading.Lock()
+        self._sleep = time.sleep
+        self._stats = {'cached': 0, 'refreshes': 0, 'lease_waits': 0}
+
+    def _is_fresh(self, expires_at, now):
+        return expires_at is not None and expires_at - timedelta(seconds=self.refresh_margin_seconds) > now
+
+    def _cached(self, user, now):
+        entry = self._tokens.get(user.id)
+        # A relinked account has a different refresh token; its cached access token is stale
+        if entry and entry[2] == user.google_refresh_token and self._is_fresh(entry[1], now):
+            return entry[0]
+        return None
+
+    def _remember(self, user):
+        self._tokens[user.id] = (user.google_access_token, user.google_token_expires_at, user.google_refresh_token)
+        return user.google_access_token
+
+    def _lock_for(self, user_id):
+        with self._locks_lock:
+            return self._locks.setdefault(user_id, threading.Lock())
+
+    def get_access_token(self, user: User) -> str:
+        """A token valid for at least the refresh margin; raises GoogleTokenError when there is none"""
+        now = datetime.utcnow()
+        token = self._cached(user, now)
+        if token:
+            self._stats['cached'] += 1
+            return token
+        if user.google_access_token and self._is_fresh(user.google_token_expires_at, now):
+            return self._remember(user)
+        if not user.google_refresh_token:
+            raise GoogleTokenError("No refresh token available. Please re-authenticate with Google.")
+
+        with self._lock_for(user.id):
+            # Another thread may have refreshed while this one waited for the lock
+            token = self._cached(user, datetime.utcnow())
+            if token:
+                self._stats['cached'] += 1
+                return token
+            return self._refresh_with_lease(user)
+
+    def _acquire_lease(self, session, user_id):
+        now = datetime.utcnow()
+        acquired = session.query(User).filter(
+            User.id == user_id,
+            or_(User.google_token_refresh_lease_until.is_(None), User.google_token_refresh_lease_until < now)
+        ).update({'google_token_refresh_lease_until': now + timedelta(seconds=self.lease_seconds)},
+                 synchronize_session=False) == 1
+        session.commit()
+        return acquired
+
+    @staticmethod
+    def _store(session, user_id, values):
+        session.query(User).filter(User.id == user_id).update(
+            {**values, 'google_token_refresh_lease_until': None}, synchronize_session=False
+        )
+        session.commit()
+
+    @staticmethod
+    def _stored_token(session, user_id):
+        row = session.query(User.google_access_token, User.google_token_expires_at, User.google_refresh_token).filter(
+            User.id == user_id
+        ).one()
+        # End the read so the next poll sees other workers' commits
+        session.commit()
+        return {'google_access_token': row[0], 'google_token_expires_at': row[1], 'google_refresh_token': row[2]}
+
+    def _adopt(self, user, values):
+        # Load the stored token into the caller's row without marking it changed
+        for name, value in values.items():
+            set_committed_value(user, name, value)
+        return self._remember(user)
+
+    def _refresh_with_lease(self, user):
+        # The lease and the new token are written on a session of their own, so the caller's
+        # transaction is neither committed early nor thrown away
+        with Session(bind=db.engine) as session:
+            while not self._acquire_lease(session, user.id):
+                # Another worker is refreshing; use the token it stores (its lease runs out if it died)
+                self._stats['lease_waits'] += 1
+                self._sleep(self.lease_poll_seconds)
+                stored = self._stored_token(session, user.id)
+                if stored['google_access_token'] and self._is_fresh(stored['google_token_expires_at'], datetime.utcnow()):
+                    return self._adopt(user, stored)
+
+            # The lease may have been released by a worker that just stored a fresh token
+            stored = self._stored_token(session, user.id)
+            if stored['google_access_token'] and self._is_fresh(stored['google_token_expires_at'], datetime.utcnow()):
+                self._store(session, user.id, {})
+                return self._adopt(user, stored)
+
+            logger.info(f"Refreshing Google token for user {user.id}")
+            try:
+                credentials = self._refresh_credentials(stored['google_refresh_token'] or user.google_refresh_token)
+            except Exception as e:
+                logger.error(f"Error refreshing token for user {user.id}: {str(e)}")
+                self._store(session, user.id, {})
+                raise GoogleTokenError(f"Failed to refresh Google token. Please re-authenticate with Google. Error: {str(e)}")
+
+            # Clients built for the old token are of no further use
+            google_client_pool.discard_token(stored['google_access_token'])
+            values = {'google_access_token': credentials.token}
+            if credentials.refresh_token:
+                values['google_refresh_token'] = credentials.refresh_token
+            if credentials.expiry:
+                values['google_token_expires_at'] = credentials.expiry
+            self._store(session, user.id, {**values, 'updated_at': datetime.utcnow()})
+            self._stats['refreshes'] += 1
+            return self._adopt(user, values)
+
+    def _refresh_credentials(self, refresh_token):
+        """Exchange the refresh token; credentials.expiry is naive UTC"""
+        credentials = Credentials(
+            token=None,
+            refresh_token=refresh_token,
+            token_uri="https://oauth2.googleapis.com/token",
+            client_id=self.client_id,
+            client_secret=self.client_secret
+        )
+        credentials.refresh(Request())
+        return credentials
+
+    def forget(self, user_id):
+        """Drop the cached token of a user whose Google link changed"""
+        self._tokens.pop(user_id, None)
+
+    def stats(self):
+        return {**self._stats, 'cached_users': len(self._tokens)}
+
+# Create a global instance
+google_token_manager = GoogleTokenManager()
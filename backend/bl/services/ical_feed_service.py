@@ -0,0 +1,185 @@
+import os
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from typing import Iterator, Optional, Tuple
+from sqlalchemy import func, or_
+from dal.models import User, Event, Task, EventParticipant
+from bl.services.recurrence_service import to_naive_utc
+
+logger = logging.getLogger(__name__)
+
+# Domain part of the UIDs in the feed; must stay stable or subscribers see duplicates
+UID_DOMAIN = os.getenv('ICS_UID_DOMAIN', 'neo-networker')
+
+# Rows fetched per round trip while streaming
+STREAM_BATCH_SIZE = 200
+
+RRULE_FREQUENCIES = {'daily': 'DAILY', 'weekly': 'WEEKLY', 'monthly': 'MONTHLY', 'yearly': 'YEARLY'}
+WEEKDAYS = ['MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU']  # Monday=0, like Event.repeat_days
+
+TODO_STATUSES = {'todo': 'NEEDS-ACTION', 'in_progress': 'IN-PROCESS', 'completed': 'COMPLETED',
+                 'done': 'COMPLETED', 'cancelled': 'CANCELLED'}
+TODO_PRIORITIES = {'high': 1, 'medium': 5, 'low': 9}
+
+
+def escape_text(value) -> str:
+    """Escape a TEXT value (RFC 5545 3.3.11)"""
+    return (str(value or '').replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def fold_line(line: str) -> str:
+    """Fold a content line at 75 octets (RFC 5545 3.1) and terminate it with CRLF"""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    parts = []
+    limit = 75
+    while encoded:
+        cut = min(limit, len(encoded))
+        # Do not split a multi-byte character
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode('utf-8'))
+        encoded = encoded[cut:]
+        limit = 74  # Continuation lines start with a space
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def format_datetime(value: datetime) -> str:
+    """UTC DATE-TIME form; stored datetimes are naive UTC"""
+    return to_naive_utc(value).strftime('%Y%m%dT%H%M%SZ')
+
+
+def build_rrule(event: Event) -> Optional[str]:
+    frequency = RRULE_FREQUENCIES.get((event.repeat_pattern or '').lower())
+    if not frequency:
+        return None
+    parts = [f'FREQ={frequency}']
+    if (event.repeat_interval or 1) > 1:
+        parts.append(f'INTERVAL={int(event.repeat_interval)}')
+    if frequency == 'WEEKLY' and event.repeat_days:
+        parts.append('BYDAY=' + ','.join(WEEKDAYS[int(day) % 7] for day in sorted(set(event.repeat_days))))
+    if event.repeat_end_date:
+        until = to_naive_utc(event.repeat_end_date)
+        # A midnight end date means "through that day", same as the expansion engine
+        if until.time() == datetime.min.time():
+            until += timedelta(days=1, seconds=-1)
+        parts.append(f'UNTIL={format_datetime(until)}')
+    return 'RRULE:' + ';'.join(parts)
+
+
+def event_lines(event: Event, stamp: str):
+    """VEVENT lines for an event: the series with its RRULE/EXDATEs plus one VEVENT per overridden occurrence"""
+    uid = f'event-{event.id}@{UID_DOMAIN}'
+
+    def vevent(start, end, title, description, location, extra=()):
+        yield 'BEGIN:VEVENT'
+        yield f'UID:{uid}'
+        yield f'DTSTAMP:{stamp}'
+        yield f'DTSTART:{format_datetime(start)}'
+        yield f'DTEND:{format_datetime(end)}'
+        yield f'SUMMARY:{escape_text(title)}'
+        if description:
+            yield f'DESCRIPTION:{escape_text(description)}'
+        if location:
+            yield f'LOCATION:{escape_text(location)}'
+        if event.updated_at:
+            yield f'LAST-MODIFIED:{format_datetime(event.updated_at)}'
+        yield from extra
+        yield 'END:VEVENT'
+
+    series_extra = []
+    rrule = build_rrule(event) if event.is_recurring else None
+    if rrule:
+        series_extra.append(rrule)
+        for key in event.recurrence_exceptions or []:
+            series_extra.append(f'EXDATE:{format_datetime(datetime.fromisoformat(key))}')
+    yield from vevent(event.start_datetime, event.end_datetime, event.title, event.description,
+                      event.location, series_extra)
+
+    if not rrule:
+        return
+    duration = event.end_datetime - event.start_datetime
+    for key, override in (event.recurrence_overrides or {}).items():
+        original_start = datetime.fromisoformat(key)
+        start = override.get('start_datetime')
+        start = to_naive_utc(datetime.fromisoformat(start.replace('Z', '+00:00'))) if start else original_start
+        end = override.get('end_datetime')
+        end = to_naive_utc(datetime.fromisoformat(end.replace('Z', '+00:00'))) if end else start + duration
+        yield from vevent(start, end, override.get('title', event.title),
+                          override.get('description', event.description),
+                          override.get('location', event.location),
+                          [f'RECURRENCE-ID:{format_datetime(original_start)}'])
+
+
+def task_lines(task: Task, stamp: str):
+    yield 'BEGIN:VTODO'
+    yield f'UID:task-{task.id}@{UID_DOMAIN}'
+    yield f'DTSTAMP:{stamp}'
+    yield f'SUMMARY:{escape_text(task.title or task.text)}'
+    if task.description:
+        yield f'DESCRIPTION:{escape_text(task.description)}'
+    if task.due_date:
+        yield f'DUE:{format_datetime(task.due_date)}'
+    yield f"STATUS:{TODO_STATUSES.get((task.status or '').lower(), 'NEEDS-ACTION')}"
+    if task.priority in TODO_PRIORITIES:
+        yield f'PRIORITY:{TODO_PRIORITIES[task.priority]}'
+    if task.updated_at:
+        yield f'LAST-MODIFIED:{format_datetime(task.updated_at)}'
+    yield 'END:VTODO'
+
+
+class ICalFeedService:
+    """Per-user iCalendar subscription feed of events and task due dates"""
+
+    def _event_query(self, user: User):
+        return Event.query.filter(
+            Event.is_active == True,
+            or_(Event.owner_id == user.id, EventParticipant.invited_clause(Event, user.email))
+        )
+
+    def _task_query(self, user: User):
+        return Task.query.filter(
+            Task.owner_id == user.id,
+            Task.is_active == True,
+            Task.due_date.isnot(None)
+        )
+
+    def get_version(self, user: User) -> Tuple[str, Optional[datetime]]:
+        """(ETag, Last-Modified) from two aggregate queries, so unchanged polls never build the feed.
+
+        The ETag also changes when an item leaves the feed (its count drops);
+        Last-Modified does not, so it is informational only.
+        """
+        event_count, events_changed = self._event_query(user).with_entities(
+            func.count(Event.id), func.max(Event.updated_at)).one()
+        task_count, tasks_changed = self._task_query(user).with_entities(
+            func.count(Task.id), func.max(Task.updated_at)).one()
+
+        fingerprint = f'{user.id}:{event_count}:{events_changed}:{task_count}:{tasks_changed}'
+        etag = hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()
+        last_modified = max([value for value in (events_changed, tasks_changed) if value], default=None)
+        return etag, last_modified
+
+    def generate(self, user: User) -> Iterator[str]:
+        """Yield the calendar in chunks, reading events and tasks in batches"""
+        stamp = format_datetime(datetime.utcnow())
+        yield fold_line('BEGIN:VCALENDAR')
+        yield fold_line('VERSION:2.0')
+        yield fold_line('PRODID:-//Neo Networker//Calendar Feed//EN')
+        yield fold_line('CALSCALE:GREGORIAN')
+        yield fold_line(f'X-WR-CALNAME:{escape_text(user.full_name)}')
+        yield fold_line('X-PUBLISHED-TTL:PT15M')
+
+        for event in self._event_query(user).order_by(Event.id).yield_per(STREAM_BATCH_SIZE):
+            yield ''.join(fold_line(line) for line in event_lines(event, stamp))
+
+        for task in self._task_query(user).order_by(Task.id).yield_per(STREAM_BATCH_SIZE):
+            yield ''.join(fold_line(line) for line in task_lines(task, stamp))
+
+        yield fold_line('END:VCALENDAR')
+
+# Create a global instance
+ical_feed_service = ICalFeedService()
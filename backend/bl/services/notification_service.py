@@ -20,6 +20,28 @@ def create_notification(user_email: str, message: str, notification_type: str =
         print(f"❌ Error creating notification: {e}")
         db.session.rollback()
 
+def create_notifications(user_emails: list, message: str, notification_type: str = 'general'):
+    """Create the same notification for several users with a single commit"""
+    if not user_emails:
+        return
+    try:
+        print(f"🔔 Creating {len(user_emails)} notifications: {message} (type: {notification_type})")
+        db.session.add_all([
+            Notification(
+                user_email=user_email,
+                notification=message,
+                notification_type=notification_type,
+                is_read=False,
+                seen=False
+            )
+            for user_email in user_emails
+        ])
+        db.session.commit()
+        print(f"📢 {len(user_emails)} notifications created successfully")
+    except Exception as e:
+        print(f"❌ Error creating notifications: {e}")
+        db.session.rollback()
+
 def notify_contact_shared(shared_by_email: str, shared_with_email: str, contact_name: str):
     """Create notification when contacts are shared"""
     message = f"{shared_by_email} shared contact '{contact_name}' with you"
@@ -33,9 +55,14 @@ def notify_task_assigned(assigned_by_email: str, assigned_to_email: str, task_ti
 def notify_task_created_in_project(created_by_email: str, project_name: str, task_title: str, project_participants: list):
     """Create notification when a task is created in a project"""
     message = f"{created_by_email} created task '{task_title}' in project '{project_name}'"
-    for participant_email in project_participants:
-        if participant_email != created_by_email:  # Don't notify the creator
-            create_notification(participant_email, message, 'task_assigned')
+    recipients = [email for email in project_participants if email != created_by_email]  # Don't notify the creator
+    create_notifications(recipients, message, 'task_assigned')
+
+def notify_project_participants_added(added_by_email: str, project_name: str, participant_emails: list):
+    """Create notifications when users are added to a project"""
+    message = f"{added_by_email} added you to project '{project_name}'"
+    recipients = [email for email in participant_emails if email != added_by_email]
+    create_notifications(recipients, message, 'task_assigned')
 
 def notify_group_invitation(inviter_email: str, invitee_email: str):
     """Create notification when someone is added to a group and waiting for approval"""
@@ -0,0 +1,54 @@
+import os
+import logging
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PreviewSnapshotService:
+    """Server-side copies of Google import previews, so select-and-sync applies
+    exactly what the user was shown without downloading it again"""
+
+    def __init__(self):
+        self.ttl_seconds = int(os.getenv('GOOGLE_PREVIEW_SNAPSHOT_TTL_SECONDS', '900'))
+        self.max_snapshots = int(os.getenv('GOOGLE_PREVIEW_SNAPSHOT_MAX_ENTRIES', '200'))
+        self._snapshots = OrderedDict()  # (user_id, preview_id) -> (expires_at, kind, items)
+        self._lock = threading.Lock()
+
+    def save(self, user_id, kind: str, items: List[dict]) -> str:
+        """Store a preview and return its id; replaces the user's previous preview of the same kind"""
+        preview_id = secrets.token_urlsafe(16)
+        with self._lock:
+            for key in [key for key, entry in self._snapshots.items() if key[0] == user_id and entry[1] == kind]:
+                del self._snapshots[key]
+            self._snapshots[(user_id, preview_id)] = (time.monotonic() + self.ttl_seconds, kind, items)
+            while len(self._snapshots) > self.max_snapshots:
+                self._snapshots.popitem(last=False)
+        return preview_id
+
+    def get(self, user_id, kind: str, preview_id: str) -> Optional[List[dict]]:
+        """Items of a live snapshot, or None when unknown, expired or of another kind"""
+        if not preview_id:
+            return None
+        key = (user_id, preview_id)
+        with self._lock:
+            entry = self._snapshots.get(key)
+            if entry is None or entry[1] != kind:
+                return None
+            if entry[0] < time.monotonic():
+                del self._snapshots[key]
+                return None
+            self._snapshots.move_to_end(key)
+            return entry[2]
+
+    def discard(self, user_id, preview_id: str):
+        """Drop a snapshot once it has been applied"""
+        with self._lock:
+            self._snapshots.pop((user_id, preview_id), None)
+
+# Create a global instance
+preview_snapshot_service = PreviewSnapshotService()
@@ -0,0 +1,304 @@
+import os
+import calendar
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+from sqlalchemy.orm import selectinload, load_only
+from dal.models import Event, User
+
+logger = logging.getLogger(__name__)
+
+# How far ahead a series is expanded when the caller gives no end of window
+DEFAULT_HORIZON_DAYS = int(os.getenv('RECURRENCE_DEFAULT_HORIZON_DAYS', '365'))
+
+# Safety cap on occurrences produced for one event in one window
+MAX_OCCURRENCES_PER_WINDOW = 1000
+
+# Fields an occurrence override may change
+OVERRIDABLE_FIELDS = ['title', 'description', 'location', 'notes', 'start_datetime', 'end_datetime']
+
+
+def to_naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Events are stored as naive UTC - normalize aware datetimes before comparing"""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def occurrence_key(start: datetime) -> str:
+    """Key identifying an occurrence inside its series (its original start, ISO format)"""
+    return start.replace(microsecond=0).isoformat()
+
+
+def overlaps_window(start: datetime, end: datetime, window_start: datetime, window_end: datetime) -> bool:
+    """[start, end) overlaps [window_start, window_end); an instant event counts when it lies inside the window"""
+    if start >= window_end:
+        return False
+    return end > window_start if end > start else start >= window_start
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    """Add months, clamping the day (Jan 31 + 1 month -> Feb 28/29)"""
+    month_index = value.month - 1 + months
+    year = value.year + month_index // 12
+    month = month_index % 12 + 1
+    day = min(value.day, calendar.monthrange(year, month)[1])
+    return value.replace(year=year, month=month, day=day)
+
+
+class EventOccurrence:
+    """A single occurrence of an event; reads through to the underlying Event"""
+
+    def __init__(self, event: Event, original_start: datetime, override: dict = None):
+        self.event = event
+        self.original_start = original_start
+        self.is_recurring_instance = event.is_recurring
+        self._override = override or {}
+
+        duration = event.end_datetime - event.start_datetime
+        self.start_datetime = self._override_datetime('start_datetime') or original_start
+        self.end_datetime = self._override_datetime('end_datetime') or (self.start_datetime + duration)
+
+    def _override_datetime(self, field):
+        value = self._override.get(field)
+        if not value:
+            return None
+        return to_naive_utc(datetime.fromisoformat(value.replace('Z', '+00:00')))
+
+    def __getattr__(self, name):
+        if name in self._override:
+            return self._override[name]
+        return getattr(self.event, name)
+
+    def to_dict(self, base: dict = None):
+        """Serialize like Event.to_dict(); pass a precomputed base dict to avoid re-serializing the event"""
+        data = dict(base if base is not None else self.event.to_dict())
+        for field in OVERRIDABLE_FIELDS:
+            if field in self._override and field not in ('start_datetime', 'end_datetime'):
+                data[field] = self._override[field]
+        data['start_datetime'] = self.start_datetime.isoformat()
+        data['end_datetime'] = self.end_datetime.isoformat()
+        data['is_recurring_instance'] = self.is_recurring_instance
+        data['occurrence_start'] = occurrence_key(self.original_start) if self.is_recurring_instance else None
+        data['is_overridden'] = bool(self._override)
+        return data
+
+
+class RecurrenceService:
+    """Lazily expands recurring events into the occurrences that fall inside a window"""
+
+    def __init__(self, max_cached_windows: int = 2048):
+        self.max_cached_windows = max_cached_windows
+        self._cache = OrderedDict()  # (event_id, updated_at, first day, day after the last) -> [original starts]
+        self._keys_by_event = {}
+        self._lock = threading.Lock()
+
+    # Cache
+
+    def invalidate(self, event_id):
+        """Drop every cached window of an event (call after the event changes)"""
+        with self._lock:
+            for key in self._keys_by_event.pop(event_id, set()):
+                self._cache.pop(key, None)
+
+    def _cache_get(self, key):
+        with self._lock:
+            starts = self._cache.get(key)
+            if starts is not None:
+                self._cache.move_to_end(key)
+            return starts
+
+    def _cache_put(self, key, starts):
+        with self._lock:
+            self._cache[key] = starts
+            self._cache.move_to_end(key)
+            self._keys_by_event.setdefault(key[0], set()).add(key)
+            while len(self._cache) > self.max_cached_windows:
+                old_key, _ = self._cache.popitem(last=False)
+                event_keys = self._keys_by_event.get(old_key[0])
+                if event_keys:
+                    event_keys.discard(old_key)
+                    if not event_keys:
+                        self._keys_by_event.pop(old_key[0], None)
+
+    # Expansion
+
+    def occurrence_starts(self, event: Event, window_start: datetime, window_end: datetime) -> List[datetime]:
+        """Original start times of the occurrences overlapping [window_start, window_end)"""
+        # Windows are cached by whole days: callers pass now-based windows, which would never repeat exactly
+        day_start = window_start.replace(hour=0, minute=0, second=0, microsecond=0)
+        day_end = window_end.replace(hour=0, minute=0, second=0, microsecond=0)
+        if day_end < window_end:
+            day_end += timedelta(days=1)
+
+        key = (event.id, event.updated_at, day_start, day_end)
+        starts = self._cache_get(key)
+        if starts is None:
+            starts = self._compute_starts(event, day_start, day_end)
+            self._cache_put(key, starts)
+        if (day_start, day_end) == (window_start, window_end):
+            return starts
+
+        duration = event.end_datetime - event.start_datetime
+        return [start for start in starts if overlaps_window(start, start + duration, window_start, window_end)]
+
+    def _compute_starts(self, event: Event, window_start: datetime, window_end: datetime) -> List[datetime]:
+        base = event.start_datetime
+        duration = event.end_datetime - event.start_datetime
+        interval = max(int(event.repeat_interval or 1), 1)
+        pattern = (event.repeat_pattern or 'none').lower()
+
+        # An occurrence overlaps the window when start < window_end and start + duration > window_start
+        # (start >= window_start for an instant event)
+        lower = window_start - duration
+        upper = window_end
+        if event.repeat_end_date:
+            series_end = to_naive_utc(event.repeat_end_date)
+            # repeat_end_date given as a date means "through that day"
+            if series_end.time() == datetime.min.time():
+                series_end += timedelta(days=1)
+            upper = min(upper, series_end)
+
+        candidates = []
+        if pattern == 'daily':
+            candidates = self._fixed_step(base, timedelta(days=interval), lower, upper)
+        elif pattern == 'weekly' and event.repeat_days:
+            candidates = self._weekly_on_days(base, interval, event.repeat_days, lower, upper)
+        elif pattern == 'weekly':
+            candidates = self._fixed_step(base, timedelta(weeks=interval), lower, upper)
+        elif pattern == 'monthly':
+            candidates = self._month_step(base, interval, lower, upper)
+        elif pattern == 'yearly':
+            candidates = self._month_step(base, 12 * interval, lower, upper)
+
+        return [start for start in candidates
+                if start < upper and start >= base and overlaps_window(start, start + duration, window_start, window_end)]
+
+    @staticmethod
+    def _fixed_step(base, step, lower, upper):
+        # Jump straight to the first step near the window instead of walking from the series start
+        first = max(0, (lower - base) // step)
+        starts = []
+        index = first
+        while len(starts) < MAX_OCCURRENCES_PER_WINDOW:
+            start = base + index * step
+            if start >= upper:
+                break
+            starts.append(start)
+            index += 1
+        return starts
+
+    @staticmethod
+    def _weekly_on_days(base, interval, repeat_days, lower, upper):
+        days = sorted(set(int(day) % 7 for day in repeat_days))
+        week_zero = base - timedelta(days=base.weekday())  # Monday of the first week, at the event's time
+        step = timedelta(weeks=interval)
+        first = max(0, (lower - week_zero - timedelta(days=7)) // step)
+        starts = []
+        index = first
+        while len(starts) < MAX_OCCURRENCES_PER_WINDOW:
+            week_start = week_zero + index * step
+            if week_start >= upper:
+                break
+            for day in days:
+                starts.append(week_start + timedelta(days=day))
+            index += 1
+        return starts
+
+    @staticmethod
+    def _month_step(base, months, lower, upper):
+        months_to_lower = (lower.year - base.year) * 12 + (lower.month - base.month)
+        first = max(0, months_to_lower // months - 1)
+        starts = []
+        index = first
+        while len(starts) < MAX_OCCURRENCES_PER_WINDOW:
+            start = add_months(base, index * months)
+            if start >= upper:
+                break
+            starts.append(start)
+            index += 1
+        return starts
+
+    def expand_event(self, event: Event, window_start: datetime, window_end: datetime) -> List[EventOccurrence]:
+        """Occurrences of one event overlapping the window; exceptions removed, overrides applied"""
+        if not event.is_recurring:
+            return [EventOccurrence(event, event.start_datetime)]
+
+        exceptions = set(event.recurrence_exceptions or [])
+        overrides = event.recurrence_overrides or {}
+
+        occurrences = []
+        for start in self.occurrence_starts(event, window_start, window_end):
+            key = occurrence_key(start)
+            if key in exceptions:
+                continue
+            occurrences.append(EventOccurrence(event, start, overrides.get(key)))
+
+        # Moved occurrences may have left (or entered from) the window
+        if overrides:
+            found = set(occurrence_key(o.original_start) for o in occurrences)
+            occurrences = [o for o in occurrences
+                           if overlaps_window(o.start_datetime, o.end_datetime, window_start, window_end)]
+            for key, override in overrides.items():
+                if key in found or key in exceptions or not override.get('start_datetime'):
+                    continue
+                moved = EventOccurrence(event, datetime.fromisoformat(key), override)
+                if overlaps_window(moved.start_datetime, moved.end_datetime, window_start, window_end):
+                    occurrences.append(moved)
+
+        return occurrences
+
+    def expand_events(self, events: List[Event], window_start: Optional[datetime], window_end: Optional[datetime]) -> List[EventOccurrence]:
+        """Expand a list of events into time-ordered occurrences inside the window.
+
+        With no window start the series start is used; with no window end the
+        series is expanded DEFAULT_HORIZON_DAYS past the window start.
+        """
+        window_start = to_naive_utc(window_start)
+        window_end = to_naive_utc(window_end)
+
+        occurrences = []
+        for event in events:
+            if not event.is_recurring:
+                occurrences.append(EventOccurrence(event, event.start_datetime))
+                continue
+            start = window_start or event.start_datetime
+            end = window_end or (start + timedelta(days=DEFAULT_HORIZON_DAYS))
+            occurrences.extend(self.expand_event(event, start, end))
+
+        occurrences.sort(key=lambda occurrence: occurrence.start_datetime)
+        return occurrences
+
+    def events_in_window(self, query, window_start: Optional[datetime], window_end: Optional[datetime]) -> List[EventOccurrence]:
+        """Restrict an Event query to the window (overlap semantics) and return its occurrences.
+
+        Shared by the REST and Telegram calendar views so both agree on what "in the window" means.
+        """
+        window_start = to_naive_utc(window_start)
+        window_end = to_naive_utc(window_end)
+        if window_start or window_end:
+            query = query.filter(Event.in_window_clause(window_start, window_end))
+        # Owners (for owner_email) come from one IN query instead of a lazy load per event
+        events = query.options(
+            selectinload(Event.user).options(load_only(User.id, User.email))
+        ).order_by(Event.start_datetime.asc()).all()
+        if not (window_start or window_end):
+            return [EventOccurrence(event, event.start_datetime) for event in events]
+        return self.expand_events(events, window_start, window_end)
+
+    @staticmethod
+    def serialize(occurrences: List[EventOccurrence]) -> List[dict]:
+        """to_dict() for a list of occurrences, serializing each underlying event only once"""
+        base_dicts = {}
+        result = []
+        for occurrence in occurrences:
+            base = base_dicts.get(occurrence.event.id)
+            if base is None:
+                base = base_dicts[occurrence.event.id] = occurrence.event.to_dict()
+            result.append(occurrence.to_dict(base))
+        return result
+
+# Create a global instance
+recurrence_service = RecurrenceService()
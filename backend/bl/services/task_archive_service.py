@@ -0,0 +1,150 @@
+import os
+import socket
+import logging
+import threading
+from datetime import datetime, timedelta
+from dal.models import Task, TaskArchive, BackgroundLease
+from dal.database import db
+
+logger = logging.getLogger(__name__)
+
+# Statuses that make a task eligible for the archive ('done' is what the Telegram bot uses)
+ARCHIVABLE_STATUSES = ['completed', 'cancelled', 'done']
+
+class TaskArchiveService:
+    """Moves finished tasks out of the hot tasks table into tasks_archive.
+    
+    A sweep runs every TASK_ARCHIVE_SWEEP_INTERVAL_SECONDS in the process
+    holding the archive lease, so tasks move without anyone calling the
+    archive endpoints.
+    """
+    
+    def __init__(self):
+        self.archive_after_days = int(os.getenv('TASK_ARCHIVE_AFTER_DAYS', '30'))
+        self.batch_size = int(os.getenv('TASK_ARCHIVE_BATCH_SIZE', '500'))
+        self.sweep_interval_seconds = float(os.getenv('TASK_ARCHIVE_SWEEP_INTERVAL_SECONDS', '3600'))
+        self.app = None
+        self._scheduler = None
+        self._scheduler_lock = threading.Lock()
+        self._holder = f"{socket.gethostname()}:{os.getpid()}"
+    
+    def init_app(self, app):
+        """Remember the app for the sweep's app context; start the sweep unless testing or disabled"""
+        self.app = app
+        if not app.config.get('TESTING') and self.sweep_interval_seconds > 0:
+            self.start_scheduler()
+    
+    def start_scheduler(self):
+        with self._scheduler_lock:
+            if self._scheduler and self._scheduler.is_alive():
+                return
+            self._scheduler = threading.Thread(target=self._schedule_loop, name='task-archive-scheduler', daemon=True)
+            self._scheduler.start()
+            logger.info("Started task archive scheduler")
+    
+    def _schedule_loop(self):
+        while True:
+            try:
+                with self.app.app_context():
+                    self.schedule_once()
+            except Exception as e:
+                logger.error(f"Task archive scheduler error: {str(e)}")
+            finally:
+                db.session.remove()
+            threading.Event().wait(self.sweep_interval_seconds)
+    
+    def schedule_once(self, now=None):
+        """Archive finished tasks if this process holds the archive lease; None when another one does"""
+        # Outlives a couple of sweeps, so the lease moves on only when its holder is gone
+        if not BackgroundLease.acquire('task-archive-scheduler', self._holder, self.sweep_interval_seconds * 3, now):
+            return None
+        return self.archive_finished_tasks()
+    
+    def archive_finished_tasks(self, owner_id: str = None, older_than_days: int = None) -> int:
+        """Archive completed/cancelled tasks not touched for older_than_days; returns the number moved"""
+        days = self.archive_after_days if older_than_days is None else older_than_days
+        cutoff = datetime.utcnow() - timedelta(days=days)
+        
+        archived_count = 0
+        while True:
+            query = Task.query.filter(
+                Task.status.in_(ARCHIVABLE_STATUSES),
+                Task.updated_at <= cutoff
+            )
+            if owner_id:
+                query = query.filter(Task.owner_id == owner_id)
+            
+            tasks = query.order_by(Task.updated_at.asc()).limit(self.batch_size).all()
+            if not tasks:
+                break
+            
+            try:
+                db.session.add_all([TaskArchive.from_task(task) for task in tasks])
+                Task.query.filter(Task.id.in_([task.id for task in tasks])).delete(synchronize_session=False)
+                db.session.commit()
+            except Exception as e:
+                logger.error(f"Error archiving tasks: {str(e)}")
+                db.session.rollback()
+                raise
+            
+            archived_count += len(tasks)
+            if len(tasks) < self.batch_size:
+                break
+        
+        logger.info(f"Archived {archived_count} tasks finished before {cutoff.isoformat()}"
+                    + (f" for user {owner_id}" if owner_id else ""))
+        return archived_count
+    
+    def restore_task(self, task_id: str, owner_id: str):
+        """Move an archived task back into the tasks table; returns the Task or None"""
+        archived = TaskArchive.query.filter_by(id=task_id, owner_id=owner_id).first()
+        if not archived:
+            return None
+        
+        if archived.task_columns:
+            task = self._task_from_columns(archived.task_columns)
+        else:
+            task = self._task_from_snapshot(archived)
+        
+        db.session.delete(archived)
+        db.session.add(task)
+        db.session.commit()
+        return task
+    
+    @staticmethod
+    def _task_from_columns(columns):
+        values = {}
+        for attr in Task.__mapper__.column_attrs:
+            if attr.key not in columns:
+                continue
+            value = columns[attr.key]
+            if value is not None and isinstance(attr.columns[0].type, db.DateTime):
+                value = datetime.fromisoformat(value)
+            values[attr.key] = value
+        return Task(**values)
+    
+    @staticmethod
+    def _task_from_snapshot(archived):
+        # Rows archived before task_columns was kept only have the to_dict() snapshot
+        data = archived.data or {}
+        return Task(
+            id=archived.id,
+            title=data.get('title'),
+            text=data.get('title') or '',
+            description=data.get('description'),
+            project=data.get('project'),
+            status=data.get('status'),
+            priority=data.get('priority') or 'medium',
+            scheduled_date=datetime.fromisoformat(data['scheduled_date']) if data.get('scheduled_date') else None,
+            due_date=datetime.fromisoformat(data['due_date']) if data.get('due_date') else None,
+            is_scheduled=data.get('is_scheduled', False),
+            is_active=data.get('is_active', True),
+            owner_id=archived.owner_id,
+            created_by=data.get('created_by'),
+            assign_to=data.get('assign_to'),
+            participants=[],
+            created_at=archived.created_at
+        )
+
+# Create a global instance
+task_archive_service = TaskArchiveService()
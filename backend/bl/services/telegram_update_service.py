@@ -0,0 +1,224 @@
+import os
+import socket
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy.exc import IntegrityError
+from dal.database import db
+from dal.models import TelegramUpdate, BackgroundLease
+
+logger = logging.getLogger(__name__)
+
+
+class TelegramUpdateService:
+    """Processes Telegram webhook updates outside the request.
+
+    The webhook stores each update and acknowledges it at once, so a slow
+    reply (an OpenAI run, a sendMessage) never makes Telegram redeliver. A
+    dispatcher thread hands stored updates to a bounded worker pool. A chat
+    has at most one update in progress, and its updates run in the order
+    they arrived; different chats run in parallel. Only the process holding
+    the dispatcher lease claims updates, so the order holds across
+    instances; the webhook of any instance stores them.
+
+    An update still in progress after TELEGRAM_UPDATE_STALE_SECONDS was lost
+    with the worker that ran it, or is taking too long. It is marked failed,
+    not run again, since its changes may already have been committed.
+
+    Stored updates double as an idempotency store: an update redelivered by
+    Telegram (same update_id, or same callback query for button presses) is
+    acknowledged without being stored or processed again. Finished updates
+    are kept for TELEGRAM_UPDATE_RETENTION_HOURS, longer than Telegram keeps
+    redelivering.
+    """
+
+    def __init__(self):
+        self.max_workers = int(os.getenv('TELEGRAM_UPDATE_WORKERS', '4'))
+        self.poll_seconds = float(os.getenv('TELEGRAM_UPDATE_POLL_SECONDS', '5'))
+        self.stale_after_seconds = int(os.getenv('TELEGRAM_UPDATE_STALE_SECONDS', '300'))
+        self.retention_hours = int(os.getenv('TELEGRAM_UPDATE_RETENTION_HOURS', '48'))
+        self.prune_interval_seconds = int(os.getenv('TELEGRAM_UPDATE_PRUNE_INTERVAL_SECONDS', '3600'))
+        self.app = None
+        self.handler = None  # Called with an update's payload; set by init_app
+        self._wakeup = threading.Event()
+        self._dispatcher = None
+        self._executor = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._last_pruned = None
+        self.duplicates = 0
+        self._holder = f"{socket.gethostname()}:{os.getpid()}"
+
+    def init_app(self, app, handler):
+        """Remember the app and the update handler; start dispatching unless testing"""
+        self.app = app
+        self.handler = handler
+        if not app.config.get('TESTING'):
+            self.start_dispatcher()
+
+    # Producer side
+
+    def enqueue(self, payload: dict) -> TelegramUpdate:
+        """Store an update received by the webhook and wake the dispatcher.
+
+        Returns None for an update that was already received.
+        """
+        dedup_key = TelegramUpdate.dedup_key_of(payload)
+        update = TelegramUpdate(update_id=payload.get('update_id'), dedup_key=dedup_key,
+                                chat_id=TelegramUpdate.chat_id_of(payload), payload=payload, status='pending')
+        db.session.add(update)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # The unique key also catches a redelivery racing the original
+            db.session.rollback()
+            self.duplicates += 1
+            logger.info(f"Skipped duplicate Telegram update {dedup_key}")
+            return None
+        self.wake()
+        return update
+
+    def wake(self):
+        """Tell the dispatcher there is work, without waiting for the next poll"""
+        self._wakeup.set()
+
+    # Worker side
+
+    def start_dispatcher(self):
+        with self._lock:
+            if self._dispatcher and self._dispatcher.is_alive():
+                return
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='telegram-update')
+            self._dispatcher = threading.Thread(target=self._dispatch_loop, name='telegram-update-dispatcher', daemon=True)
+            self._dispatcher.start()
+            logger.info(f"Started Telegram update dispatcher with {self.max_workers} workers")
+
+    def _dispatch_loop(self):
+        while True:
+            self._wakeup.wait(self.poll_seconds)
+            self._wakeup.clear()
+            try:
+                with self.app.app_context():
+                    self._prune_if_due()
+                    with self._lock:
+                        free_workers = self.max_workers - self._in_flight
+                    for update_id in self.claim_next(free_workers):
+                        self._submit(update_id)
+            except Exception as e:
+                logger.error(f"Telegram update dispatcher error: {str(e)}")
+
+    def _submit(self, update_id):
+        with self._lock:
+            self._in_flight += 1
+        self._executor.submit(self._run_in_app, update_id)
+
+    def _run_in_app(self, update_id):
+        try:
+            with self.app.app_context():
+                try:
+                    self.run_update(update_id)
+                except Exception as e:
+                    logger.error(f"Telegram update {update_id} crashed: {str(e)}")
+                finally:
+                    db.session.remove()
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            # A worker is free, and the chat's next update may be waiting for this one
+            self.wake()
+
+    def _prune_if_due(self):
+        now = datetime.utcnow()
+        if self._last_pruned and (now - self._last_pruned).total_seconds() < self.prune_interval_seconds:
+            return
+        self._last_pruned = now
+        pruned = self.prune(now)
+        if pruned:
+            logger.info(f"Pruned {pruned} old Telegram updates")
+
+    def prune(self, now=None) -> int:
+        """Delete finished updates past the retention; their update_ids are no longer deduplicated"""
+        now = now or datetime.utcnow()
+        pruned = TelegramUpdate.query.filter(
+            TelegramUpdate.status.in_(['done', 'failed']),
+            TelegramUpdate.created_at < now - timedelta(hours=self.retention_hours)
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        return pruned
+
+    def claim_next(self, limit) -> list:
+        """Claim up to limit updates, at most one per chat; returns their row ids"""
+        if limit <= 0:
+            return []
+
+        # Outlives a couple of polls, so the lease moves on only when its holder is gone
+        if not BackgroundLease.acquire('telegram-update-dispatcher', self._holder, self.poll_seconds * 3):
+            return []
+
+        # Updates left in_progress by a worker that died or hung are not run twice
+        stale = TelegramUpdate.query.filter(
+            TelegramUpdate.status == 'in_progress',
+            TelegramUpdate.updated_at < datetime.utcnow() - timedelta(seconds=self.stale_after_seconds)
+        ).update({'status': 'failed', 'last_error': 'Processing was interrupted'}, synchronize_session=False)
+        if stale:
+            logger.warning(f"Marked {stale} stale Telegram updates failed")
+
+        claimed = [update.id for update in TelegramUpdate.get_next_per_chat(limit) if TelegramUpdate.claim(update.id)]
+        db.session.commit()
+        return claimed
+
+    def run_update(self, update_id) -> TelegramUpdate:
+        """Process a claimed update once.
+
+        A failed update is not retried: its reply or its changes may already
+        have gone through.
+        """
+        update = TelegramUpdate.query.get(update_id)
+        if not update or update.status != 'in_progress':
+            return update
+        try:
+            self.handler(update.payload)
+            update.status = 'done'
+        except Exception as e:
+            db.session.rollback()
+            update = TelegramUpdate.query.get(update_id)
+            update.status = 'failed'
+            update.last_error = str(e)
+            logger.error(f"Telegram update {update.update_id} for chat {update.chat_id} failed: {str(e)}")
+        db.session.commit()
+        return update
+
+    def process_pending(self) -> int:
+        """Run every stored update in the calling thread; returns how many ran"""
+        processed = 0
+        while True:
+            claimed = self.claim_next(self.max_workers)
+            if not claimed:
+                return processed
+            for update_id in claimed:
+                self.run_update(update_id)
+            processed += len(claimed)
+
+    def stats(self):
+        """Queue depth by status, age of the oldest waiting update and busy workers"""
+        counts = dict(db.session.query(TelegramUpdate.status, db.func.count(TelegramUpdate.id))
+                      .group_by(TelegramUpdate.status).all())
+        oldest = db.session.query(db.func.min(TelegramUpdate.created_at)).filter(
+            TelegramUpdate.status == 'pending'
+        ).scalar()
+        with self._lock:
+            busy_workers = self._in_flight
+        return {
+            'pending': counts.get('pending', 0),
+            'in_progress': counts.get('in_progress', 0),
+            'done': counts.get('done', 0),
+            'failed': counts.get('failed', 0),
+            'oldest_pending_seconds': round((datetime.utcnow() - oldest).total_seconds(), 1) if oldest else None,
+            'workers': self.max_workers,
+            'busy_workers': busy_workers,
+            'duplicates_skipped': self.duplicates
+        }
+
+# Create a global instance
+telegram_update_service = TelegramUpdateService()
@@ -3,5 +3,12 @@ from .person import Person
 from .task import Task
 from .event import Event
 from .notification import Notification
+from .project_participant import ProjectParticipant
+from .task_archive import TaskArchive
+from .event_participant import EventParticipant
+from .google_calendar_outbox import GoogleCalendarOutbox
+from .google_sync_job import GoogleSyncJob
+from .telegram_update import TelegramUpdate
+from .background_lease import BackgroundLease
 
-__all__ = ['User', 'Person', 'Task', 'Event', 'Notification']
+__all__ = ['User', 'Person', 'Task', 'Event', 'Notification', 'ProjectParticipant', 'TaskArchive', 'EventParticipant', 'GoogleCalendarOutbox', 'GoogleSyncJob', 'TelegramUpdate', 'BackgroundLease']
@@ -0,0 +1,37 @@
+from ..database import db
+from datetime import datetime, timedelta
+from sqlalchemy.exc import IntegrityError
+
+class BackgroundLease(db.Model):
+    """Named lease so that only one process runs a periodic task"""
+    __tablename__ = 'background_leases'
+
+    name = db.Column(db.String(100), primary_key=True)
+    holder = db.Column(db.String(255), nullable=False)  # host:pid of the process holding it
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f'<BackgroundLease {self.name} held by {self.holder} until {self.expires_at}>'
+
+    # DAL Functions for background leases
+    @staticmethod
+    def acquire(name, holder, seconds, now=None):
+        """Take or extend the lease for seconds; False while another holder has it. Commits."""
+        now = now or datetime.utcnow()
+        changes = {'holder': holder, 'expires_at': now + timedelta(seconds=seconds)}
+        taken = BackgroundLease.query.filter(
+            BackgroundLease.name == name,
+            db.or_(BackgroundLease.holder == holder, BackgroundLease.expires_at < now)
+        ).update(changes, synchronize_session=False) == 1
+        if taken or BackgroundLease.query.filter_by(name=name).first():
+            db.session.commit()
+            return taken
+
+        db.session.add(BackgroundLease(name=name, **changes))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Another process created it first
+            db.session.rollback()
+            return False
+        return True
@@ -1,9 +1,14 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey, JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey, JSON, and_, or_
+from sqlalchemy.orm import relationship, validates
 from ..database import db
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 import json
 
+def _naive_utc(value):
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
 class Event(db.Model):
     __tablename__ = 'events'
     
@@ -22,9 +27,17 @@ class Event(db.Model):
     repeat_interval = db.Column(db.Integer, default=1)  # Every X days/weeks/months/years
     repeat_days = db.Column(db.JSON)  # For weekly: [0,1,2,3,4,5,6] (Monday=0)
     repeat_end_date = db.Column(db.DateTime)  # When to stop repeating
+    recurrence_exceptions = db.Column(db.JSON)  # Cancelled occurrences: [original start ISO, ...]
+    recurrence_overrides = db.Column(db.JSON)  # Changed occurrences: {original start ISO: {field: value}}
     notes = db.Column(db.Text)
     google_event_id = db.Column(db.String(255))  # Google Calendar event ID for syncing
     google_sync = db.Column(db.Boolean, default=True)  # Whether to sync with Google Calendar
+    google_sync_status = db.Column(db.String(20))  # Last push to Google Calendar: 'pending', 'synced', 'failed', 'conflict'
+    google_sync_error = db.Column(db.Text)  # Error of the last failed push, or the fields in conflict
+    google_etag = db.Column(db.String(100))  # Google's etag of the version last reconciled
+    google_sync_base = db.Column(db.JSON)  # Synced fields as last agreed with Google (base of the three-way merge)
+    google_content_hash = db.Column(db.String(64))  # Hash of google_sync_base
+    long_span = db.Column(db.Boolean, default=False, nullable=False)  # Longer than MAX_OCCURRENCE_SPAN (kept in sync)
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -35,6 +48,68 @@ class Event(db.Model):
     # Relationship to user
     user = relationship("User", foreign_keys=[user_id])
     
+    # Window queries range-scan (owner_id/user_id, long_span, start_datetime): an event
+    # overlapping [start, end) must start after start - MAX_OCCURRENCE_SPAN unless flagged long_span
+    __table_args__ = (
+        db.Index('ix_events_owner_span_start', 'owner_id', 'long_span', 'start_datetime'),
+        db.Index('ix_events_user_span_start', 'user_id', 'long_span', 'start_datetime'),
+        db.Index('ix_events_owner_google_event', 'owner_id', 'google_event_id'),
+    )
+    
+    # Longest span a single occurrence may have and still be found by the bounded window scan
+    MAX_OCCURRENCE_SPAN = timedelta(days=31)
+    
+    @validates('start_datetime', 'end_datetime')
+    def _sync_long_span(self, key, value):
+        start = _naive_utc(value if key == 'start_datetime' else self.start_datetime)
+        end = _naive_utc(value if key == 'end_datetime' else self.end_datetime)
+        self.long_span = bool(start and end and end - start > Event.MAX_OCCURRENCE_SPAN)
+        return value
+    
+    @property
+    def is_recurring(self):
+        return bool(self.repeat_pattern) and self.repeat_pattern != 'none'
+    
+    @staticmethod
+    def overlapping_clause(window_start=None, window_end=None):
+        """SQL clause: events whose [start, end) overlaps the window (either bound may be None)"""
+        clauses = []
+        if window_end:
+            clauses.append(Event.start_datetime < window_end)
+        if window_start:
+            # An instant event (end == start) counts when it starts inside the window
+            clauses.append(or_(
+                Event.end_datetime > window_start,
+                and_(Event.end_datetime == Event.start_datetime, Event.start_datetime >= window_start)
+            ))
+            # Bound the start_datetime range so the scan does not run back to the first event ever
+            clauses.append(or_(
+                and_(Event.long_span == False, Event.start_datetime >= window_start - Event.MAX_OCCURRENCE_SPAN),
+                Event.long_span == True
+            ))
+        return and_(*clauses)
+    
+    @staticmethod
+    def in_window_clause(window_start=None, window_end=None):
+        """SQL clause: events overlapping the window plus recurring series with occurrences in it"""
+        return or_(
+            Event.overlapping_clause(window_start, window_end),
+            Event.recurring_in_window_clause(window_start, window_end)
+        )
+    
+    @staticmethod
+    def recurring_in_window_clause(window_start=None, window_end=None):
+        """SQL clause: recurring series that may have occurrences inside the window"""
+        clauses = [Event.repeat_pattern.isnot(None), Event.repeat_pattern != 'none']
+        if window_end:
+            clauses.append(Event.start_datetime < window_end)
+        if window_start:
+            clauses.append(or_(
+                Event.repeat_end_date.is_(None),
+                Event.repeat_end_date >= window_start - Event.MAX_OCCURRENCE_SPAN
+            ))
+        return and_(*clauses)
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -51,9 +126,13 @@ class Event(db.Model):
             'repeat_interval': self.repeat_interval,
             'repeat_days': self.repeat_days or [],
             'repeat_end_date': self.repeat_end_date.isoformat() if self.repeat_end_date else None,
+            'recurrence_exceptions': self.recurrence_exceptions or [],
+            'recurrence_overrides': self.recurrence_overrides or {},
             'notes': self.notes,
             'google_event_id': self.google_event_id,
             'google_sync': self.google_sync,
+            'google_sync_status': self.google_sync_status,
+            'google_sync_error': self.google_sync_error,
             'is_active': self.is_active,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
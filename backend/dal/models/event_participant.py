@@ -0,0 +1,141 @@
+from ..database import db
+from datetime import datetime
+
+# Google Calendar attendee responseStatus values
+RESPONSE_STATUSES = ['needsAction', 'accepted', 'declined', 'tentative']
+
+# Events per query when syncing participants in bulk (keeps IN lists short)
+SYNC_CHUNK_SIZE = 500
+
+def normalize_email(email):
+    return email.strip().lower() if isinstance(email, str) and email.strip() else None
+
+class EventParticipant(db.Model):
+    __tablename__ = 'event_participants'
+
+    id = db.Column(db.Integer, primary_key=True, index=True)
+    event_id = db.Column(db.Integer, db.ForeignKey('events.id', ondelete='CASCADE'), nullable=False)
+    email = db.Column(db.String(255), nullable=False)  # Stored lower-cased
+    user_id = db.Column(db.String(36), db.ForeignKey('profiles.id'), nullable=True)  # Set when the email has an account
+    response_status = db.Column(db.String(20), default='needsAction')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # One row per (event, email); the email index serves "events I'm invited to" lookups
+    __table_args__ = (
+        db.UniqueConstraint('event_id', 'email', name='unique_event_participant'),
+        db.Index('ix_event_participants_email', 'email', 'event_id'),
+        db.Index('ix_event_participants_user', 'user_id', 'event_id'),
+    )
+
+    def __repr__(self):
+        return f'<EventParticipant {self.event_id} -> {self.email}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'event_id': self.event_id,
+            'email': self.email,
+            'user_id': self.user_id,
+            'response_status': self.response_status,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+    # DAL Functions for event invitations
+    @staticmethod
+    def get_participants(event_id):
+        """Get participant rows of an event"""
+        return EventParticipant.query.filter_by(event_id=event_id).order_by(EventParticipant.email).all()
+
+    @staticmethod
+    def sync_from_event(event):
+        """Make the rows match event.participants; returns (added, removed) emails.
+
+        Existing rows keep their response_status unless the participant entry
+        carries one (e.g. from Google attendees). The event must have an id
+        (flush first). Caller commits.
+        """
+        return EventParticipant.sync_from_events([event])[event.id]
+
+    @staticmethod
+    def emails_of(event):
+        """Normalized participant emails listed on the event"""
+        return sorted(EventParticipant._wanted(event))
+
+    @staticmethod
+    def _wanted(event):
+        # email -> response_status given by the event (None keeps the stored one)
+        wanted = {}
+        for participant in event.participants or []:
+            if isinstance(participant, dict):
+                email = normalize_email(participant.get('email'))
+                status = participant.get('response_status') or participant.get('responseStatus')
+            else:
+                email, status = normalize_email(participant), None
+            if email:
+                wanted[email] = status if status in RESPONSE_STATUSES else wanted.get(email)
+        return wanted
+
+    @staticmethod
+    def sync_from_events(events):
+        """sync_from_event for many events at once; returns {event_id: (added, removed)}.
+
+        Reads, deletes and account lookups are done per chunk of events, not
+        per event, so a calendar sync does not pay a round trip per event.
+        """
+        from .user import User
+
+        wanted_by_event = {event.id: EventParticipant._wanted(event) for event in events}
+        event_ids = list(wanted_by_event)
+
+        current_by_event = {}
+        for i in range(0, len(event_ids), SYNC_CHUNK_SIZE):
+            for row in EventParticipant.query.filter(EventParticipant.event_id.in_(event_ids[i:i + SYNC_CHUNK_SIZE])).all():
+                current_by_event.setdefault(row.event_id, {})[row.email] = row
+
+        changes, removed_ids, to_add = {}, [], []
+        for event_id, wanted in wanted_by_event.items():
+            current = current_by_event.get(event_id, {})
+            added = sorted(set(wanted) - set(current))
+            removed = sorted(set(current) - set(wanted))
+            removed_ids.extend(current[email].id for email in removed)
+            for email, row in current.items():
+                if email in wanted and wanted[email] and row.response_status != wanted[email]:
+                    row.response_status = wanted[email]
+            to_add.extend((event_id, email, wanted[email]) for email in added)
+            changes[event_id] = (added, removed)
+
+        for i in range(0, len(removed_ids), SYNC_CHUNK_SIZE):
+            EventParticipant.query.filter(
+                EventParticipant.id.in_(removed_ids[i:i + SYNC_CHUNK_SIZE])
+            ).delete(synchronize_session=False)
+
+        if to_add:
+            emails = sorted({email for _, email, _ in to_add})
+            user_ids = {}
+            for i in range(0, len(emails), SYNC_CHUNK_SIZE):
+                user_ids.update(db.session.query(db.func.lower(User.email), User.id).filter(
+                    db.func.lower(User.email).in_(emails[i:i + SYNC_CHUNK_SIZE])
+                ).all())
+            db.session.add_all([
+                EventParticipant(event_id=event_id, email=email, user_id=user_ids.get(email),
+                                 response_status=status or 'needsAction')
+                for event_id, email, status in to_add
+            ])
+
+        return changes
+
+    @staticmethod
+    def invited_clause(event_model, emails, include_declined=True):
+        """SQL clause: event has a participant row for any of the emails"""
+        if isinstance(emails, str):
+            emails = [emails]
+        emails = [email for email in (normalize_email(email) for email in emails) if email]
+        query = db.session.query(EventParticipant.id).filter(
+            EventParticipant.event_id == event_model.id,
+            EventParticipant.email.in_(emails)
+        )
+        if not include_declined:
+            query = query.filter(EventParticipant.response_status != 'declined')
+        return query.exists()
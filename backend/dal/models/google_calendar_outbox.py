@@ -0,0 +1,63 @@
+from ..database import db
+from datetime import datetime
+
+# Operations pushed to Google Calendar
+OUTBOX_OPERATIONS = ['create', 'update', 'delete']
+
+class GoogleCalendarOutbox(db.Model):
+    __tablename__ = 'google_calendar_outbox'
+
+    id = db.Column(db.Integer, primary_key=True, index=True)
+    event_id = db.Column(db.Integer, db.ForeignKey('events.id', ondelete='CASCADE'), nullable=False)
+    user_id = db.Column(db.String(36), db.ForeignKey('profiles.id', ondelete='CASCADE'), nullable=False)
+    operation = db.Column(db.String(10), nullable=False)  # 'create', 'update' or 'delete'
+    status = db.Column(db.String(20), nullable=False, default='pending')  # 'pending', 'in_progress', 'done', 'superseded', 'failed', 'conflict'
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # The worker scans due pending rows; enqueue looks up an event's pending row to coalesce into
+    __table_args__ = (
+        db.Index('ix_google_calendar_outbox_due', 'status', 'next_attempt_at'),
+        db.Index('ix_google_calendar_outbox_event', 'event_id', 'status'),
+    )
+
+    def __repr__(self):
+        return f'<GoogleCalendarOutbox {self.operation} event {self.event_id} ({self.status})>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'event_id': self.event_id,
+            'user_id': self.user_id,
+            'operation': self.operation,
+            'status': self.status,
+            'attempts': self.attempts,
+            'next_attempt_at': self.next_attempt_at.isoformat() if self.next_attempt_at else None,
+            'last_error': self.last_error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+    # DAL Functions for the Google Calendar outbox
+    @staticmethod
+    def get_pending_for_event(event_id):
+        """The event's not yet started sync intent, if any"""
+        return GoogleCalendarOutbox.query.filter_by(event_id=event_id, status='pending').first()
+
+    @staticmethod
+    def get_due(now, limit):
+        """Pending rows whose next attempt is due, oldest first"""
+        return GoogleCalendarOutbox.query.filter(
+            GoogleCalendarOutbox.status == 'pending',
+            GoogleCalendarOutbox.next_attempt_at <= now
+        ).order_by(GoogleCalendarOutbox.id).limit(limit).all()
+
+    @staticmethod
+    def claim(row_id):
+        """Mark a pending row in_progress; False when another worker got it first. Caller commits."""
+        return GoogleCalendarOutbox.query.filter_by(id=row_id, status='pending').update(
+            {'status': 'in_progress', 'updated_at': datetime.utcnow()}, synchronize_session=False
+        ) == 1
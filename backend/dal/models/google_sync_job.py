@@ -0,0 +1,52 @@
+from ..database import db
+from datetime import datetime
+
+# Google data synced by a job, in the order they run
+SYNC_RESOURCES = ['contacts', 'calendar']
+
+class GoogleSyncJob(db.Model):
+    __tablename__ = 'google_sync_jobs'
+
+    id = db.Column(db.Integer, primary_key=True, index=True)
+    user_id = db.Column(db.String(36), db.ForeignKey('profiles.id', ondelete='CASCADE'), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # 'queued', 'running', 'done', 'failed'
+    progress = db.Column(db.JSON, nullable=False)  # {resource: {'status', 'synced', 'error'}}
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    # The status endpoint reads a user's latest job
+    __table_args__ = (
+        db.Index('ix_google_sync_jobs_user', 'user_id', 'id'),
+    )
+
+    def __repr__(self):
+        return f'<GoogleSyncJob {self.id} for {self.user_id} ({self.status})>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'status': self.status,
+            'progress': self.progress,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+    # DAL Functions for Google sync jobs
+    @staticmethod
+    def new_progress():
+        return {resource: {'status': 'pending', 'synced': 0, 'error': None} for resource in SYNC_RESOURCES}
+
+    @staticmethod
+    def get_latest_for_user(user_id):
+        return GoogleSyncJob.query.filter_by(user_id=user_id).order_by(GoogleSyncJob.id.desc()).first()
+
+    @staticmethod
+    def get_active_for_user(user_id):
+        """The user's queued or running job, if any"""
+        return GoogleSyncJob.query.filter(
+            GoogleSyncJob.user_id == user_id,
+            GoogleSyncJob.status.in_(['queued', 'running'])
+        ).order_by(GoogleSyncJob.id.desc()).first()
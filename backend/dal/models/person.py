@@ -33,6 +33,7 @@ class Person(db.Model):
     # Connection Management Metadata
     notes = db.Column(db.Text)  # free text for relationship context
     source = db.Column(db.String(255))  # how you got the contact (event, referral, etc.)
+    google_contact_id = db.Column(db.String(100))  # People API resource id (without 'people/') for incremental sync
     tags = db.Column(db.Text)  # labels/categories
     last_contact_date = db.Column(db.DateTime)
     next_follow_up_date = db.Column(db.DateTime)
@@ -48,6 +49,10 @@ class Person(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('ix_people_owner_google_contact', 'owner_id', 'google_contact_id'),
+    )
+    
     def __repr__(self):
         full_name = f"{self.first_name or ''} {self.last_name or ''}".strip()
         return f'<Person {full_name or "Unknown"}>'
@@ -0,0 +1,123 @@
+from ..database import db
+from sqlalchemy import and_, or_
+from datetime import datetime
+
+class ProjectParticipant(db.Model):
+    __tablename__ = 'project_participants'
+    
+    id = db.Column(db.Integer, primary_key=True, index=True)
+    owner_id = db.Column(db.String(36), db.ForeignKey('profiles.id'), nullable=False)
+    project = db.Column(db.String(100), nullable=False)
+    email = db.Column(db.String(255), nullable=False)
+    added_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # One row per (owner, project, member); the email index serves "projects shared with me" lookups
+    __table_args__ = (
+        db.UniqueConstraint('owner_id', 'project', 'email', name='unique_project_participant'),
+        db.Index('ix_project_participants_email', 'email', 'owner_id', 'project'),
+    )
+    
+    def __repr__(self):
+        return f'<ProjectParticipant {self.owner_id}/{self.project} -> {self.email}>'
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'owner_id': self.owner_id,
+            'project': self.project,
+            'email': self.email,
+            'added_at': self.added_at.isoformat() if self.added_at else None
+        }
+    
+    # DAL Functions for project membership
+    @staticmethod
+    def get_participants(owner_id, project):
+        """Get participant emails for one of the owner's projects"""
+        rows = db.session.query(ProjectParticipant.email).filter(
+            ProjectParticipant.owner_id == owner_id,
+            ProjectParticipant.project == project
+        ).order_by(ProjectParticipant.email).all()
+        return [row[0] for row in rows]
+    
+    @staticmethod
+    def get_participants_by_project(owner_ids):
+        """Get {(owner_id, project): [emails]} for all projects of the given owners in one query"""
+        if not owner_ids:
+            return {}
+        rows = db.session.query(
+            ProjectParticipant.owner_id,
+            ProjectParticipant.project,
+            ProjectParticipant.email
+        ).filter(ProjectParticipant.owner_id.in_(list(owner_ids))).order_by(ProjectParticipant.email).all()
+        
+        participants = {}
+        for owner_id, project, email in rows:
+            participants.setdefault((owner_id, project), []).append(email)
+        return participants
+    
+    @staticmethod
+    def set_participants(owner_id, project, emails):
+        """Replace the participant set of a project; returns (added, removed) emails.
+        
+        Only the difference is written, so the cost depends on how many members
+        change rather than on how many tasks the project holds. Caller commits.
+        """
+        wanted = set(email for email in emails if email)
+        current = set(ProjectParticipant.get_participants(owner_id, project))
+        
+        added = sorted(wanted - current)
+        removed = sorted(current - wanted)
+        
+        if removed:
+            ProjectParticipant.query.filter(
+                ProjectParticipant.owner_id == owner_id,
+                ProjectParticipant.project == project,
+                ProjectParticipant.email.in_(removed)
+            ).delete(synchronize_session=False)
+        
+        for email in added:
+            db.session.add(ProjectParticipant(owner_id=owner_id, project=project, email=email))
+        
+        return added, removed
+    
+    @staticmethod
+    def is_participant(owner_id, project, email):
+        """Check whether email is a participant of the owner's project"""
+        if not project or not email:
+            return False
+        return db.session.query(
+            ProjectParticipant.query.filter(
+                ProjectParticipant.owner_id == owner_id,
+                ProjectParticipant.project == project,
+                ProjectParticipant.email == email
+            ).exists()
+        ).scalar()
+    
+    @staticmethod
+    def shared_projects(email, exclude_owner_id=None):
+        """Get the (owner_id, project) pairs the email participates in, served by the email index"""
+        if not email:
+            return []
+        query = db.session.query(ProjectParticipant.owner_id, ProjectParticipant.project).filter(
+            ProjectParticipant.email == email
+        )
+        if exclude_owner_id:
+            query = query.filter(ProjectParticipant.owner_id != exclude_owner_id)
+        return [(owner_id, project) for owner_id, project in query.all()]
+    
+    @staticmethod
+    def visible_query(task_model, owner_id, email, *criteria):
+        """Query task_model rows owned by owner_id or in a project shared with email.
+        
+        The shared projects are looked up first, so each branch is an index seek on
+        (owner_id, project) instead of a correlated subquery run for every task row.
+        """
+        query = task_model.query.filter(task_model.owner_id == owner_id, *criteria)
+        shared = ProjectParticipant.shared_projects(email, exclude_owner_id=owner_id)
+        if not shared:
+            return query
+        in_shared = or_(*[
+            and_(task_model.owner_id == shared_owner_id, task_model.project == project)
+            for shared_owner_id, project in shared
+        ])
+        return query.union_all(task_model.query.filter(in_shared, *criteria))
@@ -1,7 +1,12 @@
 from ..database import db
+from sqlalchemy.orm import validates
 from datetime import datetime
 import uuid
 
+# Numeric sort key for priority - ordering by the string column sorts 'medium' > 'low' > 'high'
+PRIORITY_RANKS = {'low': 0, 'medium': 1, 'high': 2}
+DEFAULT_PRIORITY_RANK = PRIORITY_RANKS['medium']
+
 class Task(db.Model):
     __tablename__ = 'tasks'
     
@@ -18,6 +23,7 @@ class Task(db.Model):
     # Existing columns
     status = db.Column(db.String(50), default='todo')  # 'todo', 'in_progress', 'completed', 'cancelled'
     priority = db.Column(db.String(50), default='medium')  # 'low', 'medium', 'high'
+    priority_rank = db.Column(db.SmallInteger, default=DEFAULT_PRIORITY_RANK, nullable=True)  # Kept in sync with priority
     due_date = db.Column(db.DateTime)  # When task should be completed
     owner_id = db.Column(db.String(36), db.ForeignKey('profiles.id'), nullable=False)
     created_by = db.Column(db.String(36), db.ForeignKey('profiles.id'))
@@ -38,6 +44,19 @@ class Task(db.Model):
     # Relationships
     creator = db.relationship('User', foreign_keys=[created_by], backref='created_tasks')
     
+    # Indexes matching the list access paths (owner filter first, then the ORDER BY columns)
+    __table_args__ = (
+        db.Index('ix_tasks_owner_project_rank', 'owner_id', 'project', priority_rank.desc(), created_at.desc()),
+        db.Index('ix_tasks_owner_active_status_rank', 'owner_id', 'is_active', 'status', priority_rank.desc(), created_at.desc()),
+        db.Index('ix_tasks_owner_active_due', 'owner_id', 'is_active', 'due_date', created_at.desc()),
+        db.Index('ix_tasks_status_updated', 'status', 'updated_at'),  # Archive sweep
+    )
+    
+    @validates('priority')
+    def _sync_priority_rank(self, key, priority):
+        self.priority_rank = PRIORITY_RANKS.get((priority or '').lower(), DEFAULT_PRIORITY_RANK)
+        return priority
+    
     def __repr__(self):
         return f'<Task {self.id}: {self.title[:50]}...>'
     
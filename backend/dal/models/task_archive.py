@@ -0,0 +1,62 @@
+from ..database import db
+from datetime import datetime
+
+class TaskArchive(db.Model):
+    """Cold storage for completed/cancelled tasks moved out of the hot tasks table"""
+    __tablename__ = 'tasks_archive'
+    
+    id = db.Column(db.String(36), primary_key=True)  # Same id the task had in tasks
+    owner_id = db.Column(db.String(36), db.ForeignKey('profiles.id'), nullable=False)
+    title = db.Column(db.String(255), nullable=True)
+    project = db.Column(db.String(100), nullable=True)
+    status = db.Column(db.String(50), nullable=True)
+    assign_to = db.Column(db.String(255), nullable=True)
+    due_date = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=True)
+    completed_at = db.Column(db.DateTime, nullable=True)  # Task.updated_at when it was archived
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Full task snapshot (Task.to_dict()) so archived tasks render exactly like live ones
+    data = db.Column(db.JSON, nullable=False)
+    # Every tasks column as stored (datetimes as ISO strings) so a restore gives back the same row
+    task_columns = db.Column(db.JSON, nullable=True)
+    
+    __table_args__ = (
+        db.Index('ix_tasks_archive_owner_project', 'owner_id', 'project', created_at.desc()),
+    )
+    
+    def __repr__(self):
+        return f'<TaskArchive {self.id}: {(self.title or "")[:50]}...>'
+    
+    def to_dict(self):
+        task_dict = dict(self.data or {})
+        task_dict['is_archived'] = True
+        task_dict['archived_at'] = self.archived_at.isoformat() if self.archived_at else None
+        return task_dict
+    
+    @staticmethod
+    def from_task(task):
+        """Build an archive row from a live Task"""
+        return TaskArchive(
+            id=task.id,
+            owner_id=task.owner_id,
+            title=task.title or task.text,
+            project=task.project,
+            status=task.status,
+            assign_to=task.assign_to,
+            due_date=task.due_date,
+            created_at=task.created_at,
+            completed_at=task.updated_at,
+            archived_at=datetime.utcnow(),
+            data=task.to_dict(),
+            task_columns=TaskArchive.snapshot_columns(task)
+        )
+    
+    @staticmethod
+    def snapshot_columns(task):
+        """The task's raw column values, JSON-safe"""
+        columns = {}
+        for attr in task.__mapper__.column_attrs:
+            value = getattr(task, attr.key)
+            columns[attr.key] = value.isoformat() if isinstance(value, datetime) else value
+        return columns
@@ -0,0 +1,87 @@
+from ..database import db
+from datetime import datetime
+
+class TelegramUpdate(db.Model):
+    __tablename__ = 'telegram_updates'
+
+    id = db.Column(db.Integer, primary_key=True, index=True)
+    update_id = db.Column(db.BigInteger)  # Telegram's id of the update
+    dedup_key = db.Column(db.String(100), unique=True)  # A redelivered update has the same key and is not stored again
+    chat_id = db.Column(db.String(64))  # Updates of the same chat are processed one at a time, in order
+    payload = db.Column(db.JSON, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # 'pending', 'in_progress', 'done', 'failed'
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # The dispatcher scans pending rows in arrival order and checks a chat for a running update
+    __table_args__ = (
+        db.Index('ix_telegram_updates_status', 'status', 'id'),
+        db.Index('ix_telegram_updates_chat', 'chat_id', 'status'),
+    )
+
+    def __repr__(self):
+        return f'<TelegramUpdate {self.update_id} chat {self.chat_id} ({self.status})>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'update_id': self.update_id,
+            'chat_id': self.chat_id,
+            'status': self.status,
+            'last_error': self.last_error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+    # DAL Functions for received Telegram updates
+    @staticmethod
+    def dedup_key_of(payload):
+        """Idempotency key of an update: the callback query id for button presses, else the update_id"""
+        callback_query = payload.get('callback_query')
+        if isinstance(callback_query, dict) and callback_query.get('id'):
+            return f"callback:{callback_query['id']}"
+        if payload.get('update_id') is not None:
+            return f"update:{payload['update_id']}"
+        return None
+
+    @staticmethod
+    def chat_id_of(payload):
+        """The chat an update belongs to, as a string; None for updates without one"""
+        for key in ('message', 'edited_message', 'channel_post'):
+            if isinstance(payload.get(key), dict) and payload[key].get('chat'):
+                return str(payload[key]['chat'].get('id'))
+        callback_query = payload.get('callback_query')
+        if isinstance(callback_query, dict) and isinstance(callback_query.get('message'), dict):
+            return str(callback_query['message']['chat'].get('id'))
+        return None
+
+    @staticmethod
+    def get_next_per_chat(limit):
+        """The oldest pending update of every chat that has no update in progress"""
+        busy_chats = db.session.query(TelegramUpdate.chat_id).filter(
+            TelegramUpdate.status == 'in_progress',
+            TelegramUpdate.chat_id.isnot(None)
+        )
+        rows = TelegramUpdate.query.filter(
+            TelegramUpdate.status == 'pending',
+            db.or_(TelegramUpdate.chat_id.is_(None), ~TelegramUpdate.chat_id.in_(busy_chats))
+        ).order_by(TelegramUpdate.id).limit(limit * 4).all()
+
+        next_rows, seen_chats = [], set()
+        for row in rows:
+            if row.chat_id is not None:
+                if row.chat_id in seen_chats:
+                    continue
+                seen_chats.add(row.chat_id)
+            next_rows.append(row)
+            if len(next_rows) >= limit:
+                break
+        return next_rows
+
+    @staticmethod
+    def claim(row_id):
+        """Mark a pending row in_progress; False when another worker got it first. Caller commits."""
+        return TelegramUpdate.query.filter_by(id=row_id, status='pending').update(
+            {'status': 'in_progress', 'updated_at': datetime.utcnow()}, synchronize_session=False
+        ) == 1
@@ -27,10 +27,16 @@ class User(db.Model):
     google_refresh_token = db.Column(db.Text, nullable=True)
     google_access_token = db.Column(db.Text, nullable=True)
     google_token_expires_at = db.Column(db.DateTime, nullable=True)
+    google_token_refresh_lease_until = db.Column(db.DateTime, nullable=True)  # Held by the worker refreshing the token
     google_scopes = db.Column(db.Text, nullable=True)  # Store OAuth scopes to detect changes
     google_contacts_synced_at = db.Column(db.DateTime, nullable=True)
+    google_contacts_sync_token = db.Column(db.Text, nullable=True)  # People API syncToken for incremental contact syncs
     google_calendar_synced_at = db.Column(db.DateTime, nullable=True)
+    google_calendar_sync_token = db.Column(db.Text, nullable=True)  # Calendar API nextSyncToken of the primary calendar
+    google_sync_failures = db.Column(db.Integer, nullable=True, default=0)  # Consecutive failed scheduled syncs
+    google_sync_retry_at = db.Column(db.DateTime, nullable=True)  # No scheduled sync before this after a failure
     stripe_customer_id = db.Column(db.String(255), nullable=True)  # Stripe customer ID for billing
+    calendar_feed_token = db.Column(db.String(64), unique=True, nullable=True)  # Secret for the .ics subscription URL
     # group = db.Column(db.JSON, nullable=True)  # Temporarily disabled - column doesn't exist in DB
     
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -0,0 +1,26 @@
+"""add profiles.calendar_feed_token
+
+Revision ID: add_calendar_feed_token
+Revises: add_event_participants
+Create Date: 2025-10-19 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_calendar_feed_token'
+down_revision = 'add_event_participants'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('profiles', sa.Column('calendar_feed_token', sa.String(length=64), nullable=True))
+    op.create_unique_constraint('profiles_calendar_feed_token_key', 'profiles', ['calendar_feed_token'])
+
+
+def downgrade():
+    op.drop_constraint('profiles_calendar_feed_token_key', 'profiles', type_='unique')
+    op.drop_column('profiles', 'calendar_feed_token')
@@ -0,0 +1,28 @@
+"""add events.google_etag, google_sync_base and google_content_hash
+
+Revision ID: add_event_google_reconciliation
+Revises: add_google_sync_jobs
+Create Date: 2025-10-19 23:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_event_google_reconciliation'
+down_revision = 'add_google_sync_jobs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('events', sa.Column('google_etag', sa.String(length=100), nullable=True))
+    op.add_column('events', sa.Column('google_sync_base', sa.JSON(), nullable=True))
+    op.add_column('events', sa.Column('google_content_hash', sa.String(length=64), nullable=True))
+
+
+def downgrade():
+    op.drop_column('events', 'google_content_hash')
+    op.drop_column('events', 'google_sync_base')
+    op.drop_column('events', 'google_etag')
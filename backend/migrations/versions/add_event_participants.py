@@ -0,0 +1,72 @@
+"""add event_participants table
+
+Revision ID: add_event_participants
+Revises: add_event_window_indexes
+Create Date: 2025-10-19 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import json
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_event_participants'
+down_revision = 'add_event_window_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'event_participants',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('event_id', sa.Integer(), nullable=False),
+        sa.Column('email', sa.String(length=255), nullable=False),
+        sa.Column('user_id', sa.String(length=36), nullable=True),
+        sa.Column('response_status', sa.String(length=20), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['event_id'], ['events.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['profiles.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('event_id', 'email', name='unique_event_participant')
+    )
+    op.create_index('ix_event_participants_id', 'event_participants', ['id'], unique=False)
+    op.create_index('ix_event_participants_email', 'event_participants', ['email', 'event_id'], unique=False)
+    op.create_index('ix_event_participants_user', 'event_participants', ['user_id', 'event_id'], unique=False)
+
+    # Backfill from the events.participants JSON lists
+    bind = op.get_bind()
+    user_ids = {email.lower(): user_id for user_id, email in
+                bind.execute(sa.text("SELECT id, email FROM profiles WHERE email IS NOT NULL")).fetchall()}
+    rows = bind.execute(sa.text(
+        "SELECT id, CAST(participants AS TEXT) FROM events WHERE participants IS NOT NULL"
+    )).fetchall()
+
+    for event_id, participants in rows:
+        try:
+            participants = json.loads(participants) if participants else []
+        except (TypeError, ValueError):
+            continue
+        seen = set()
+        for participant in participants or []:
+            email = participant.get('email') if isinstance(participant, dict) else participant
+            if not isinstance(email, str) or not email.strip():
+                continue
+            email = email.strip().lower()
+            if email in seen:
+                continue
+            seen.add(email)
+            bind.execute(
+                sa.text("INSERT INTO event_participants (event_id, email, user_id, response_status, created_at, updated_at) "
+                        "VALUES (:event_id, :email, :user_id, 'needsAction', CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)"),
+                {'event_id': event_id, 'email': email, 'user_id': user_ids.get(email)}
+            )
+
+
+def downgrade():
+    op.drop_index('ix_event_participants_user', table_name='event_participants')
+    op.drop_index('ix_event_participants_email', table_name='event_participants')
+    op.drop_index('ix_event_participants_id', table_name='event_participants')
+    op.drop_table('event_participants')
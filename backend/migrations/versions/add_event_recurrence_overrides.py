@@ -0,0 +1,26 @@
+"""add recurrence exceptions and overrides to events
+
+Revision ID: add_event_recurrence_overrides
+Revises: add_tasks_archive
+Create Date: 2025-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_event_recurrence_overrides'
+down_revision = 'add_tasks_archive'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('events', sa.Column('recurrence_exceptions', sa.JSON(), nullable=True))
+    op.add_column('events', sa.Column('recurrence_overrides', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('events', 'recurrence_overrides')
+    op.drop_column('events', 'recurrence_exceptions')
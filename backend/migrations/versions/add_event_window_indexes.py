@@ -0,0 +1,31 @@
+"""add events.long_span and window indexes
+
+Revision ID: add_event_window_indexes
+Revises: add_event_recurrence_overrides
+Create Date: 2025-10-19 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_event_window_indexes'
+down_revision = 'add_event_recurrence_overrides'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('events', sa.Column('long_span', sa.Boolean(), nullable=False, server_default=sa.false()))
+    # Must match Event.MAX_OCCURRENCE_SPAN
+    op.execute("UPDATE events SET long_span = TRUE WHERE end_datetime - start_datetime > INTERVAL '31 days'")
+
+    op.create_index('ix_events_owner_span_start', 'events', ['owner_id', 'long_span', 'start_datetime'])
+    op.create_index('ix_events_user_span_start', 'events', ['user_id', 'long_span', 'start_datetime'])
+
+
+def downgrade():
+    op.drop_index('ix_events_user_span_start', table_name='events')
+    op.drop_index('ix_events_owner_span_start', table_name='events')
+    op.drop_column('events', 'long_span')
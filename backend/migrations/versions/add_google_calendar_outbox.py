@@ -0,0 +1,48 @@
+"""add google_calendar_outbox and events.google_sync_status
+
+Revision ID: add_google_calendar_outbox
+Revises: add_google_calendar_sync_token
+Create Date: 2025-10-19 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_google_calendar_outbox'
+down_revision = 'add_google_calendar_sync_token'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'google_calendar_outbox',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('event_id', sa.Integer(), sa.ForeignKey('events.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('user_id', sa.String(length=36), sa.ForeignKey('profiles.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('operation', sa.String(length=10), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False, server_default='pending'),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('next_attempt_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_google_calendar_outbox_id', 'google_calendar_outbox', ['id'])
+    op.create_index('ix_google_calendar_outbox_due', 'google_calendar_outbox', ['status', 'next_attempt_at'])
+    op.create_index('ix_google_calendar_outbox_event', 'google_calendar_outbox', ['event_id', 'status'])
+
+    op.add_column('events', sa.Column('google_sync_status', sa.String(length=20), nullable=True))
+    op.add_column('events', sa.Column('google_sync_error', sa.Text(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('events', 'google_sync_error')
+    op.drop_column('events', 'google_sync_status')
+    op.drop_index('ix_google_calendar_outbox_event', table_name='google_calendar_outbox')
+    op.drop_index('ix_google_calendar_outbox_due', table_name='google_calendar_outbox')
+    op.drop_index('ix_google_calendar_outbox_id', table_name='google_calendar_outbox')
+    op.drop_table('google_calendar_outbox')
@@ -0,0 +1,27 @@
+"""add profiles.google_calendar_sync_token
+
+Revision ID: add_google_calendar_sync_token
+Revises: add_google_contacts_sync_token
+Create Date: 2025-10-19 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_google_calendar_sync_token'
+down_revision = 'add_google_contacts_sync_token'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('profiles', sa.Column('google_calendar_sync_token', sa.Text(), nullable=True))
+    # Synced events are matched by Google id on every sync
+    op.create_index('ix_events_owner_google_event', 'events', ['owner_id', 'google_event_id'])
+
+
+def downgrade():
+    op.drop_index('ix_events_owner_google_event', table_name='events')
+    op.drop_column('profiles', 'google_calendar_sync_token')
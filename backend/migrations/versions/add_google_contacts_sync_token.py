@@ -0,0 +1,28 @@
+"""add profiles.google_contacts_sync_token and people.google_contact_id
+
+Revision ID: add_google_contacts_sync_token
+Revises: add_calendar_feed_token
+Create Date: 2025-10-19 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_google_contacts_sync_token'
+down_revision = 'add_calendar_feed_token'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('profiles', sa.Column('google_contacts_sync_token', sa.Text(), nullable=True))
+    op.add_column('people', sa.Column('google_contact_id', sa.String(length=100), nullable=True))
+    op.create_index('ix_people_owner_google_contact', 'people', ['owner_id', 'google_contact_id'])
+
+
+def downgrade():
+    op.drop_index('ix_people_owner_google_contact', table_name='people')
+    op.drop_column('people', 'google_contact_id')
+    op.drop_column('profiles', 'google_contacts_sync_token')
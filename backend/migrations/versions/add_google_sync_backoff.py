@@ -0,0 +1,34 @@
+"""add google sync backoff to profiles and background_leases
+
+Revision ID: add_google_sync_backoff
+Revises: add_tasks_archive_task_columns
+Create Date: 2025-10-20 03:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_google_sync_backoff'
+down_revision = 'add_tasks_archive_task_columns'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('profiles', sa.Column('google_sync_failures', sa.Integer(), nullable=True, server_default='0'))
+    op.add_column('profiles', sa.Column('google_sync_retry_at', sa.DateTime(), nullable=True))
+    op.create_table(
+        'background_leases',
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('holder', sa.String(length=255), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('background_leases')
+    op.drop_column('profiles', 'google_sync_retry_at')
+    op.drop_column('profiles', 'google_sync_failures')
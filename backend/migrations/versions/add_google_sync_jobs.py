@@ -0,0 +1,38 @@
+"""add google_sync_jobs
+
+Revision ID: add_google_sync_jobs
+Revises: add_google_token_refresh_lease
+Create Date: 2025-10-19 22:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_google_sync_jobs'
+down_revision = 'add_google_token_refresh_lease'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'google_sync_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.String(length=36), sa.ForeignKey('profiles.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False, server_default='queued'),
+        sa.Column('progress', sa.JSON(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_google_sync_jobs_id', 'google_sync_jobs', ['id'])
+    op.create_index('ix_google_sync_jobs_user', 'google_sync_jobs', ['user_id', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_google_sync_jobs_user', table_name='google_sync_jobs')
+    op.drop_index('ix_google_sync_jobs_id', table_name='google_sync_jobs')
+    op.drop_table('google_sync_jobs')
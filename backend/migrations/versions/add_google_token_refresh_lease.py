@@ -0,0 +1,24 @@
+"""add profiles.google_token_refresh_lease_until
+
+Revision ID: add_google_token_refresh_lease
+Revises: add_google_calendar_outbox
+Create Date: 2025-10-19 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_google_token_refresh_lease'
+down_revision = 'add_google_calendar_outbox'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('profiles', sa.Column('google_token_refresh_lease_until', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('profiles', 'google_token_refresh_lease_until')
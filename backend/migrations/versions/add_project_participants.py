@@ -0,0 +1,61 @@
+"""add project_participants table
+
+Revision ID: add_project_participants
+Revises: add_google_sync_to_events
+Create Date: 2025-10-19 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import json
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_project_participants'
+down_revision = 'add_google_sync_to_events'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'project_participants',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('owner_id', sa.String(length=36), nullable=False),
+        sa.Column('project', sa.String(length=100), nullable=False),
+        sa.Column('email', sa.String(length=255), nullable=False),
+        sa.Column('added_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['owner_id'], ['profiles.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('owner_id', 'project', 'email', name='unique_project_participant')
+    )
+    op.create_index('ix_project_participants_id', 'project_participants', ['id'], unique=False)
+    op.create_index('ix_project_participants_email', 'project_participants', ['email', 'owner_id', 'project'], unique=False)
+
+    # Backfill from the per-task participants lists that used to be rewritten on every change
+    bind = op.get_bind()
+    rows = bind.execute(sa.text(
+        "SELECT DISTINCT owner_id, project, CAST(participants AS TEXT) FROM tasks "
+        "WHERE project IS NOT NULL AND participants IS NOT NULL"
+    )).fetchall()
+
+    seen = set()
+    for owner_id, project, participants in rows:
+        try:
+            emails = json.loads(participants) if participants else []
+        except (TypeError, ValueError):
+            continue
+        for email in emails or []:
+            if isinstance(email, str) and email and (owner_id, project, email) not in seen:
+                seen.add((owner_id, project, email))
+                bind.execute(
+                    sa.text("INSERT INTO project_participants (owner_id, project, email, added_at) "
+                            "VALUES (:owner_id, :project, :email, CURRENT_TIMESTAMP)"),
+                    {'owner_id': owner_id, 'project': project, 'email': email}
+                )
+
+
+def downgrade():
+    op.drop_index('ix_project_participants_email', table_name='project_participants')
+    op.drop_index('ix_project_participants_id', table_name='project_participants')
+    op.drop_table('project_participants')
@@ -0,0 +1,41 @@
+"""add tasks.priority_rank and list indexes
+
+Revision ID: add_task_priority_rank
+Revises: add_project_participants
+Create Date: 2025-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_task_priority_rank'
+down_revision = 'add_project_participants'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('tasks', sa.Column('priority_rank', sa.SmallInteger(), nullable=True))
+    op.execute("""
+        UPDATE tasks SET priority_rank = CASE LOWER(priority)
+            WHEN 'low' THEN 0
+            WHEN 'high' THEN 2
+            ELSE 1
+        END
+    """)
+
+    op.create_index('ix_tasks_owner_project_rank', 'tasks',
+                    ['owner_id', 'project', sa.text('priority_rank DESC'), sa.text('created_at DESC')])
+    op.create_index('ix_tasks_owner_active_status_rank', 'tasks',
+                    ['owner_id', 'is_active', 'status', sa.text('priority_rank DESC'), sa.text('created_at DESC')])
+    op.create_index('ix_tasks_owner_active_due', 'tasks',
+                    ['owner_id', 'is_active', 'due_date', sa.text('created_at DESC')])
+
+
+def downgrade():
+    op.drop_index('ix_tasks_owner_active_due', table_name='tasks')
+    op.drop_index('ix_tasks_owner_active_status_rank', table_name='tasks')
+    op.drop_index('ix_tasks_owner_project_rank', table_name='tasks')
+    op.drop_column('tasks', 'priority_rank')
@@ -0,0 +1,44 @@
+"""add tasks_archive table
+
+Revision ID: add_tasks_archive
+Revises: add_task_priority_rank
+Create Date: 2025-10-19 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_tasks_archive'
+down_revision = 'add_task_priority_rank'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'tasks_archive',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('owner_id', sa.String(length=36), nullable=False),
+        sa.Column('title', sa.String(length=255), nullable=True),
+        sa.Column('project', sa.String(length=100), nullable=True),
+        sa.Column('status', sa.String(length=50), nullable=True),
+        sa.Column('assign_to', sa.String(length=255), nullable=True),
+        sa.Column('due_date', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('completed_at', sa.DateTime(), nullable=True),
+        sa.Column('archived_at', sa.DateTime(), nullable=True),
+        sa.Column('data', sa.JSON(), nullable=False),
+        sa.ForeignKeyConstraint(['owner_id'], ['profiles.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_tasks_archive_owner_project', 'tasks_archive',
+                    ['owner_id', 'project', sa.text('created_at DESC')])
+    op.create_index('ix_tasks_status_updated', 'tasks', ['status', 'updated_at'])
+
+
+def downgrade():
+    op.drop_index('ix_tasks_status_updated', table_name='tasks')
+    op.drop_index('ix_tasks_archive_owner_project', table_name='tasks_archive')
+    op.drop_table('tasks_archive')
@@ -0,0 +1,24 @@
+"""add task_columns to tasks_archive
+
+Revision ID: add_tasks_archive_task_columns
+Revises: add_telegram_update_dedup_key
+Create Date: 2025-10-20 02:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_tasks_archive_task_columns'
+down_revision = 'add_telegram_update_dedup_key'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('tasks_archive', sa.Column('task_columns', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('tasks_archive', 'task_columns')
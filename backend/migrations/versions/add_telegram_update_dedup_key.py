@@ -0,0 +1,26 @@
+"""add dedup_key to telegram_updates
+
+Revision ID: add_telegram_update_dedup_key
+Revises: add_telegram_updates
+Create Date: 2025-10-20 01:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_telegram_update_dedup_key'
+down_revision = 'add_telegram_updates'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('telegram_updates', sa.Column('dedup_key', sa.String(length=100), nullable=True))
+    op.create_unique_constraint('uq_telegram_updates_dedup_key', 'telegram_updates', ['dedup_key'])
+
+
+def downgrade():
+    op.drop_constraint('uq_telegram_updates_dedup_key', 'telegram_updates', type_='unique')
+    op.drop_column('telegram_updates', 'dedup_key')
@@ -0,0 +1,41 @@
+"""add telegram_updates
+
+Revision ID: add_telegram_updates
+Revises: add_event_google_reconciliation
+Create Date: 2025-10-20 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_telegram_updates'
+down_revision = 'add_event_google_reconciliation'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'telegram_updates',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('update_id', sa.BigInteger(), nullable=True),
+        sa.Column('chat_id', sa.String(length=64), nullable=True),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False, server_default='pending'),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_telegram_updates_id', 'telegram_updates', ['id'])
+    op.create_index('ix_telegram_updates_status', 'telegram_updates', ['status', 'id'])
+    op.create_index('ix_telegram_updates_chat', 'telegram_updates', ['chat_id', 'status'])
+
+
+def downgrade():
+    op.drop_index('ix_telegram_updates_chat', table_name='telegram_updates')
+    op.drop_index('ix_telegram_updates_status', table_name='telegram_updates')
+    op.drop_index('ix_telegram_updates_id', table_name='telegram_updates')
+    op.drop_table('telegram_updates')
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Tests for the unified agenda endpoint.
+"""
+
+import unittest
+import json
+import os
+import sys
+from datetime import datetime, date
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'backend'))
+
+# Set testing environment before importing app
+os.environ['TESTING'] = 'true'
+
+from api.app import app
+from dal.database import db
+from dal.models import User, Event, Task, Person
+from bl.services.agenda_service import agenda_service
+from flask_jwt_extended import create_access_token
+
+class TestAgenda(unittest.TestCase):
+    """GET /agenda merges events, tasks, follow-ups and birthdays"""
+    
+    def setUp(self):
+        app.config['JWT_SECRET_KEY'] = 'test-secret-key'
+        self.app = app
+        self.client = app.test_client()
+        agenda_service.invalidate('user-123')
+        
+        with app.app_context():
+            db.create_all()
+            db.session.add(User(id='user-123', email='user@test.com', full_name='User', is_approved=True))
+            db.session.add(Event(title='Standup', start_datetime=datetime(2025, 1, 6, 9),
+                                 end_datetime=datetime(2025, 1, 6, 9, 15), repeat_pattern='daily',
+                                 owner_id='user-123', user_id='user-123'))
+            db.session.add(Task(title='Send report', text='Send report', due_date=datetime(2025, 3, 3, 17),
+                                owner_id='user-123'))
+            db.session.add(Task(title='Done already', text='Done already', due_date=datetime(2025, 3, 3, 8),
+                                status='completed', owner_id='user-123'))
+            db.session.add(Task(title='Plan trip', text='Plan trip', scheduled_date=datetime(2025, 3, 3, 11),
+                                is_scheduled=True, is_active=False, owner_id='user-123'))
+            db.session.add(Person(first_name='Ada', last_name='Lovelace', birthday=date(1815, 3, 3),
+                                  owner_id='user-123'))
+            db.session.add(Person(first_name='Alan', last_name='Turing', next_follow_up_date=datetime(2025, 3, 3, 14),
+                                  owner_id='user-123'))
+            db.session.add(Person(first_name='Grace', last_name='Hopper', birthday=date(1906, 12, 9),
+                                  owner_id='user-123'))
+            db.session.commit()
+            self.headers = {'Authorization': f"Bearer {create_access_token(identity='user-123')}"}
+    
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+    
+    def test_agenda_is_merged_and_ordered(self):
+        response = self.client.get('/api/agenda?from=2025-03-03T00:00:00Z&to=2025-03-04T00:00:00Z', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        items = json.loads(response.data)['items']
+        self.assertEqual([(item['type'], item['title']) for item in items], [
+            ('birthday', "Ada Lovelace's birthday"),
+            ('event', 'Standup'),
+            ('task_scheduled', 'Plan trip'),
+            ('follow_up', 'Follow up with Alan Turing'),
+            ('task_due', 'Send report'),
+        ])
+    
+    def test_agenda_cache_is_invalidated_by_writes(self):
+        url = '/api/agenda?from=2025-03-03T00:00:00Z&to=2025-03-04T00:00:00Z'
+        count = json.loads(self.client.get(url, headers=self.headers).data)['count']
+        
+        response = self.client.post('/api/tasks', data=json.dumps({
+            'title': 'New task', 'project': 'Personal', 'due_date': '2025-03-03T12:00:00'
+        }), content_type='application/json', headers=self.headers)
+        self.assertEqual(response.status_code, 201)
+        
+        self.assertEqual(json.loads(self.client.get(url, headers=self.headers).data)['count'], count + 1)
+    
+    def test_bot_and_invitee_agendas_are_invalidated_by_writes(self):
+        from api.routes.telegram import add_task_from_telegram
+        url = '/api/agenda?from=2025-03-03T00:00:00Z&to=2025-03-04T00:00:00Z'
+        with self.app.app_context():
+            db.session.add(User(id='user-456', email='invitee@test.com', full_name='Invitee', is_approved=True))
+            db.session.commit()
+            invitee_headers = {'Authorization': f"Bearer {create_access_token(identity='user-456')}"}
+        agenda_service.invalidate('user-456')
+        count = lambda headers: json.loads(self.client.get(url, headers=headers).data)['count']
+        
+        owner_count, invitee_count = count(self.headers), count(invitee_headers)
+        with self.app.app_context():
+            add_task_from_telegram({'text': 'Call bank', 'due_date': '2025-03-03 16:00'}, User.query.get('user-123'))
+        self.assertEqual(count(self.headers), owner_count + 1)
+        
+        response = self.client.post('/api/events', data=json.dumps({
+            'title': 'Review', 'start_datetime': '2025-03-03T15:00:00', 'end_datetime': '2025-03-03T16:00:00',
+            'participants': [{'name': 'Invitee', 'email': 'Invitee@test.com'}], 'google_sync': False
+        }), content_type='application/json', headers=self.headers)
+        event_id = json.loads(response.data)['event']['id']
+        self.assertEqual(count(invitee_headers), invitee_count + 1)
+        
+        # A removed invitee stops seeing the event at once
+        self.client.put(f'/api/events/{event_id}', data=json.dumps({'participants': []}),
+                        content_type='application/json', headers=self.headers)
+        self.assertEqual(count(invitee_headers), invitee_count)
+    
+    def test_telegram_agenda_command_matches_whole_messages_only(self):
+        from api.routes.telegram import process_simple_commands
+        with self.app.app_context():
+            user = User.query.get('user-123')
+            for text in ('/agenda', 'My agenda tomorrow', "What's on today?", 'my day'):
+                self.assertIn('agenda', process_simple_commands(text, user).lower(), text)
+            # Ordinary requests that mention the words go on to the natural language handler
+            for text in ('add task prepare meeting agenda', 'remind me to plan my day'):
+                self.assertIsNone(process_simple_commands(text, user), text)
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -329,6 +329,80 @@ class TestNeoNetworkerAPI(unittest.TestCase):
         self.assertGreaterEqual(len(data['people']), 2)
     
     
+    def test_project_participants(self):
+        """Test project participants are stored once and grant task visibility"""
+        with self.app.app_context():
+            admin = db.session.get(User, self.admin_user.id)
+            admin.user_preferences = {'group_members': [{'email': 'user@test.com', 'status': 'approved'}]}
+            db.session.commit()
+        
+        for title in ['First task', 'Second task']:
+            response = self.client.post('/api/tasks',
+                                      data=json.dumps({'title': title, 'project': 'shared'}),
+                                      content_type='application/json',
+                                      headers=self.get_headers(self.admin_token))
+            self.assertEqual(response.status_code, 201)
+        
+        # Participant cannot see the project before being added
+        response = self.client.get('/api/tasks', headers=self.get_headers(self.user_token))
+        self.assertEqual(json.loads(response.data)['total_tasks'], 0)
+        
+        response = self.client.post('/api/projects/shared/participants',
+                                  data=json.dumps({'participants': ['user@test.com']}),
+                                  content_type='application/json',
+                                  headers=self.get_headers(self.admin_token))
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data['added'], ['user@test.com'])
+        
+        response = self.client.get('/api/projects/shared/participants',
+                                 headers=self.get_headers(self.admin_token))
+        self.assertEqual(json.loads(response.data)['participants'], ['user@test.com'])
+        
+        response = self.client.get('/api/tasks', headers=self.get_headers(self.user_token))
+        data = json.loads(response.data)
+        self.assertEqual(data['total_tasks'], 2)
+        self.assertEqual(data['projects']['shared'][0]['participants'], ['user@test.com'])
+        
+        # Removing the participant hides the project again
+        response = self.client.post('/api/projects/shared/participants',
+                                  data=json.dumps({'participants': []}),
+                                  content_type='application/json',
+                                  headers=self.get_headers(self.admin_token))
+        self.assertEqual(json.loads(response.data)['removed'], ['user@test.com'])
+        
+        response = self.client.get('/api/tasks', headers=self.get_headers(self.user_token))
+        self.assertEqual(json.loads(response.data)['total_tasks'], 0)
+    
+    def test_task_archive(self):
+        """Test finished tasks move to the archive and are only read on request"""
+        response = self.client.post('/api/tasks',
+                                  data=json.dumps({'title': 'Old task', 'project': 'work', 'status': 'completed'}),
+                                  content_type='application/json',
+                                  headers=self.get_headers(self.user_token))
+        task_id = json.loads(response.data)['task']['id']
+        
+        response = self.client.post('/api/tasks/archive',
+                                  data=json.dumps({'older_than_days': 0}),
+                                  content_type='application/json',
+                                  headers=self.get_headers(self.user_token))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data)['archived_count'], 1)
+        
+        response = self.client.get('/api/tasks', headers=self.get_headers(self.user_token))
+        self.assertEqual(json.loads(response.data)['total_tasks'], 0)
+        
+        response = self.client.get('/api/tasks?include_archived=true', headers=self.get_headers(self.user_token))
+        data = json.loads(response.data)
+        self.assertEqual(data['total_tasks'], 1)
+        self.assertTrue(data['projects']['work'][0]['is_archived'])
+        
+        response = self.client.post(f'/api/tasks/{task_id}/restore', headers=self.get_headers(self.user_token))
+        self.assertEqual(response.status_code, 200)
+        
+        response = self.client.get('/api/tasks', headers=self.get_headers(self.user_token))
+        self.assertEqual(json.loads(response.data)['total_tasks'], 1)
+    
     def test_telegram_auth(self):
         """Test telegram authentication"""
         auth_data = {
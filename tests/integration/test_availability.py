@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Tests for the free/busy slot finder and event conflict checks.
+"""
+
+import unittest
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'backend'))
+
+# Set testing environment before importing app
+os.environ['TESTING'] = 'true'
+
+from api.app import app
+from dal.database import db
+from dal.models import User, Event, EventParticipant
+from bl.services.availability_service import AvailabilityService
+from flask_jwt_extended import create_access_token
+
+class TestAvailabilitySweep(unittest.TestCase):
+    """Interval merging and gap search"""
+    
+    def test_merge_intervals(self):
+        at = lambda hour, minute=0: datetime(2025, 3, 3, hour, minute)
+        merged = AvailabilityService.merge_intervals([
+            (at(13), at(14)), (at(9), at(10)), (at(9, 30), at(11)), (at(11), at(12)), (at(15), at(16))
+        ])
+        self.assertEqual(merged, [(at(9), at(12)), (at(13), at(14)), (at(15), at(16))])
+    
+    def test_working_intervals_skip_weekend_and_apply_offset(self):
+        # Friday to Monday, working hours in UTC+2
+        intervals = AvailabilityService.working_intervals(
+            datetime(2025, 3, 7), datetime(2025, 3, 11), {'start': '09:00', 'end': '17:00', 'days': [0, 1, 2, 3, 4]}, 120)
+        self.assertEqual(intervals, [
+            (datetime(2025, 3, 7, 7), datetime(2025, 3, 7, 15)),
+            (datetime(2025, 3, 10, 7), datetime(2025, 3, 10, 15)),
+        ])
+    
+    def test_free_slots(self):
+        at = lambda hour: datetime(2025, 3, 3, hour)
+        busy = [(at(8), at(10)), (at(11), at(12)), (at(16), at(18))]
+        slots = AvailabilityService.free_slots(busy, [(at(9), at(17))], timedelta(hours=1))
+        self.assertEqual(slots, [(at(10), at(11)), (at(12), at(16))])
+
+class CalendarTestCase(unittest.TestCase):
+    """Two group members with a few events on Monday 2025-03-03"""
+    
+    def setUp(self):
+        app.config['JWT_SECRET_KEY'] = 'test-secret-key'
+        self.app = app
+        self.client = app.test_client()
+        
+        with app.app_context():
+            db.create_all()
+            db.session.add(User(id='user-1', email='one@test.com', full_name='One', is_approved=True,
+                                user_preferences={'group_members': [{'email': 'two@test.com', 'full_name': 'Two'}]}))
+            db.session.add(User(id='user-2', email='two@test.com', full_name='Two', is_approved=True))
+            db.session.add(User(id='user-3', email='three@test.com', full_name='Three', is_approved=True))
+            
+            def add_event(owner, start, end, title='Busy', **kwargs):
+                event = Event(title=title, start_datetime=start, end_datetime=end,
+                              owner_id=owner, user_id=owner, **kwargs)
+                db.session.add(event)
+                db.session.flush()
+                EventParticipant.sync_from_event(event)
+            
+            # Monday 2025-03-03
+            add_event('user-1', datetime(2025, 3, 3, 9), datetime(2025, 3, 3, 10))
+            add_event('user-2', datetime(2025, 3, 3, 9, 30), datetime(2025, 3, 3, 11))
+            # Someone else's meeting that user-2 attends
+            add_event('user-3', datetime(2025, 3, 3, 13), datetime(2025, 3, 3, 14),
+                      participants=[{'email': 'two@test.com'}])
+            # Declined invitations do not block time
+            add_event('user-3', datetime(2025, 3, 3, 15), datetime(2025, 3, 3, 16),
+                      participants=[{'email': 'two@test.com', 'response_status': 'declined'}])
+            # Daily lunch of user-1, series started last month
+            add_event('user-1', datetime(2025, 2, 1, 12), datetime(2025, 2, 1, 13), title='Lunch', repeat_pattern='daily')
+            db.session.commit()
+            self.token = create_access_token(identity='user-1')
+    
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+class TestFindSlotsAPI(CalendarTestCase):
+    """POST /events/find-slots"""
+    
+    def post(self, payload):
+        return self.client.post('/api/events/find-slots', data=json.dumps(payload), content_type='application/json',
+                                headers={'Authorization': f'Bearer {self.token}'})
+    
+    def test_find_slots(self):
+        response = self.post({
+            'emails': ['two@test.com'],
+            'start_date': '2025-03-03T00:00:00Z',
+            'end_date': '2025-03-04T00:00:00Z',
+            'duration_minutes': 60
+        })
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual([(slot['start'], slot['end']) for slot in data['slots']], [
+            ('2025-03-03T11:00:00', '2025-03-03T12:00:00'),
+            ('2025-03-03T14:00:00', '2025-03-03T17:00:00'),
+        ])
+    
+    def test_rejects_malformed_working_hours(self):
+        for working_hours in ({'start': 9, 'end': '17:00'}, {'start': '09:00', 'end': None},
+                              {'days': 'weekdays'}, ['09:00', '17:00']):
+            response = self.post({
+                'emails': ['two@test.com'],
+                'start_date': '2025-03-03T00:00:00Z',
+                'end_date': '2025-03-04T00:00:00Z',
+                'duration_minutes': 60,
+                'working_hours': working_hours
+            })
+            self.assertEqual(response.status_code, 400, working_hours)
+            self.assertIn('Invalid working_hours', json.loads(response.data)['error'])
+    
+    def test_rejects_people_outside_group(self):
+        response = self.post({
+            'emails': ['three@test.com'],
+            'start_date': '2025-03-03T00:00:00Z',
+            'end_date': '2025-03-04T00:00:00Z',
+            'duration_minutes': 60
+        })
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(json.loads(response.data), {'error': 'Not in your group: three@test.com'})
+
+class TestEventConflicts(CalendarTestCase):
+    """Conflict results on create and from the check endpoint, and the bot warning"""
+    
+    def test_check_endpoint(self):
+        response = self.client.post('/api/events/conflicts', data=json.dumps({
+            'start_datetime': '2025-03-03T12:30:00',
+            'end_datetime': '2025-03-03T13:30:00',
+            'participants': [{'email': 'two@test.com'}]
+        }), content_type='application/json', headers={'Authorization': f'Bearer {self.token}'})
+        data = json.loads(response.data)
+        self.assertTrue(data['has_conflicts'])
+        # Own lunch (recurring) is shown, the other owner's meeting only as busy time
+        self.assertEqual([(c['title'], c['people']) for c in data['conflicts']], [
+            ('Lunch', ['one@test.com']),
+            ('Busy', ['two@test.com']),
+        ])
+    
+    def test_check_endpoint_rejects_people_outside_group(self):
+        response = self.client.post('/api/events/conflicts', data=json.dumps({
+            'start_datetime': '2025-03-03T12:30:00',
+            'end_datetime': '2025-03-03T13:30:00',
+            'participants': [{'email': 'three@test.com'}]
+        }), content_type='application/json', headers={'Authorization': f'Bearer {self.token}'})
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(json.loads(response.data), {'error': 'Not in your group: three@test.com'})
+    
+    def test_create_returns_conflicts(self):
+        response = self.client.post('/api/events', data=json.dumps({
+            'title': 'Planning',
+            'start_datetime': '2025-03-03T09:45:00',
+            'end_datetime': '2025-03-03T10:15:00',
+            'google_sync': False
+        }), content_type='application/json', headers={'Authorization': f'Bearer {self.token}'})
+        self.assertEqual(response.status_code, 201)
+        conflicts = json.loads(response.data)['conflicts']
+        self.assertEqual([(c['start_datetime'], c['people']) for c in conflicts],
+                         [('2025-03-03T09:00:00', ['one@test.com'])])
+    
+    def test_telegram_warning(self):
+        from api.routes.telegram import add_event_from_telegram
+        with self.app.app_context():
+            user = User.query.get('user-1')
+            reply = add_event_from_telegram({
+                'title': 'Sync',
+                'start_datetime': '2025-03-03 09:30',
+                'end_datetime': '2025-03-03 10:30'
+            }, user)
+        self.assertIn('created successfully', reply)
+        self.assertIn('Overlaps with', reply)
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Tests for the iCalendar subscription feed.
+"""
+
+import unittest
+import json
+import os
+import sys
+from datetime import datetime
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'backend'))
+
+# Set testing environment before importing app
+os.environ['TESTING'] = 'true'
+
+from api.app import app
+from dal.database import db
+from dal.models import User, Event, Task
+from bl.services.ical_feed_service import fold_line
+from flask_jwt_extended import create_access_token
+
+class TestCalendarFeed(unittest.TestCase):
+    """GET /calendar/<token>.ics"""
+    
+    def setUp(self):
+        app.config['JWT_SECRET_KEY'] = 'test-secret-key'
+        self.app = app
+        self.client = app.test_client()
+        
+        with app.app_context():
+            db.create_all()
+            db.session.add(User(id='user-123', email='user@test.com', full_name='User', is_approved=True))
+            db.session.add(Event(title='Standup, daily', start_datetime=datetime(2025, 1, 6, 9),
+                                 end_datetime=datetime(2025, 1, 6, 9, 15), repeat_pattern='weekly',
+                                 repeat_days=[0, 2], repeat_end_date=datetime(2025, 6, 30),
+                                 recurrence_exceptions=['2025-01-08T09:00:00'],
+                                 owner_id='user-123', user_id='user-123'))
+            db.session.add(Task(title='File taxes', text='File taxes', due_date=datetime(2025, 4, 15, 12),
+                                priority='high', owner_id='user-123'))
+            db.session.commit()
+            self.headers = {'Authorization': f"Bearer {create_access_token(identity='user-123')}"}
+    
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+    
+    def test_feed(self):
+        response = self.client.get('/api/calendar/feed', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        url = json.loads(response.data)['url']
+        path = url[url.index('/api/'):]
+        
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/calendar')
+        body = response.get_data(as_text=True)
+        self.assertTrue(body.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertIn('SUMMARY:Standup\\, daily\r\n', body)
+        self.assertIn('RRULE:FREQ=WEEKLY;BYDAY=MO,WE;UNTIL=20250630T235959Z\r\n', body)
+        self.assertIn('EXDATE:20250108T090000Z\r\n', body)
+        self.assertEqual(body.count('BEGIN:VEVENT'), 1)  # Recurrences are not expanded
+        self.assertIn('BEGIN:VTODO', body)
+        self.assertIn('DUE:20250415T120000Z\r\n', body)
+        
+        # Unchanged feed: conditional requests get 304
+        etag = response.headers['ETag']
+        self.assertEqual(self.client.get(path, headers={'If-None-Match': etag}).status_code, 304)
+        # Last-Modified cannot see deletions, so it does not validate a cached copy on its own
+        self.assertEqual(self.client.get(path, headers={'If-Modified-Since': response.headers['Last-Modified']}).status_code, 200)
+        
+        # Deleting the event changes the ETag
+        with self.app.app_context():
+            event_id = Event.query.first().id
+        self.assertEqual(self.client.delete(f'/api/events/{event_id}', headers=self.headers).status_code, 200)
+        response = self.client.get(path, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('BEGIN:VEVENT', response.get_data(as_text=True))
+        etag = response.headers['ETag']
+        
+        # A change produces a new ETag
+        with self.app.app_context():
+            task = Task.query.first()
+            task.status = 'completed'
+            task.updated_at = datetime(2030, 1, 1)
+            db.session.commit()
+        response = self.client.get(path, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('STATUS:COMPLETED', response.get_data(as_text=True))
+    
+    def test_rotated_token_stops_working(self):
+        old_url = json.loads(self.client.get('/api/calendar/feed', headers=self.headers).data)['url']
+        self.client.post('/api/calendar/feed', headers=self.headers)
+        self.assertEqual(self.client.get(old_url[old_url.index('/api/'):]).status_code, 404)
+    
+    def test_fold_line(self):
+        folded = fold_line('DESCRIPTION:' + 'é' * 60)
+        self.assertTrue(all(len(line.encode('utf-8')) <= 75 for line in folded.rstrip('\r\n').split('\r\n')))
+        self.assertEqual(folded.replace('\r\n ', ''), 'DESCRIPTION:' + 'é' * 60 + '\r\n')
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
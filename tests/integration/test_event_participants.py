@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Tests for the event_participants table and "events I'm invited to".
+"""
+
+import unittest
+import json
+import os
+import sys
+from datetime import datetime
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'backend'))
+
+# Set testing environment before importing app
+os.environ['TESTING'] = 'true'
+
+from api.app import app
+from dal.database import db
+from dal.models import User, Event, EventParticipant
+from flask_jwt_extended import create_access_token
+
+class TestEventParticipants(unittest.TestCase):
+    """Participant rows follow Event.participants and drive invited-event queries"""
+    
+    def setUp(self):
+        app.config['JWT_SECRET_KEY'] = 'test-secret-key'
+        self.app = app
+        self.client = app.test_client()
+        
+        with app.app_context():
+            db.create_all()
+            db.session.add(User(id='owner-1', email='owner@test.com', full_name='Owner', is_approved=True))
+            db.session.add(User(id='guest-1', email='guest@test.com', full_name='Guest', is_approved=True))
+            db.session.commit()
+            self.owner_headers = {'Authorization': f"Bearer {create_access_token(identity='owner-1')}"}
+            self.guest_headers = {'Authorization': f"Bearer {create_access_token(identity='guest-1')}"}
+    
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+    
+    def test_invited_events(self):
+        response = self.client.post('/api/events', data=json.dumps({
+            'title': 'Review',
+            'start_datetime': '2025-03-03T09:00:00',
+            'end_datetime': '2025-03-03T10:00:00',
+            'participants': [{'name': 'Guest', 'email': 'Guest@Test.com'}, {'name': 'Outsider', 'email': 'out@test.com'}],
+            'google_sync': False
+        }), content_type='application/json', headers=self.owner_headers)
+        self.assertEqual(response.status_code, 201)
+        event_id = json.loads(response.data)['event']['id']
+        
+        with self.app.app_context():
+            rows = EventParticipant.get_participants(event_id)
+            self.assertEqual([(row.email, row.user_id) for row in rows],
+                             [('guest@test.com', 'guest-1'), ('out@test.com', None)])
+        
+        response = self.client.get('/api/events', headers=self.guest_headers)
+        self.assertEqual([event['title'] for event in json.loads(response.data)['events']], ['Review'])
+        
+        # Removing the guest removes the invitation
+        response = self.client.put(f'/api/events/{event_id}', data=json.dumps({
+            'participants': [{'name': 'Outsider', 'email': 'out@test.com'}]
+        }), content_type='application/json', headers=self.owner_headers)
+        self.assertEqual(response.status_code, 200)
+        
+        response = self.client.get('/api/events', headers=self.guest_headers)
+        self.assertEqual(json.loads(response.data)['count'], 0)
+    
+    def test_sync_keeps_response_status(self):
+        with self.app.app_context():
+            event = Event(title='Sync', start_datetime=datetime(2025, 3, 3, 9), end_datetime=datetime(2025, 3, 3, 10),
+                          owner_id='owner-1', user_id='owner-1',
+                          participants=[{'email': 'guest@test.com', 'response_status': 'accepted'}])
+            db.session.add(event)
+            db.session.flush()
+            self.assertEqual(EventParticipant.sync_from_event(event), (['guest@test.com'], []))
+            db.session.commit()
+            
+            # Re-saving participants without a status does not reset the RSVP
+            event.participants = [{'email': 'guest@test.com'}, {'email': 'new@test.com'}]
+            self.assertEqual(EventParticipant.sync_from_event(event), (['new@test.com'], []))
+            db.session.commit()
+            
+            statuses = {row.email: row.response_status for row in EventParticipant.get_participants(event.id)}
+            self.assertEqual(statuses, {'guest@test.com': 'accepted', 'new@test.com': 'needsAction'})
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Tests for the Google Calendar write-behind outbox.
+"""
+
+import unittest
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'backend'))
+
+# Set testing environment before importing app
+os.environ['TESTING'] = 'true'
+
+from api.app import app
+from dal.database import db
+from dal.models import User, Event, GoogleCalendarOutbox
+from bl.services.google_calendar_outbox_service import google_calendar_outbox_service
+from bl.services.google_calendar_sync_service import google_calendar_sync_service
+from flask_jwt_extended import create_access_token
+
+class FakeGoogleCalendar:
+    """Stands in for google_calendar_sync_service.push_batch"""
+
+    def __init__(self):
+        self.batches = []
+        self.fail = set()  # Event titles whose calls fail
+
+    @property
+    def calls(self):
+        return [call for batch in self.batches for call in batch]
+
+    def push_batch(self, user, operations):
+        self.batches.append([(operation, event.title if operation != 'delete' else event.google_event_id)
+                             for _, operation, event in operations])
+        results = {}
+        for key, operation, event in operations:
+            ok = event.title not in self.fail
+            results[key] = {'ok': ok, 'google_event_id': f'g-{event.id}' if ok and operation == 'create' else None,
+                            'error': None if ok else 'Backend Error', 'not_found': False}
+        return results
+
+class TestGoogleCalendarOutbox(unittest.TestCase):
+    """Event writes enqueue one coalesced intent; the worker pushes it with retries"""
+
+    def setUp(self):
+        app.config['JWT_SECRET_KEY'] = 'test-secret-key'
+        self.client = app.test_client()
+        self.google = FakeGoogleCalendar()
+        self.original_push_batch = google_calendar_sync_service.push_batch
+        google_calendar_sync_service.push_batch = self.google.push_batch
+
+        with app.app_context():
+            db.create_all()
+            db.session.add(User(id='user-123', email='user@test.com', full_name='User', is_approved=True,
+                                google_id='g-user'))
+            db.session.commit()
+            self.headers = {'Authorization': f"Bearer {create_access_token(identity='user-123')}"}
+
+    def tearDown(self):
+        google_calendar_sync_service.push_batch = self.original_push_batch
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def create_event(self, title='Kickoff'):
+        response = self.client.post('/api/events', headers=self.headers, json={
+            'title': title,
+            'start_datetime': '2025-03-03T09:00:00',
+            'end_datetime': '2025-03-03T10:00:00'
+        })
+        self.assertEqual(response.status_code, 201)
+        return json.loads(response.data)['event']
+
+    def test_writes_are_coalesced_into_one_push(self):
+        event = self.create_event()
+        self.assertEqual(event['google_sync_status'], 'pending')
+        for title in ('Kickoff v2', 'Kickoff v3'):
+            response = self.client.put(f"/api/events/{event['id']}", headers=self.headers, json={'title': title})
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.google.calls, [])
+
+        with app.app_context():
+            self.assertEqual([(row.operation, row.status) for row in GoogleCalendarOutbox.query.all()],
+                             [('create', 'pending')])
+            self.assertEqual(google_calendar_outbox_service.process_due(), 1)
+            self.assertEqual(self.google.calls, [('create', 'Kickoff v3')])
+            stored = Event.query.get(event['id'])
+            self.assertEqual((stored.google_event_id, stored.google_sync_status), (f"g-{event['id']}", 'synced'))
+
+    def test_failed_push_is_retried_with_backoff(self):
+        event = self.create_event()
+        self.google.fail = {'Kickoff'}
+        with app.app_context():
+            google_calendar_outbox_service.process_due()
+            row = GoogleCalendarOutbox.query.one()
+            self.assertEqual((row.status, row.attempts), ('pending', 1))
+            self.assertGreater(row.next_attempt_at, datetime.utcnow())
+            self.assertEqual(Event.query.get(event['id']).google_sync_status, 'pending')
+            self.assertIsNotNone(Event.query.get(event['id']).google_sync_error)
+
+            # Not due yet
+            self.assertEqual(google_calendar_outbox_service.process_due(), 0)
+
+            self.google.fail = set()
+            self.assertEqual(google_calendar_outbox_service.process_due(datetime.utcnow() + timedelta(hours=1)), 1)
+            self.assertEqual(GoogleCalendarOutbox.query.one().status, 'done')
+            self.assertEqual(Event.query.get(event['id']).google_sync_status, 'synced')
+
+        # Deleting after the push sends one delete for the Google event
+        response = self.client.delete(f"/api/events/{event['id']}", headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        with app.app_context():
+            google_calendar_outbox_service.process_due()
+        self.assertEqual(self.google.calls[-1], ('delete', f"g-{event['id']}"))
+
+    def test_changes_are_sent_in_batches_and_failures_retried_alone(self):
+        events = [self.create_event(title) for title in ('One', 'Two', 'Three')]
+        self.google.fail = {'Two'}
+        with app.app_context():
+            self.assertEqual(google_calendar_outbox_service.process_due(), 3)
+            self.assertEqual(self.google.batches, [[('create', 'One'), ('create', 'Two'), ('create', 'Three')]])
+            self.assertEqual([Event.query.get(event['id']).google_event_id for event in events],
+                             [f"g-{events[0]['id']}", None, f"g-{events[2]['id']}"])
+
+            self.google.fail = set()
+            google_calendar_outbox_service.process_due(datetime.utcnow() + timedelta(hours=1))
+            self.assertEqual(self.google.batches[-1], [('create', 'Two')])
+            self.assertEqual({event.google_sync_status for event in Event.query.all()}, {'synced'})
+
+if __name__ == '__main__':
+    unittest.main()
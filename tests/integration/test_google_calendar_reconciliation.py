@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Tests for two-way reconciliation of events with Google Calendar.
+"""
+
+import unittest
+import os
+import sys
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'backend'))
+
+# Set testing environment before importing app
+os.environ['TESTING'] = 'true'
+
+from api.app import app
+from dal.database import db
+from dal.models import User, Event, GoogleCalendarOutbox
+from bl.services.google_auth_service import GoogleAuthService
+from bl.services.google_calendar_sync_service import google_calendar_sync_service
+from bl.services.google_calendar_outbox_service import google_calendar_outbox_service
+from bl.services.calendar_reconciliation_service import calendar_reconciliation_service
+
+def google_event(etag, title='Standup', location='Room 1'):
+    return {'id': 'e1', 'etag': etag, 'status': 'confirmed', 'summary': title, 'location': location,
+            'start': {'dateTime': '2025-03-03T09:00:00Z'}, 'end': {'dateTime': '2025-03-03T09:30:00Z'}}
+
+class FakeCalendarService:
+    """Serves one events().list() page per sync"""
+
+    def __init__(self, items):
+        self.items = items
+
+    def events(self):
+        return self
+
+    def list(self, **params):
+        items = self.items
+
+        class Request:
+            def execute(inner_self):
+                return {'items': items, 'nextSyncToken': 'next'}
+        return Request()
+
+class TestGoogleCalendarReconciliation(unittest.TestCase):
+    """Edits on either side survive a sync; edits of the same field on both sides are flagged"""
+
+    def setUp(self):
+        self.service = GoogleAuthService()
+        self.service.enabled = True
+        self.original_push_batch = google_calendar_sync_service.push_batch
+        self.original_fetch_event = google_calendar_sync_service.fetch_event
+
+        with app.app_context():
+            db.create_all()
+            db.session.add(User(id='user-123', email='user@test.com', full_name='User', is_approved=True,
+                                google_id='g-1', google_access_token='token',
+                                google_token_expires_at=datetime.utcnow() + timedelta(hours=1)))
+            db.session.commit()
+            self.sync(google_event('"1"'))
+
+    def tearDown(self):
+        google_calendar_sync_service.push_batch = self.original_push_batch
+        google_calendar_sync_service.fetch_event = self.original_fetch_event
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def sync(self, *items):
+        self.service.calendar_service_factory = lambda access_token: nullcontext(FakeCalendarService(list(items)))
+        return self.service.sync_calendar_events(User.query.get('user-123'))
+
+    def edit_locally(self, **fields):
+        event = Event.query.filter_by(google_event_id='e1').one()
+        for name, value in fields.items():
+            setattr(event, name, value)
+        google_calendar_outbox_service.enqueue(event, User.query.get('user-123'), 'update')
+        db.session.commit()
+        return event
+
+    def test_changes_on_both_sides_are_merged_or_flagged(self):
+        with app.app_context():
+            self.edit_locally(title='Standup (moved)')
+
+            # Same etag: skipped, the local edit is not overwritten
+            self.assertEqual(self.sync(google_event('"1"')), 0)
+            self.assertEqual(Event.query.one().title, 'Standup (moved)')
+
+            # Google changed another field: both changes are kept and the title is pushed
+            self.sync(google_event('"2"', location='Room 2'))
+            event = Event.query.one()
+            self.assertEqual((event.title, event.location, event.google_etag), ('Standup (moved)', 'Room 2', '"2"'))
+            self.assertEqual(GoogleCalendarOutbox.query.one().status, 'pending')
+
+            # Google changed the title too: a conflict, and the pending push is held
+            self.sync(google_event('"3"', title='Daily sync', location='Room 2'))
+            event = Event.query.one()
+            self.assertEqual((event.title, event.google_sync_status), ('Standup (moved)', 'conflict'))
+            self.assertIn('title', event.google_sync_error)
+            self.assertEqual(GoogleCalendarOutbox.query.one().status, 'conflict')
+
+    def test_update_rejected_by_google_is_merged_and_pushed_again(self):
+        pushes = []
+
+        def push_batch(user, operations):
+            results = {}
+            for key, operation, event in operations:
+                pushes.append((event.google_etag, event.title, event.location))
+                stale = event.google_etag == '"1"'
+                results[key] = {'ok': not stale, 'google_event_id': None, 'etag': None if stale else '"3"',
+                                'error': 'Precondition Failed' if stale else None, 'not_found': False,
+                                'precondition_failed': stale}
+            return results
+
+        def fetch_event(user, google_event_id):
+            # Someone moved the meeting in Google after the last sync
+            event_data = GoogleAuthService._process_calendar_event(google_event('"2"', location='Room 2'))
+            return (event_data, *GoogleAuthService._parse_event_times(event_data))
+
+        google_calendar_sync_service.push_batch = push_batch
+        google_calendar_sync_service.fetch_event = fetch_event
+
+        with app.app_context():
+            self.edit_locally(title='Standup (moved)')
+            google_calendar_outbox_service.process_due()
+            google_calendar_outbox_service.process_due()
+
+            self.assertEqual(pushes, [('"1"', 'Standup (moved)', 'Room 1'), ('"2"', 'Standup (moved)', 'Room 2')])
+            event = Event.query.one()
+            self.assertEqual((event.google_sync_status, event.google_etag), ('synced', '"3"'))
+            self.assertEqual(event.google_sync_base, calendar_reconciliation_service.local_fields(event))
+
+if __name__ == '__main__':
+    unittest.main()
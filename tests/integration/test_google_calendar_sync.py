@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Tests for incremental Google Calendar sync, against a fake Calendar API.
+"""
+
+import unittest
+from contextlib import nullcontext
+import os
+import sys
+from datetime import datetime, timedelta
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'backend'))
+
+# Set testing environment before importing app
+os.environ['TESTING'] = 'true'
+
+from googleapiclient.errors import HttpError
+from sqlalchemy import event as sa_event
+from api.app import app
+from dal.database import db
+from dal.models import User, Event, EventParticipant
+from bl.services.google_auth_service import GoogleAuthService
+
+def google_event(event_id, title, start, attendees=(), status='confirmed'):
+    if status == 'cancelled':
+        return {'id': event_id, 'status': 'cancelled'}
+    return {
+        'id': event_id,
+        'status': status,
+        'summary': title,
+        'start': {'dateTime': start},
+        'end': {'dateTime': start.replace('T09', 'T10')},
+        'attendees': [{'email': email, 'responseStatus': 'accepted'} for email in attendees]
+    }
+
+class FakeResponse(dict):
+    def __init__(self, status):
+        super().__init__(status=str(status))
+        self.status = status
+        self.reason = 'error'
+
+class FakeCalendarService:
+    """Serves events().list() pages from a script and records the requests"""
+
+    def __init__(self, pages):
+        self.pages = list(pages)
+        self.requests = []
+
+    def events(self):
+        return self
+
+    def list(self, **params):
+        self.requests.append(params)
+        page = self.pages.pop(0)
+
+        class Request:
+            def execute(inner_self):
+                if isinstance(page, Exception):
+                    raise page
+                return page
+        return Request()
+
+class TestGoogleCalendarSync(unittest.TestCase):
+    """sync_calendar_events pages through a full sync once, then applies deltas"""
+
+    def setUp(self):
+        self.service = GoogleAuthService()
+        self.service.enabled = True
+
+        with app.app_context():
+            db.create_all()
+            db.session.add(User(id='user-123', email='user@test.com', full_name='User', is_approved=True,
+                                google_id='g-1', google_access_token='token',
+                                google_token_expires_at=datetime.utcnow() + timedelta(hours=1)))
+            db.session.commit()
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def sync(self, pages):
+        service = FakeCalendarService(pages)
+        self.service.calendar_service_factory = lambda access_token: nullcontext(service)
+        count = self.service.sync_calendar_events(User.query.get('user-123'))
+        return count, service.requests
+
+    def test_full_then_incremental_sync(self):
+        with app.app_context():
+            count, requests = self.sync([
+                {'items': [google_event('e1', 'Kickoff', '2025-03-03T09:00:00Z', ['ada@test.com'])],
+                 'nextPageToken': 'p2'},
+                {'items': [google_event('e2', 'Review', '2025-03-04T09:00:00+02:00')], 'nextSyncToken': 'sync-1'},
+            ])
+            self.assertEqual(count, 2)
+            self.assertIn('timeMin', requests[0])
+            self.assertEqual(requests[1]['pageToken'], 'p2')
+            review = Event.query.filter_by(google_event_id='e2').one()
+            self.assertEqual(review.start_datetime, datetime(2025, 3, 4, 7))
+            self.assertEqual([p.email for p in EventParticipant.query.all()], ['ada@test.com'])
+            self.assertEqual(User.query.get('user-123').google_calendar_sync_token, 'sync-1')
+
+            count, requests = self.sync([{
+                'items': [google_event('e1', 'Kickoff (moved)', '2025-03-05T09:00:00Z'),
+                          google_event('e2', None, None, status='cancelled')],
+                'nextSyncToken': 'sync-2'
+            }])
+            self.assertEqual(count, 1)
+            self.assertEqual(requests[0]['syncToken'], 'sync-1')
+            self.assertNotIn('timeMin', requests[0])
+            kickoff = Event.query.filter_by(google_event_id='e1').one()
+            self.assertEqual((kickoff.title, kickoff.start_datetime), ('Kickoff (moved)', datetime(2025, 3, 5, 9)))
+            self.assertEqual(EventParticipant.query.count(), 0)
+            self.assertFalse(Event.query.filter_by(google_event_id='e2').one().is_active)
+            self.assertEqual(Event.query.count(), 2)
+
+    def test_gone_sync_token_falls_back_to_full_sync(self):
+        with app.app_context():
+            user = User.query.get('user-123')
+            user.google_calendar_sync_token = 'stale'
+            db.session.add(Event(title='Kickoff', start_datetime=datetime(2025, 3, 3, 9),
+                                 end_datetime=datetime(2025, 3, 3, 10), owner_id='user-123', user_id='user-123'))
+            db.session.commit()
+
+            count, requests = self.sync([
+                HttpError(FakeResponse(410), b'{"error": {"code": 410, "message": "Gone"}}'),
+                {'items': [google_event('e1', 'Kickoff', '2025-03-03T09:00:00Z')], 'nextSyncToken': 'fresh'},
+            ])
+            self.assertEqual(requests[0]['syncToken'], 'stale')
+            self.assertNotIn('syncToken', requests[1])
+            # The local event is linked rather than imported twice
+            self.assertEqual(count, 0)
+            self.assertEqual(Event.query.one().google_event_id, 'e1')
+            self.assertEqual(User.query.get('user-123').google_calendar_sync_token, 'fresh')
+
+    def test_full_resync_drops_events_deleted_in_google(self):
+        soon = (datetime.utcnow() + timedelta(days=7)).replace(hour=9, minute=0, second=0, microsecond=0)
+        with app.app_context():
+            user = User.query.get('user-123')
+            user.google_calendar_sync_token = 'stale'
+            for google_id, start in (('kept', soon), ('deleted', soon), ('past', datetime(2025, 3, 3, 9))):
+                db.session.add(Event(title=google_id, start_datetime=start, end_datetime=start + timedelta(hours=1),
+                                     google_event_id=google_id, owner_id='user-123', user_id='user-123'))
+            db.session.commit()
+
+            start = soon.isoformat() + 'Z'
+            items = [google_event('kept', 'kept', start, ['ada@test.com'])]
+            items += [google_event(f'n{i}', f'New {i}', start, ['ada@test.com', f'guest{i}@test.com']) for i in range(20)]
+            statements = []
+            listener = lambda conn, cursor, statement, *args: statements.append(statement)
+            sa_event.listen(db.engine, 'before_cursor_execute', listener)
+            try:
+                self.sync([HttpError(FakeResponse(410), b'{"error": {"code": 410, "message": "Gone"}}'),
+                           {'items': items, 'nextSyncToken': 'fresh'}])
+            finally:
+                sa_event.remove(db.engine, 'before_cursor_execute', listener)
+
+            active = {event.google_event_id: event.is_active for event in Event.query.all()}
+            self.assertFalse(active['deleted'])
+            # Outside the window the full listing covers, so Google's silence says nothing
+            self.assertTrue(active['past'])
+            self.assertTrue(active['kept'])
+            self.assertEqual(EventParticipant.query.count(), 41)
+            # Invitations of the whole batch are read once, not once per event
+            self.assertEqual(len([sql for sql in statements
+                                  if sql.lstrip().upper().startswith('SELECT') and 'FROM event_participants' in sql]), 1)
+
+    def test_preview_matches_duplicates_in_constant_queries(self):
+        with app.app_context():
+            db.session.add(Event(title='Linked', start_datetime=datetime(2025, 3, 1, 9), google_event_id='e1',
+                                 end_datetime=datetime(2025, 3, 1, 10), owner_id='user-123', user_id='user-123'))
+            db.session.add(Event(title='Local', start_datetime=datetime(2025, 3, 2, 7),
+                                 end_datetime=datetime(2025, 3, 2, 8), owner_id='user-123', user_id='user-123'))
+            db.session.commit()
+
+            items = [google_event('e1', 'Linked (renamed)', '2025-03-01T09:00:00Z'),
+                     google_event('e2', 'Local', '2025-03-02T09:00:00+02:00')]
+            items += [google_event(f'n{i}', f'New {i}', '2025-03-03T09:00:00Z') for i in range(50)]
+            service = FakeCalendarService([{'items': items}])
+            self.service.calendar_service_factory = lambda access_token: nullcontext(service)
+
+            statements = []
+            listener = lambda conn, cursor, statement, *args: statements.append(statement)
+            sa_event.listen(db.engine, 'before_cursor_execute', listener)
+            try:
+                preview = self.service.get_calendar_events_preview(User.query.get('user-123'))
+            finally:
+                sa_event.remove(db.engine, 'before_cursor_execute', listener)
+
+            self.assertEqual(len(preview), 52)
+            self.assertEqual([item['is_duplicate'] for item in preview[:3]], [True, True, False])
+            self.assertEqual(preview[0]['google_event_id'], 'e1')
+            self.assertEqual(len(statements), 3)  # the user, Google-id keys, (title, start) keys
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Tests for the pooled Google API clients.
+"""
+
+import unittest
+import os
+import sys
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'backend'))
+
+# Set testing environment before importing app
+os.environ['TESTING'] = 'true'
+
+from bl.services.google_client_pool import GoogleClientPool
+
+class TestGoogleClientPool(unittest.TestCase):
+    """Clients are built from cached discovery documents and reused per token"""
+
+    def setUp(self):
+        self.pool = GoogleClientPool()
+        self.pool.max_idle_clients = 2
+
+    def test_clients_are_reused_per_token(self):
+        with self.pool.client('token-a', 'calendar', 'v3') as first:
+            pass
+        with self.pool.client('token-a', 'calendar', 'v3') as second:
+            # Checked out clients are never shared
+            with self.pool.client('token-a', 'calendar', 'v3') as concurrent:
+                self.assertIsNot(concurrent, second)
+        self.assertIs(first, second)
+
+        stats = self.pool.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['in_use']), (1, 2, 0))
+        self.assertEqual(stats['discovery_documents'], 1)
+
+    def test_least_recently_used_clients_are_evicted(self):
+        for token in ('token-a', 'token-b', 'token-c'):
+            with self.pool.client(token, 'calendar', 'v3'):
+                pass
+        with self.pool.client('token-a', 'calendar', 'v3'):
+            pass
+
+        stats = self.pool.stats()
+        self.assertEqual((stats['idle'], stats['evictions'], stats['hits']), (2, 2, 0))
+
+        self.pool.discard_token('token-a')
+        self.assertEqual(self.pool.stats()['idle'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Tests for incremental Google Contacts sync, against a fake People API.
+"""
+
+import unittest
+from contextlib import nullcontext
+import os
+import sys
+from datetime import datetime, timedelta
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'backend'))
+
+# Set testing environment before importing app
+os.environ['TESTING'] = 'true'
+
+from googleapiclient.errors import HttpError
+from api.app import app
+from dal.database import db
+from dal.models import User, Person
+from bl.services.google_auth_service import GoogleAuthService
+from api.routes import google_auth as google_auth_routes
+from flask_jwt_extended import create_access_token
+
+def person(resource_id, name, email, deleted=False):
+    contact = {'resourceName': f'people/{resource_id}'}
+    if deleted:
+        contact['metadata'] = {'deleted': True}
+        return contact
+    contact['names'] = [{'displayName': name}]
+    contact['emailAddresses'] = [{'value': email}]
+    return contact
+
+class FakeResponse(dict):
+    def __init__(self, status):
+        super().__init__(status=str(status))
+        self.status = status
+        self.reason = 'error'
+
+class FakePeopleService:
+    """Serves connections().list() pages from a script and records the requests"""
+
+    def __init__(self, pages, details=None):
+        self.pages = list(pages)
+        self.requests = []
+        self.details = details or {}  # resource id -> detail fields served by getBatchGet
+        self.batch_requests = []
+
+    def getBatchGet(self, resourceNames, personFields):
+        self.batch_requests.append((resourceNames, personFields))
+        responses = [{'person': {'resourceName': name, **self.details[name.replace('people/', '')]}}
+                     for name in resourceNames if name.replace('people/', '') in self.details]
+
+        class Request:
+            def execute(inner_self):
+                return {'responses': responses}
+        return Request()
+
+    def people(self):
+        return self
+
+    def connections(self):
+        return self
+
+    def list(self, **params):
+        self.requests.append(params)
+        page = self.pages.pop(0)
+
+        class Request:
+            def execute(inner_self):
+                if isinstance(page, Exception):
+                    raise page
+                return page
+        return Request()
+
+class TestGoogleContactsSync(unittest.TestCase):
+    """sync_contacts does a full sync once, then applies only changes"""
+
+    def setUp(self):
+        self.service = GoogleAuthService()
+        self.service.enabled = True
+
+        with app.app_context():
+            db.create_all()
+            db.session.add(User(id='user-123', email='user@test.com', full_name='User', is_approved=True,
+                                google_id='g-1', google_access_token='token',
+                                google_token_expires_at=datetime.utcnow() + timedelta(hours=1)))
+            db.session.commit()
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def sync(self, pages):
+        service = FakePeopleService(pages)
+        self.service.people_service_factory = lambda access_token: nullcontext(service)
+        count = self.service.sync_contacts(User.query.get('user-123'))
+        return count, service.requests
+
+    def test_full_then_incremental_sync(self):
+        with app.app_context():
+            count, requests = self.sync([
+                {'connections': [person('c1', 'Ada Lovelace', 'ada@test.com')], 'nextPageToken': 'p2'},
+                {'connections': [person('c2', 'Alan Turing', 'alan@test.com')], 'nextSyncToken': 'sync-1'},
+            ])
+            self.assertEqual(count, 2)
+            self.assertTrue(all(request['requestSyncToken'] for request in requests))
+            self.assertNotIn('syncToken', requests[0])
+            self.assertEqual(requests[1]['pageToken'], 'p2')
+            self.assertEqual(User.query.get('user-123').google_contacts_sync_token, 'sync-1')
+
+            count, requests = self.sync([{
+                'connections': [person('c1', 'Ada King', 'ada@test.com'), person('c2', None, None, deleted=True)],
+                'nextSyncToken': 'sync-2'
+            }])
+            self.assertEqual(count, 1)
+            self.assertEqual(requests[0]['syncToken'], 'sync-1')
+            people = Person.query.filter_by(owner_id='user-123').all()
+            self.assertEqual([(p.google_contact_id, p.first_name, p.last_name) for p in people],
+                             [('c1', 'Ada', 'King')])
+            self.assertEqual(User.query.get('user-123').google_contacts_sync_token, 'sync-2')
+
+    def test_expired_sync_token_falls_back_to_full_sync(self):
+        with app.app_context():
+            user = User.query.get('user-123')
+            user.google_contacts_sync_token = 'stale'
+            db.session.add(Person(first_name='Ada', email='ada@test.com', owner_id='user-123', source='manual'))
+            # Deleted in Google while the token was stale; only the full listing shows it is gone
+            db.session.add(Person(first_name='Alan', email='alan@test.com', owner_id='user-123',
+                                  source='google_contacts', google_contact_id='c2'))
+            db.session.commit()
+
+            expired = HttpError(FakeResponse(400), b'{"error": {"status": "FAILED_PRECONDITION", '
+                                                   b'"details": [{"reason": "EXPIRED_SYNC_TOKEN"}]}}')
+            count, requests = self.sync([
+                expired,
+                {'connections': [person('c1', 'Ada Lovelace', 'ada@test.com')], 'nextSyncToken': 'fresh'},
+            ])
+            self.assertEqual(requests[0]['syncToken'], 'stale')
+            self.assertNotIn('syncToken', requests[1])
+            # The manually added person is linked, not duplicated or overwritten
+            self.assertEqual(count, 0)
+            ada = Person.query.filter_by(email='ada@test.com').one()
+            self.assertEqual((ada.google_contact_id, ada.source), ('c1', 'manual'))
+            self.assertIsNone(Person.query.filter_by(email='alan@test.com').first())
+            self.assertEqual(User.query.get('user-123').google_contacts_sync_token, 'fresh')
+
+    def test_preview_matches_existing_people_in_memory(self):
+        with app.app_context():
+            db.session.add(Person(first_name='Ada', email='ada@test.com', owner_id='user-123'))
+            db.session.add(Person(first_name='Alan', email='old@test.com', google_contact_id='c2', owner_id='user-123'))
+            db.session.commit()
+
+            service = FakePeopleService([{'connections': [
+                person('c1', 'Ada Lovelace', 'ada@test.com'),
+                person('c2', 'Alan Turing', 'alan@test.com'),
+                person('c3', 'Grace Hopper', 'grace@test.com'),
+            ]}])
+            self.service.people_service_factory = lambda access_token: nullcontext(service)
+            preview = self.service.get_contacts_preview(User.query.get('user-123'))
+            self.assertEqual([(item['google_id'], item['is_duplicate']) for item in preview],
+                             [('c1', True), ('c2', True), ('c3', False)])
+
+    def test_sync_selected_applies_preview_snapshot(self):
+        app.config['JWT_SECRET_KEY'] = 'test-secret-key'
+        client = app.test_client()
+        route_service = google_auth_routes.google_auth_service
+        google_auth_routes.google_auth_service = self.service
+        try:
+            with app.app_context():
+                headers = {'Authorization': f"Bearer {create_access_token(identity='user-123')}"}
+            service = FakePeopleService([{'connections': [
+                person('c1', 'Ada Lovelace', 'ada@test.com'),
+                person('c2', 'Alan Turing', 'alan@test.com'),
+            ]}], details={'c2': {
+                'birthdays': [{'date': {'month': 6, 'day': 23}}, {'date': {'year': 1912, 'month': 6, 'day': 23}}],
+                'addresses': [{'formattedValue': 'Wilmslow, Cheshire'}],
+                'urls': [{'value': 'https://www.linkedin.com/in/alan'}, {'value': 'https://turing.org.uk'}]
+            }})
+            self.service.people_service_factory = lambda access_token: nullcontext(service)
+
+            response = client.post('/api/auth/google/preview-contacts', headers=headers)
+            self.assertEqual(response.status_code, 200)
+            preview_id = response.get_json()['preview_id']
+
+            # A second download would pop from an empty script and fail the request
+            response = client.post('/api/auth/google/sync-selected-contacts', headers=headers,
+                                   json={'preview_id': preview_id, 'selected_indices': [1]})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.get_json()['contacts_synced'], 1)
+            self.assertEqual(len(service.requests), 1)
+            # The listing asked for the basic fields only; details were fetched for the imported contact alone
+            self.assertNotIn('birthdays', service.requests[0]['personFields'])
+            self.assertEqual(service.batch_requests, [(['people/c2'], 'birthdays,addresses,urls')])
+            with app.app_context():
+                imported = Person.query.one()
+                self.assertEqual(imported.google_contact_id, 'c2')
+                self.assertEqual((imported.birthday.isoformat(), imported.address, imported.linkedin_url, imported.website_url),
+                                 ('1912-06-23', 'Wilmslow, Cheshire', 'https://www.linkedin.com/in/alan', 'https://turing.org.uk'))
+        finally:
+            google_auth_routes.google_auth_service = route_service
+
+if __name__ == '__main__':
+    unittest.main()
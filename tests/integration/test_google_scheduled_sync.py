@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Tests for scheduled Google syncs, run against a local fake Google server.
+"""
+
+import unittest
+import json
+import os
+import sys
+import threading
+from datetime import datetime, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'backend'))
+
+# Set testing environment before importing app
+os.environ['TESTING'] = 'true'
+
+from api.app import app
+from dal.database import db
+from dal.models import User, Person, Event, GoogleSyncJob, BackgroundLease
+from bl.services.google_auth_service import GoogleAuthService
+from bl.services.google_client_pool import google_client_pool
+from bl.services.google_rate_limiter import google_rate_limiter, TokenBucket, GoogleRateLimiter, RateLimitedHttp
+from googleapiclient.http import BatchHttpRequest, HttpRequest
+from bl.services.google_sync_job_service import google_sync_job_service
+
+class FakeGoogleHandler(BaseHTTPRequestHandler):
+    """People connections and Calendar events; the throttled user's calendar answers 429, the revoked user gets 403s"""
+
+    requests = []
+
+    def do_GET(self):
+        token = self.headers.get('Authorization', '').replace('Bearer ', '')
+        FakeGoogleHandler.requests.append((token, self.path.split('?')[0]))
+        if token == 'revoked-token':
+            status, body = 403, {'error': {'code': 403, 'message': 'Access Not Configured'}}
+        elif self.path.startswith('/people/v1/people/me/connections'):
+            status, body = 200, {
+                'connections': [{'resourceName': f'people/c-{token}', 'names': [{'givenName': 'Ada', 'familyName': 'Lovelace'}],
+                                 'emailAddresses': [{'value': f'ada-{token}@example.com'}]}],
+                'nextSyncToken': 'people-sync'
+            }
+        elif self.path.startswith('/people/v1/people:batchGet'):
+            status, body = 200, {'responses': []}
+        elif self.path.startswith('/calendar/v3/calendars/primary/events') and token == 'throttled-token':
+            status, body = 429, {'error': {'code': 429, 'message': 'Rate Limit Exceeded'}}
+        elif self.path.startswith('/calendar/v3/calendars/primary/events'):
+            status, body = 200, {
+                'items': [{'id': f'ev-{token}', 'status': 'confirmed', 'summary': 'Standup',
+                           'start': {'dateTime': '2025-03-03T09:00:00Z'}, 'end': {'dateTime': '2025-03-03T10:00:00Z'}}],
+                'nextSyncToken': 'calendar-sync'
+            }
+        else:
+            status, body = 404, {'error': {'code': 404, 'message': 'Not Found'}}
+
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+class TestGoogleScheduledSync(unittest.TestCase):
+    """Connected users are synced on a schedule through the shared rate limiter"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeGoogleHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        FakeGoogleHandler.requests = []
+        base_url = f'http://127.0.0.1:{self.server.server_port}'
+        self.original_endpoints = dict(google_client_pool.api_endpoints)
+        google_client_pool.api_endpoints.update({'people': f'{base_url}/people/', 'calendar': f'{base_url}/calendar/v3/'})
+        service = GoogleAuthService()
+        service.enabled = True
+        google_sync_job_service.google_auth_service = service
+        self.max_workers = google_sync_job_service.max_workers
+
+        with app.app_context():
+            db.create_all()
+            for user_id, token in (('user-a', 'ok-token'), ('user-b', 'throttled-token')):
+                db.session.add(User(id=user_id, email=f'{user_id}@test.com', full_name=user_id, is_approved=True,
+                                    google_id=f'g-{user_id}', google_access_token=token, google_refresh_token='refresh',
+                                    google_token_expires_at=datetime.utcnow() + timedelta(hours=1)))
+            # Not connected to Google: never scheduled
+            db.session.add(User(id='user-c', email='user-c@test.com', full_name='user-c', is_approved=True))
+            db.session.commit()
+
+    def tearDown(self):
+        google_client_pool.api_endpoints = self.original_endpoints
+        for token in ('ok-token', 'throttled-token'):
+            google_client_pool.discard_token(token)
+        google_sync_job_service.google_auth_service = None
+        google_sync_job_service.max_workers = self.max_workers
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_connected_users_are_synced_and_throttled_users_back_off(self):
+        requests_before = google_rate_limiter.stats()
+        with app.app_context():
+            job_ids = google_sync_job_service.enqueue_due_users()
+            self.assertEqual([GoogleSyncJob.query.get(job_id).user_id for job_id in job_ids], ['user-a', 'user-b'])
+            for job_id in job_ids:
+                google_sync_job_service.run_job(job_id)
+
+            ok_job, throttled_job = [GoogleSyncJob.query.get(job_id) for job_id in job_ids]
+            self.assertEqual(ok_job.status, 'done')
+            self.assertEqual(Event.query.filter_by(owner_id='user-a', google_event_id='ev-ok-token').count(), 1)
+            self.assertEqual(Person.query.filter_by(owner_id='user-a').count(), 1)
+            self.assertEqual(User.query.get('user-a').google_calendar_sync_token, 'calendar-sync')
+
+            self.assertEqual(throttled_job.status, 'failed')
+            self.assertEqual(throttled_job.progress['contacts']['status'], 'done')
+            self.assertEqual(throttled_job.progress['calendar']['status'], 'failed')
+            self.assertTrue(google_sync_job_service.is_backing_off(User.query.get('user-b')))
+
+            # user-a is up to date and user-b is backing off
+            self.assertEqual(google_sync_job_service.enqueue_due_users(), [])
+
+            # Once the backoff has passed and the interval is over, both are due again
+            later = datetime.utcnow() + timedelta(days=1)
+            self.assertEqual(len(google_sync_job_service.enqueue_due_users(later)), 2)
+
+        # Every Google request went through the limiter
+        requests_after = google_rate_limiter.stats()
+        for api in ('people', 'calendar'):
+            self.assertEqual(requests_after[api]['requests'] - requests_before[api]['requests'],
+                             len([path for _, path in FakeGoogleHandler.requests if path.startswith(f'/{api}/')]))
+
+    def test_users_failing_for_good_do_not_starve_the_others(self):
+        google_sync_job_service.max_workers = 1  # Two scheduled jobs at a time
+        with app.app_context():
+            for user in User.query.filter(User.id.in_(['user-a', 'user-b'])):
+                user.google_contacts_synced_at = user.google_calendar_synced_at = datetime.utcnow() - timedelta(hours=2)
+            # Never synced, so they come first
+            for user_id in ('user-d', 'user-e'):
+                db.session.add(User(id=user_id, email=f'{user_id}@test.com', full_name=user_id, is_approved=True,
+                                    google_id=f'g-{user_id}', google_access_token='revoked-token',
+                                    google_refresh_token='refresh',
+                                    google_token_expires_at=datetime.utcnow() + timedelta(hours=1)))
+            db.session.commit()
+
+            job_ids = google_sync_job_service.schedule_once()
+            self.assertEqual([GoogleSyncJob.query.get(job_id).user_id for job_id in job_ids], ['user-d', 'user-e'])
+            for job_id in job_ids:
+                self.assertEqual(google_sync_job_service.run_job(job_id).status, 'failed')
+            self.assertEqual(User.query.get('user-d').google_sync_failures, 1)
+
+            # The failing users wait an hour; the others get their turn
+            job_ids = google_sync_job_service.schedule_once()
+            self.assertEqual([GoogleSyncJob.query.get(job_id).user_id for job_id in job_ids], ['user-a', 'user-b'])
+
+            # Only one process schedules
+            self.assertFalse(BackgroundLease.acquire('google-sync-scheduler', 'other-host:1', 60))
+            self.assertIsNotNone(google_sync_job_service.schedule_once())
+
+    def test_token_bucket_spaces_requests_beyond_the_burst(self):
+        bucket = TokenBucket(rate=10, capacity=2)
+        waits = [bucket.reserve() for _ in range(4)]
+        self.assertEqual(waits[:2], [0.0, 0.0])
+        self.assertAlmostEqual(waits[2], 0.1, places=2)
+        self.assertAlmostEqual(waits[3], 0.2, places=2)
+        # A caller that cannot get a slot in time does not take one
+        self.assertIsNone(bucket.reserve(timeout=0.05))
+
+    def test_batch_requests_take_a_slot_per_call(self):
+        class RecordingHttp:
+            def __init__(self):
+                self.requests = 0
+
+            def request(self, uri, method='GET', body=None, headers=None, **kwargs):
+                self.requests += 1
+                return type('Response', (dict,), {'status': 200})(), b'{}'
+
+        http = RecordingHttp()
+        limiter = GoogleRateLimiter()
+        limited = RateLimitedHttp(http, limiter, 'calendar')
+        batch = BatchHttpRequest(batch_uri='https://www.googleapis.com/batch/calendar/v3')
+        for index in range(5):
+            batch.add(HttpRequest(http, lambda resp, content: content,
+                                  f'https://www.googleapis.com/calendar/v3/calendars/primary/events/e{index}',
+                                  method='DELETE'), request_id=str(index))
+        try:
+            batch.execute(http=limited)
+        except Exception:
+            pass  # The recording http does not answer in multipart; only the charge matters here
+
+        limited.request('https://www.googleapis.com/calendar/v3/calendars/primary/events')
+        self.assertEqual(http.requests, 2)
+        self.assertEqual(limiter.stats()['calendar']['requests'], 6)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Tests for background Google sync jobs.
+"""
+
+import unittest
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'backend'))
+
+# Set testing environment before importing app
+os.environ['TESTING'] = 'true'
+
+from api.app import app
+from api.routes import google_auth as google_auth_routes
+from dal.database import db
+from dal.models import User, GoogleSyncJob
+from bl.services.google_sync_job_service import google_sync_job_service
+from flask_jwt_extended import create_access_token
+
+class FakeGoogleAuthService:
+    """Stands in for the OAuth exchange and the sync calls"""
+
+    def __init__(self):
+        self.synced = []
+
+    def exchange_code_for_tokens(self, code, state):
+        return {'access_token': 'token', 'refresh_token': 'refresh'}
+
+    def get_user_info(self, access_token):
+        return {'email': 'user@test.com', 'google_id': 'g-1'}
+
+    def create_or_update_user(self, user_info, tokens):
+        return User.query.get('user-123')
+
+    def sync_contacts(self, user):
+        self.synced.append('contacts')
+        return 3
+
+    def sync_calendar_events(self, user):
+        self.synced.append('calendar')
+        raise ValueError("Calendar API unavailable")
+
+class TestGoogleSyncJobs(unittest.TestCase):
+    """The OAuth callback queues the initial sync and returns at once"""
+
+    def setUp(self):
+        app.config['JWT_SECRET_KEY'] = 'test-secret-key'
+        self.client = app.test_client()
+        self.google = FakeGoogleAuthService()
+        self.route_service = google_auth_routes.google_auth_service
+        google_auth_routes.google_auth_service = self.google
+        google_sync_job_service.google_auth_service = self.google
+
+        with app.app_context():
+            db.create_all()
+            db.session.add(User(id='user-123', email='user@test.com', full_name='User', is_approved=True,
+                                google_id='g-1', google_access_token='token',
+                                google_token_expires_at=datetime.utcnow() + timedelta(hours=1)))
+            db.session.commit()
+            self.headers = {'Authorization': f"Bearer {create_access_token(identity='user-123')}"}
+
+    def tearDown(self):
+        google_auth_routes.google_auth_service = self.route_service
+        google_sync_job_service.google_auth_service = None
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def sync_status(self):
+        response = self.client.get('/api/auth/google/sync-status', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.data)['job']
+
+    def test_callback_queues_sync_and_status_reports_progress(self):
+        response = self.client.get('/api/auth/google/callback?code=abc&state=xyz')
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.google.synced, [])
+
+        job = self.sync_status()
+        self.assertIn(f"sync_job={job['id']}", response.headers['Location'])
+        self.assertEqual(job['status'], 'queued')
+        self.assertEqual(job['progress']['contacts']['status'], 'pending')
+
+        # Logging in again while the job is queued does not queue another
+        self.client.get('/api/auth/google/callback?code=abc&state=xyz')
+        with app.app_context():
+            self.assertEqual(GoogleSyncJob.query.count(), 1)
+            google_sync_job_service.run_job(job['id'])
+
+        job = self.sync_status()
+        self.assertEqual(job['status'], 'failed')
+        self.assertEqual(job['progress']['contacts'], {'status': 'done', 'synced': 3, 'error': None})
+        self.assertEqual(job['progress']['calendar']['status'], 'failed')
+        self.assertIn('Calendar API unavailable', job['progress']['calendar']['error'])
+        with app.app_context():
+            user = User.query.get('user-123')
+            self.assertIsNotNone(user.google_contacts_synced_at)
+            self.assertIsNone(user.google_calendar_synced_at)
+
+    def test_job_lost_with_its_process_does_not_block_new_syncs(self):
+        with app.app_context():
+            # Left running by a worker that died an hour ago
+            db.session.add(GoogleSyncJob(user_id='user-123', status='running', progress=GoogleSyncJob.new_progress(),
+                                         created_at=datetime.utcnow() - timedelta(hours=1),
+                                         started_at=datetime.utcnow() - timedelta(hours=1)))
+            db.session.commit()
+
+            job = google_sync_job_service.enqueue(User.query.get('user-123'))
+            self.assertEqual(job.status, 'queued')
+            stale = GoogleSyncJob.query.order_by(GoogleSyncJob.id).first()
+            self.assertNotEqual(stale.id, job.id)
+            self.assertEqual(stale.status, 'failed')
+            self.assertEqual(stale.progress['contacts']['error'], 'Sync was interrupted')
+
+            # A fresh job is left alone
+            self.assertEqual(google_sync_job_service.fail_stale_jobs(), 0)
+            self.assertEqual(google_sync_job_service.fail_stale_jobs(datetime.utcnow() + timedelta(hours=1)), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared Google token manager.
+"""
+
+import unittest
+import os
+import sys
+from types import SimpleNamespace
+from datetime import datetime, timedelta
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'backend'))
+
+# Set testing environment before importing app
+os.environ['TESTING'] = 'true'
+
+from api.app import app
+from dal.database import db
+from dal.models import User, Person
+from bl.services.google_token_manager import GoogleTokenManager, GoogleTokenError
+
+class TestGoogleTokenManager(unittest.TestCase):
+    """Tokens are refreshed before expiry, once, and shared between callers"""
+
+    def setUp(self):
+        self.manager = GoogleTokenManager()
+        self.refreshes = []
+        self.manager._refresh_credentials = self.fake_refresh
+
+        with app.app_context():
+            db.create_all()
+            db.session.add(User(id='user-123', email='user@test.com', full_name='User', is_approved=True,
+                                google_id='g-1', google_access_token='old-token', google_refresh_token='refresh',
+                                google_token_expires_at=datetime.utcnow() + timedelta(minutes=2)))
+            db.session.commit()
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def fake_refresh(self, refresh_token):
+        self.refreshes.append(refresh_token)
+        return SimpleNamespace(token=f'new-token-{len(self.refreshes)}', refresh_token=None,
+                               expiry=datetime.utcnow() + timedelta(hours=1))
+
+    def test_token_close_to_expiry_is_refreshed_once(self):
+        with app.app_context():
+            user = User.query.get('user-123')
+            self.assertEqual(self.manager.get_access_token(user), 'new-token-1')
+            stored = User.query.get('user-123')
+            self.assertEqual(stored.google_access_token, 'new-token-1')
+            self.assertIsNone(stored.google_token_refresh_lease_until)
+
+        with app.app_context():
+            # A caller still holding the old row gets the cached token
+            stale = User(id='user-123', google_access_token='old-token', google_refresh_token='refresh',
+                         google_token_expires_at=datetime.utcnow() + timedelta(minutes=2))
+            self.assertEqual(self.manager.get_access_token(stale), 'new-token-1')
+        self.assertEqual(self.refreshes, ['refresh'])
+
+    def test_waits_for_a_refresh_running_in_another_worker(self):
+        with app.app_context():
+            user = User.query.get('user-123')
+            user.google_token_refresh_lease_until = datetime.utcnow() + timedelta(seconds=30)
+            db.session.commit()
+
+            def other_worker_finishes(seconds):
+                other = User.query.get('user-123')
+                other.google_access_token = 'token-from-other-worker'
+                other.google_token_expires_at = datetime.utcnow() + timedelta(hours=1)
+                other.google_token_refresh_lease_until = None
+                db.session.commit()
+            self.manager._sleep = other_worker_finishes
+
+            self.assertEqual(self.manager.get_access_token(user), 'token-from-other-worker')
+        self.assertEqual(self.refreshes, [])
+
+    def test_refresh_leaves_the_callers_transaction_alone(self):
+        with app.app_context():
+            user = User.query.get('user-123')
+            user.full_name = 'Renamed'
+            db.session.add(Person(first_name='Ada', owner_id='user-123'))
+
+            self.assertEqual(self.manager.get_access_token(user), 'new-token-1')
+            # Neither committed early nor discarded by reloading the row
+            self.assertEqual(user.full_name, 'Renamed')
+            self.assertEqual(user.google_access_token, 'new-token-1')
+            self.assertEqual(len(db.session.new), 1)
+            self.assertNotIn('google_access_token', db.inspect(user).committed_state)
+
+            db.session.rollback()
+            self.assertEqual(Person.query.count(), 0)
+            self.assertEqual(User.query.get('user-123').full_name, 'User')
+            self.assertEqual(User.query.get('user-123').google_access_token, 'new-token-1')
+
+    def test_missing_refresh_token_raises(self):
+        with app.app_context():
+            user = User.query.get('user-123')
+            user.google_refresh_token = None
+            with self.assertRaises(GoogleTokenError):
+                self.manager.get_access_token(user)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Query plan checks for the list endpoints.
+Verifies the hot list queries are served by index scans instead of sort-on-scan.
+"""
+
+import unittest
+import os
+import sys
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'backend'))
+
+# Set testing environment before importing app
+os.environ['TESTING'] = 'true'
+
+from api.app import app
+from dal.database import db
+from dal.models import User, Task, Event, ProjectParticipant
+from datetime import datetime, timedelta
+from sqlalchemy import text, event
+from bl.services.recurrence_service import recurrence_service
+
+class TestQueryPlans(unittest.TestCase):
+    """EXPLAIN QUERY PLAN checks against the SQLite test database"""
+    
+    def setUp(self):
+        self.app = app
+        with app.app_context():
+            db.create_all()
+    
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+    
+    def explain(self, query):
+        """Return the query plan lines for a SQLAlchemy query"""
+        sql = str(query.statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+        return [row[-1] for row in db.session.execute(text(f'EXPLAIN QUERY PLAN {sql}'))]
+    
+    def assert_index_scan(self, query, index_name):
+        plan = self.explain(query)
+        self.assertTrue(any(index_name in line for line in plan), plan)
+        self.assertFalse(any('TEMP B-TREE' in line for line in plan), plan)
+    
+    def task_list_query(self, *criteria):
+        """The GET /tasks query: own tasks plus tasks in projects shared with the user"""
+        return ProjectParticipant.visible_query(Task, 'user-123', 'user@test.com', *criteria).order_by(
+            Task.project.asc(), Task.priority_rank.desc(), Task.created_at.desc())
+    
+    def test_task_list_order_uses_index(self):
+        """GET /tasks for a user without shared projects is one ordered index scan"""
+        with self.app.app_context():
+            self.assert_index_scan(self.task_list_query(), 'ix_tasks_owner_project_rank')
+    
+    def test_shared_task_list_seeks_index(self):
+        """Shared projects are index seeks on (owner_id, project), not a scan with a subquery per row"""
+        with self.app.app_context():
+            db.session.add(User(id='user-123', email='user@test.com', full_name='User', is_approved=True))
+            db.session.add(User(id='owner-1', email='owner@test.com', full_name='Owner', is_approved=True))
+            for project in ('Launch', 'Hiring'):
+                db.session.add(ProjectParticipant(owner_id='owner-1', project=project, email='user@test.com'))
+                db.session.add(Task(title=project, text=project, project=project, owner_id='owner-1'))
+            db.session.add(Task(title='Private', text='Private', project='Other', owner_id='owner-1'))
+            db.session.add(Task(title='Mine', text='Mine', project='Home', owner_id='user-123'))
+            db.session.commit()
+            
+            query = self.task_list_query(Task.is_active == True)
+            plan = self.explain(query)
+            task_steps = [line for line in plan if 'tasks' in line]
+            self.assertTrue(task_steps, plan)
+            self.assertTrue(all(line.startswith('SEARCH') and 'ix_tasks_owner_project_rank' in line
+                                for line in task_steps), plan)
+            self.assertFalse(any('SUBQUERY' in line for line in plan), plan)
+            self.assertEqual([task.title for task in query.all()], ['Hiring', 'Mine', 'Launch'])
+    
+    def test_task_status_filter_uses_index(self):
+        """Active tasks filtered by status, ordered by priority rank"""
+        with self.app.app_context():
+            query = Task.query.filter(
+                Task.owner_id == 'user-123',
+                Task.is_active == True,
+                Task.status == 'todo'
+            ).order_by(Task.priority_rank.desc(), Task.created_at.desc())
+            self.assert_index_scan(query, 'ix_tasks_owner_active_status_rank')
+    
+    def test_telegram_task_list_uses_index(self):
+        """show_tasks_from_telegram ordering by due date"""
+        with self.app.app_context():
+            query = Task.query.filter(
+                Task.owner_id == 'user-123',
+                Task.is_active == True,
+                Task.status.in_(['todo', 'in_progress'])
+            ).order_by(Task.due_date.asc().nulls_last(), Task.created_at.desc()).limit(20)
+            self.assert_index_scan(query, 'ix_tasks_owner_active_due')
+    
+    def test_priority_rank_follows_priority(self):
+        """priority_rank is kept in sync so 'high' sorts above 'medium' and 'low'"""
+        with self.app.app_context():
+            db.session.add(User(id='user-123', email='user@test.com', full_name='User', is_approved=True))
+            for priority in ['medium', 'low', 'high']:
+                db.session.add(Task(title=priority, text=priority, priority=priority, owner_id='user-123'))
+            db.session.commit()
+            
+            ordered = [task.priority for task in Task.query.order_by(Task.priority_rank.desc()).all()]
+            self.assertEqual(ordered, ['high', 'medium', 'low'])
+            
+            task = Task.query.filter_by(priority='low').first()
+            task.priority = 'high'
+            self.assertEqual(task.priority_rank, 2)
+
+    def test_event_window_uses_index(self):
+        """Calendar window queries range-scan (owner_id, long_span, start_datetime)"""
+        with self.app.app_context():
+            query = Event.query.filter(
+                Event.owner_id == 'user-123',
+                Event.overlapping_clause(datetime(2025, 3, 1), datetime(2025, 4, 1))
+            )
+            plan = self.explain(query)
+            self.assertTrue(any('ix_events_owner_span_start' in line and 'start_datetime' in line for line in plan), plan)
+    
+    def test_event_window_overlap(self):
+        """Events crossing the window edges and long events are found"""
+        with self.app.app_context():
+            db.session.add(User(id='user-123', email='user@test.com', full_name='User', is_approved=True))
+            window_start, window_end = datetime(2025, 3, 1), datetime(2025, 4, 1)
+            spans = {
+                'before': (datetime(2025, 2, 27), datetime(2025, 2, 28)),
+                'crosses start': (datetime(2025, 2, 28, 22), datetime(2025, 3, 1, 2)),
+                'inside': (datetime(2025, 3, 10), datetime(2025, 3, 10, 1)),
+                'crosses end': (datetime(2025, 3, 31, 23), datetime(2025, 4, 1, 1)),
+                'after': (datetime(2025, 4, 1), datetime(2025, 4, 1, 1)),
+                'long': (datetime(2024, 1, 1), datetime(2025, 12, 31)),
+            }
+            for title, (start, end) in spans.items():
+                db.session.add(Event(title=title, start_datetime=start, end_datetime=end,
+                                     owner_id='user-123', user_id='user-123'))
+            db.session.commit()
+            
+            self.assertTrue(Event.query.filter_by(title='long').first().long_span)
+            found = Event.query.filter(
+                Event.owner_id == 'user-123',
+                Event.overlapping_clause(window_start, window_end)
+            ).order_by(Event.start_datetime).all()
+            self.assertEqual([event.title for event in found], ['long', 'crosses start', 'inside', 'crosses end'])
+
+    def count_queries(self, func):
+        """Run func and return how many SQL statements it executed"""
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            func()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        return len(statements)
+    
+    def test_event_list_query_count_is_constant(self):
+        """Serializing an event list does not lazy-load each owner"""
+        with self.app.app_context():
+            counts = []
+            for owners in (2, 20):
+                for index in range(owners):
+                    user_id = f'owner-{owners}-{index}'
+                    db.session.add(User(id=user_id, email=f'{user_id}@test.com', full_name=user_id, is_approved=True))
+                    db.session.add(Event(title='Event', start_datetime=datetime(2025, 3, 3, 9),
+                                         end_datetime=datetime(2025, 3, 3, 10), owner_id=user_id, user_id=user_id))
+                db.session.commit()
+                db.session.expunge_all()
+                
+                query = Event.query.filter(Event.owner_id.like(f'owner-{owners}-%'))
+                serialized = []
+                counts.append(self.count_queries(lambda: serialized.extend(recurrence_service.serialize(
+                    recurrence_service.events_in_window(query, datetime(2025, 3, 1), datetime(2025, 4, 1))))))
+                self.assertEqual(len(serialized), owners)
+                self.assertTrue(all(item['owner_email'] for item in serialized))
+            
+            self.assertEqual(counts[0], counts[1])
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Tests for the recurring event expansion engine.
+"""
+
+import unittest
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'backend'))
+
+# Set testing environment before importing app
+os.environ['TESTING'] = 'true'
+
+from api.app import app
+from dal.database import db
+from dal.models import User, Event
+from bl.services.recurrence_service import RecurrenceService
+from flask_jwt_extended import create_access_token
+
+def make_event(**kwargs):
+    """Build a transient event starting Monday 2025-01-06 09:00 for one hour"""
+    values = {
+        'id': 1,
+        'title': 'Standup',
+        'start_datetime': datetime(2025, 1, 6, 9, 0),
+        'end_datetime': datetime(2025, 1, 6, 10, 0),
+        'repeat_interval': 1,
+        'updated_at': datetime(2025, 1, 1),
+        'owner_id': 'user-123',
+        'user_id': 'user-123'
+    }
+    values.update(kwargs)
+    return Event(**values)
+
+class TestRecurrenceService(unittest.TestCase):
+    """Expansion rules, exceptions, overrides and caching"""
+    
+    def setUp(self):
+        self.service = RecurrenceService()
+    
+    def starts(self, event, window_start, window_end):
+        return [o.start_datetime for o in self.service.expand_events([event], window_start, window_end)]
+    
+    def test_daily_expands_only_inside_window(self):
+        event = make_event(repeat_pattern='daily')
+        starts = self.starts(event, datetime(2030, 3, 1), datetime(2030, 3, 4))
+        self.assertEqual(starts, [datetime(2030, 3, d, 9, 0) for d in (1, 2, 3)])
+    
+    def test_daily_interval_and_end_date(self):
+        event = make_event(repeat_pattern='daily', repeat_interval=2, repeat_end_date=datetime(2025, 1, 12))
+        starts = self.starts(event, datetime(2025, 1, 1), datetime(2025, 2, 1))
+        self.assertEqual(starts, [datetime(2025, 1, d, 9, 0) for d in (6, 8, 10, 12)])
+    
+    def test_weekly_on_days(self):
+        # Monday and Wednesday, every other week
+        event = make_event(repeat_pattern='weekly', repeat_interval=2, repeat_days=[0, 2])
+        starts = self.starts(event, datetime(2025, 1, 6), datetime(2025, 1, 27))
+        self.assertEqual(starts, [
+            datetime(2025, 1, 6, 9, 0), datetime(2025, 1, 8, 9, 0),
+            datetime(2025, 1, 20, 9, 0), datetime(2025, 1, 22, 9, 0)
+        ])
+    
+    def test_monthly_clamps_day(self):
+        event = make_event(repeat_pattern='monthly',
+                           start_datetime=datetime(2025, 1, 31, 9, 0), end_datetime=datetime(2025, 1, 31, 10, 0))
+        starts = self.starts(event, datetime(2025, 2, 1), datetime(2025, 4, 1))
+        self.assertEqual(starts, [datetime(2025, 2, 28, 9, 0), datetime(2025, 3, 31, 9, 0)])
+    
+    def test_occurrence_crossing_window_start_is_included(self):
+        event = make_event(repeat_pattern='daily')
+        starts = self.starts(event, datetime(2025, 1, 7, 9, 30), datetime(2025, 1, 7, 12, 0))
+        self.assertEqual(starts, [datetime(2025, 1, 7, 9, 0)])
+    
+    def test_instant_occurrence_at_window_start_is_included(self):
+        event = make_event(repeat_pattern='daily', end_datetime=datetime(2025, 1, 6, 9, 0))
+        starts = self.starts(event, datetime(2025, 1, 7, 9, 0), datetime(2025, 1, 8, 9, 0))
+        self.assertEqual(starts, [datetime(2025, 1, 7, 9, 0)])
+    
+    def test_exceptions_and_overrides(self):
+        event = make_event(
+            repeat_pattern='daily',
+            recurrence_exceptions=['2025-01-07T09:00:00'],
+            recurrence_overrides={
+                '2025-01-08T09:00:00': {'title': 'Planning', 'start_datetime': '2025-01-08T14:00:00',
+                                        'end_datetime': '2025-01-08T15:00:00'},
+                # Moved into the window from a day outside it
+                '2025-01-20T09:00:00': {'start_datetime': '2025-01-09T17:00:00'}
+            }
+        )
+        occurrences = self.service.expand_events([event], datetime(2025, 1, 7), datetime(2025, 1, 10))
+        self.assertEqual([(o.start_datetime, o.title) for o in occurrences], [
+            (datetime(2025, 1, 8, 14, 0), 'Planning'),
+            (datetime(2025, 1, 9, 9, 0), 'Standup'),
+            (datetime(2025, 1, 9, 17, 0), 'Standup'),
+        ])
+    
+    def test_cache_is_keyed_on_updated_at(self):
+        event = make_event(repeat_pattern='daily')
+        window = (datetime(2025, 1, 6), datetime(2025, 1, 9))
+        self.assertEqual(len(self.starts(event, *window)), 3)
+        
+        event.repeat_end_date = datetime(2025, 1, 6)
+        self.assertEqual(len(self.starts(event, *window)), 3)  # Stale until the event changes
+        
+        event.updated_at = datetime(2025, 1, 2)
+        self.assertEqual(len(self.starts(event, *window)), 1)
+    
+    def test_cache_is_shared_by_windows_within_the_same_days(self):
+        event = make_event(repeat_pattern='daily')
+        self.assertEqual(self.starts(event, datetime(2025, 1, 7, 9, 30), datetime(2025, 1, 9, 8)),
+                         [datetime(2025, 1, 7, 9), datetime(2025, 1, 8, 9)])
+        # A "now" a few minutes later reuses the cached days and filters them
+        self.assertEqual(self.starts(event, datetime(2025, 1, 7, 10, 5), datetime(2025, 1, 9, 10, 5)),
+                         [datetime(2025, 1, 8, 9), datetime(2025, 1, 9, 9)])
+        self.assertEqual(len(self.service._cache), 1)
+    
+    def test_non_recurring_event_is_returned_once(self):
+        event = make_event(repeat_pattern='none')
+        self.assertEqual(self.starts(event, datetime(2025, 1, 1), datetime(2025, 2, 1)), [datetime(2025, 1, 6, 9, 0)])
+
+class TestRecurringEventsAPI(unittest.TestCase):
+    """GET /events returns expanded occurrences for a window"""
+    
+    def setUp(self):
+        app.config['JWT_SECRET_KEY'] = 'test-secret-key'
+        self.app = app
+        self.client = app.test_client()
+        
+        with app.app_context():
+            db.create_all()
+            db.session.add(User(id='user-123', email='user@test.com', full_name='User', is_approved=True))
+            db.session.commit()
+            self.token = create_access_token(identity='user-123')
+    
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+    
+    def test_weekly_event_shows_up_in_upcoming_weeks(self):
+        headers = {'Authorization': f'Bearer {self.token}'}
+        first_start = (datetime.utcnow() - timedelta(weeks=4) + timedelta(hours=1)).replace(microsecond=0)
+        response = self.client.post('/api/events', data=json.dumps({
+            'title': 'Weekly sync',
+            'start_datetime': first_start.isoformat(),
+            'end_datetime': (first_start + timedelta(hours=1)).isoformat(),
+            'repeat_pattern': 'weekly',
+            'google_sync': False
+        }), content_type='application/json', headers=headers)
+        self.assertEqual(response.status_code, 201)
+        event_id = json.loads(response.data)['event']['id']
+        
+        response = self.client.get('/api/events/upcoming', headers=headers)
+        data = json.loads(response.data)
+        self.assertEqual(data['count'], 1)
+        occurrence = data['events'][0]
+        self.assertTrue(occurrence['is_recurring_instance'])
+        self.assertEqual(occurrence['start_datetime'], (first_start + timedelta(weeks=4)).isoformat())
+        
+        # Cancel that occurrence only
+        response = self.client.delete(f"/api/events/{event_id}/occurrences/{occurrence['occurrence_start']}",
+                                      headers=headers)
+        self.assertEqual(response.status_code, 200)
+        
+        response = self.client.get('/api/events/upcoming', headers=headers)
+        self.assertEqual(json.loads(response.data)['count'], 0)
+    
+    def test_occurrence_override_datetimes_are_validated(self):
+        headers = {'Authorization': f'Bearer {self.token}'}
+        response = self.client.post('/api/events', data=json.dumps({
+            'title': 'Standup',
+            'start_datetime': '2025-01-06T09:00:00',
+            'end_datetime': '2025-01-06T09:15:00',
+            'repeat_pattern': 'daily',
+            'google_sync': False
+        }), content_type='application/json', headers=headers)
+        event_id = json.loads(response.data)['event']['id']
+        url = f'/api/events/{event_id}/occurrences/2025-01-08T09:00:00'
+        
+        for body in ({'start_datetime': 'tomorrow'}, {'end_datetime': 1700000000},
+                     {'start_datetime': '2025-01-08T10:00:00', 'end_datetime': '2025-01-08T09:30:00'}):
+            response = self.client.put(url, data=json.dumps(body), content_type='application/json', headers=headers)
+            self.assertEqual(response.status_code, 400, body)
+        
+        response = self.client.put(url, data=json.dumps({'start_datetime': '2025-01-08T11:00:00+02:00'}),
+                                   content_type='application/json', headers=headers)
+        self.assertEqual(response.status_code, 200)
+        with app.app_context():
+            event = Event.query.get(event_id)
+            self.assertEqual(event.recurrence_overrides['2025-01-08T09:00:00'], {'start_datetime': '2025-01-08T09:00:00'})
+        
+        # Moving the start past the stored end is rejected once an end is overridden
+        self.client.put(url, data=json.dumps({'end_datetime': '2025-01-08T09:30:00'}),
+                        content_type='application/json', headers=headers)
+        response = self.client.put(url, data=json.dumps({'start_datetime': '2025-01-08T12:00:00'}),
+                                   content_type='application/json', headers=headers)
+        self.assertEqual(response.status_code, 400)
+        
+        response = self.client.get('/api/events?start_date=2025-01-08T00:00:00&end_date=2025-01-09T00:00:00',
+                                   headers=headers)
+        self.assertEqual(response.status_code, 200)
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
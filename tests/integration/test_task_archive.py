@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Tests for moving finished tasks to tasks_archive and back.
+"""
+
+import unittest
+import os
+import sys
+import json
+from datetime import datetime, timedelta
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'backend'))
+
+# Set testing environment before importing app
+os.environ['TESTING'] = 'true'
+
+from api.app import app
+from dal.database import db
+from dal.models import User, Task, TaskArchive, ProjectParticipant, BackgroundLease
+from bl.services.task_archive_service import task_archive_service
+from flask_jwt_extended import create_access_token
+
+class TestTaskArchive(unittest.TestCase):
+    """A restored task is the row that was archived"""
+
+    def setUp(self):
+        with app.app_context():
+            db.create_all()
+            db.session.add(User(id='user-123', email='user@test.com', full_name='User', is_approved=True))
+            db.session.commit()
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_restore_gives_back_every_column(self):
+        finished = datetime.utcnow() - timedelta(days=60)
+        with app.app_context():
+            db.session.add(Task(id='task-1', owner_id='user-123', text='Call the bank', notes='Ask about fees',
+                                label='finance', alert_time=datetime(2025, 3, 3, 9, 30), task_id='legacy-7',
+                                status='completed', priority='high', project=None,
+                                created_at=finished, updated_at=finished))
+            db.session.commit()
+            before = TaskArchive.snapshot_columns(Task.query.get('task-1'))
+
+            self.assertEqual(task_archive_service.archive_finished_tasks(), 1)
+            self.assertIsNone(Task.query.get('task-1'))
+
+            task_archive_service.restore_task('task-1', 'user-123')
+            db.session.expire_all()
+            task = Task.query.get('task-1')
+            self.assertEqual(TaskArchive.snapshot_columns(task), before)
+            self.assertEqual((task.text, task.notes, task.label, task.project, task.description),
+                             ('Call the bank', 'Ask about fees', 'finance', None, None))
+            self.assertEqual(task.alert_time, datetime(2025, 3, 3, 9, 30))
+            self.assertEqual(TaskArchive.query.count(), 0)
+
+    def test_sweep_runs_in_the_lease_holder_only(self):
+        finished = datetime.utcnow() - timedelta(days=60)
+        with app.app_context():
+            for task_id in ('task-1', 'task-2'):
+                db.session.add(Task(id=task_id, owner_id='user-123', text=task_id, status='completed',
+                                    created_at=finished, updated_at=finished))
+            db.session.add(Task(id='task-3', owner_id='user-123', text='Open', status='todo',
+                                created_at=finished, updated_at=finished))
+            db.session.commit()
+
+            self.assertEqual(task_archive_service.schedule_once(), 2)
+            self.assertEqual([task.id for task in Task.query.all()], ['task-3'])
+
+            # Another process holding the lease sweeps instead
+            BackgroundLease.query.filter_by(name='task-archive-scheduler').update(
+                {'holder': 'other-host:1', 'expires_at': datetime.utcnow() + timedelta(hours=1)})
+            db.session.commit()
+            self.assertIsNone(task_archive_service.schedule_once())
+
+    def test_archived_shared_tasks_keep_their_participants(self):
+        app.config['JWT_SECRET_KEY'] = 'test-secret-key'
+        finished = datetime.utcnow() - timedelta(days=60)
+        with app.app_context():
+            db.session.add(User(id='owner-1', email='owner@test.com', full_name='Owner', is_approved=True))
+            db.session.add(ProjectParticipant(owner_id='owner-1', project='Launch', email='user@test.com'))
+            db.session.add(Task(id='task-1', owner_id='owner-1', text='Ship it', title='Ship it', project='Launch',
+                                status='completed', created_at=finished, updated_at=finished))
+            db.session.commit()
+            task_archive_service.archive_finished_tasks()
+            token = create_access_token(identity='user-123')
+
+        response = app.test_client().get('/api/tasks?include_archived=true',
+                                         headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(response.status_code, 200)
+        [archived] = json.loads(response.data)['projects']['Launch']
+        self.assertEqual(archived['participants'], ['user@test.com'])
+
+if __name__ == '__main__':
+    unittest.main()
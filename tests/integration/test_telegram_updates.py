@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Tests for the Telegram update queue behind the webhook.
+"""
+
+import unittest
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'backend'))
+
+# Set testing environment before importing app
+os.environ['TESTING'] = 'true'
+
+from api.app import app
+from dal.database import db
+from dal.models import TelegramUpdate, BackgroundLease
+from bl.services.telegram_update_service import telegram_update_service
+
+def telegram_message(update_id, chat_id, text):
+    return {'update_id': update_id,
+            'message': {'chat': {'id': chat_id}, 'text': text, 'from': {'id': chat_id, 'first_name': 'Test'}}}
+
+class TestTelegramUpdates(unittest.TestCase):
+    """The webhook only stores updates; workers run them in order per chat"""
+
+    def setUp(self):
+        self.client = app.test_client()
+        self.handled = []
+        self.original_handler = telegram_update_service.handler
+        telegram_update_service.handler = self.handle
+        with app.app_context():
+            db.create_all()
+
+    def tearDown(self):
+        telegram_update_service.handler = self.original_handler
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def handle(self, payload):
+        message = payload['message']
+        if message['text'] == 'boom':
+            raise RuntimeError('OpenAI is down')
+        self.handled.append((message['chat']['id'], message['text']))
+
+    def post(self, payload):
+        return self.client.post('/api/telegram/webhook', data=json.dumps(payload), content_type='application/json')
+
+    def test_updates_are_acknowledged_then_processed_in_order_per_chat(self):
+        for payload in (telegram_message(1, 100, 'first'), telegram_message(2, 200, 'boom'),
+                        telegram_message(3, 100, 'second'), telegram_message(4, 200, 'after failure')):
+            response = self.post(payload)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(json.loads(response.data), {'status': 'ok'})
+        self.assertEqual(self.handled, [])
+
+        with app.app_context():
+            self.assertEqual(telegram_update_service.stats()['pending'], 4)
+
+            # One update per chat at a time: chat 100's second message waits for its first
+            claimed = telegram_update_service.claim_next(10)
+            self.assertEqual([TelegramUpdate.query.get(row_id).update_id for row_id in claimed], [1, 2])
+            self.assertEqual(telegram_update_service.claim_next(10), [])
+            for row_id in claimed:
+                telegram_update_service.run_update(row_id)
+
+            # A failed update does not block the rest of its chat
+            self.assertEqual(telegram_update_service.process_pending(), 2)
+            self.assertEqual(self.handled, [(100, 'first'), (100, 'second'), (200, 'after failure')])
+            failed = TelegramUpdate.query.filter_by(status='failed').one()
+            self.assertEqual((failed.update_id, failed.last_error), (2, 'OpenAI is down'))
+
+            stats = telegram_update_service.stats()
+            self.assertEqual((stats['pending'], stats['done'], stats['failed']), (0, 3, 1))
+            self.assertIsNone(stats['oldest_pending_seconds'])
+
+    def test_redelivered_updates_are_acknowledged_but_not_run_again(self):
+        voice_approval = {'callback_query': {'id': 'cb-1', 'data': 'voice_approve',
+                                             'from': {'id': 100}, 'message': {'message_id': 7, 'chat': {'id': 100}}}}
+        self.post(telegram_message(1, 100, 'add task'))
+        response = self.post(telegram_message(1, 100, 'add task'))
+        self.assertEqual(json.loads(response.data), {'status': 'ok', 'duplicate': True})
+        # A button press is keyed on the callback query, whatever update carries it
+        self.post(dict(voice_approval, update_id=2))
+        self.assertTrue(json.loads(self.post(dict(voice_approval, update_id=3)).data)['duplicate'])
+
+        with app.app_context():
+            self.assertEqual([update.dedup_key for update in TelegramUpdate.query.order_by(TelegramUpdate.id)],
+                             ['update:1', 'callback:cb-1'])
+            TelegramUpdate.query.update({'status': 'done'})
+            db.session.commit()
+
+            # Finished updates are forgotten after the retention
+            self.assertEqual(telegram_update_service.prune(), 0)
+            self.assertEqual(telegram_update_service.prune(datetime.utcnow() + timedelta(days=3)), 2)
+        self.assertNotIn('duplicate', json.loads(self.post(telegram_message(1, 100, 'add task')).data))
+
+    def test_stale_updates_fail_instead_of_running_twice(self):
+        for payload in (telegram_message(1, 100, 'add task'), telegram_message(2, 100, 'second')):
+            self.post(payload)
+
+        with app.app_context():
+            [row_id] = telegram_update_service.claim_next(10)
+            # The worker running it dies, or hangs, past the stale limit
+            TelegramUpdate.query.filter_by(id=row_id).update(
+                {'updated_at': datetime.utcnow() - timedelta(seconds=telegram_update_service.stale_after_seconds + 1)})
+            db.session.commit()
+
+            self.assertEqual(telegram_update_service.process_pending(), 1)
+            self.assertEqual(self.handled, [(100, 'second')])
+            stale = TelegramUpdate.query.get(row_id)
+            self.assertEqual((stale.status, stale.last_error), ('failed', 'Processing was interrupted'))
+
+    def test_only_the_lease_holder_claims_updates(self):
+        self.post(telegram_message(1, 100, 'first'))
+
+        with app.app_context():
+            db.session.add(BackgroundLease(name='telegram-update-dispatcher', holder='other-host:1',
+                                           expires_at=datetime.utcnow() + timedelta(minutes=1)))
+            db.session.commit()
+            self.assertEqual(telegram_update_service.claim_next(10), [])
+
+            BackgroundLease.query.update({'expires_at': datetime.utcnow() - timedelta(seconds=1)})
+            db.session.commit()
+            self.assertEqual(len(telegram_update_service.claim_next(10)), 1)
+
+if __name__ == '__main__':
+    unittest.main()